@@ -0,0 +1,79 @@
+# /// script
+# dependencies = [
+#   "requests",
+#   "python-dotenv",
+# ]
+# ///
+
+"""Compare cleanup_branch.py against the previous list-everything approach.
+
+Both run against a local fake GitHub API holding thousands of branches, with a
+per-request latency standing in for the round trip to api.github.com.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from cleanup_branch import CLOSE_COMMENT, PROTECTED_BRANCHES, check_and_cleanup_existing
+from fake_github_api import FakeGitHub
+from github_client import GitHubClient
+
+REPO = "portiaAI/docs"
+TITLE = "🤖 Automated: Bump SDK version"
+PREFIX = "automated/bump-sdk-version"
+
+
+def populate(github: FakeGitHub, branches: int, pulls: int, stale: int) -> None:
+    for i in range(branches):
+        github.add_branch(REPO, f"feature/branch-{i}")
+    for i in range(pulls):
+        github.add_pull(REPO, 1000 + i, head_sha=f"{i:040x}", head_ref=f"feature/pr-{i}", title=f"Feature {i}")
+    for i in range(stale):
+        github.add_pull(REPO, 10 + i, head_sha=f"{i:040x}", head_ref=f"{PREFIX}-{i}", title=f"{TITLE} to latest commit")
+        github.add_branch(REPO, f"{PREFIX}-orphan-{i}")
+
+
+def legacy_cleanup(api_url: str) -> None:
+    """The previous algorithm: list every open PR and branch (PyGithub's default page
+    size of 30), match client-side and make one sequential call per change."""
+    client = GitHubClient(api_url=api_url)
+    deleted = set()
+    for pr in client.paginate(f"/repos/{REPO}/pulls", {"state": "open", "per_page": 30}):
+        if TITLE in pr["title"]:
+            client.request("POST", f"/repos/{REPO}/issues/{pr['number']}/comments", {"body": CLOSE_COMMENT})
+            client.request("PATCH", f"/repos/{REPO}/pulls/{pr['number']}", {"state": "closed"})
+            client.request("DELETE", f"/repos/{REPO}/git/refs/heads/{pr['head']['ref']}")
+            deleted.add(pr["head"]["ref"])
+    for branch in list(client.paginate(f"/repos/{REPO}/branches", {"per_page": 30})):
+        if PREFIX in branch["name"] and branch["name"] not in PROTECTED_BRANCHES and branch["name"] not in deleted:
+            client.request("DELETE", f"/repos/{REPO}/git/refs/heads/{branch['name']}")
+
+
+def run(name: str, cleanup, args: argparse.Namespace) -> None:
+    with FakeGitHub(latency=args.latency) as github:
+        populate(github, args.branches, args.pulls, args.stale)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cleanup(github.url)
+        elapsed = time.perf_counter() - start
+        left = [b for b in github.branches[REPO] if b.startswith(PREFIX)]
+        print(f"{name:<8} {sum(github.requests.values()):>8} {elapsed:>9.2f}s {len(left):>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleanup_branch.py against a fake GitHub API")
+    parser.add_argument("--branches", type=int, default=5000, help="Unrelated branches in the repo (default: 5000)")
+    parser.add_argument("--pulls", type=int, default=200, help="Unrelated open PRs (default: 200)")
+    parser.add_argument("--stale", type=int, default=20, help="Stale bump PRs plus as many orphaned bump branches (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of latency per request (default: 0.05)")
+    args = parser.parse_args()
+
+    print(f"{'':<8} {'requests':>8} {'time':>10} {'branches left':>14}")
+    run("legacy", legacy_cleanup, args)
+    run("current", lambda url: check_and_cleanup_existing(REPO, TITLE, PREFIX, delete=True, api_url=url), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,151 @@
 # /// script
 # dependencies = [
-#   "PyGithub",
+#   "requests",
 #   "python-dotenv",
 # ]
 # ///
 
 import os
 import argparse
-from github import Github
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 from dotenv import load_dotenv
+from requests import HTTPError
+
+from github_client import GitHubClient, get_client
 
 load_dotenv(override=True)
 
-def check_and_cleanup_existing(repo_name: str, title_pattern: str, branch_pattern: str, delete: bool = False, token: str = None) -> bool:
+PROTECTED_BRANCHES = ["main", "production"]
+CLOSE_COMMENT = "This PR was automatically closed by a new SDK version bump workflow run."
+
+
+def find_open_prs(client: GitHubClient, repo_name: str, title_pattern: str) -> list[dict]:
+    """Find open PRs whose title contains title_pattern
+
+    Uses the search API so only matching PRs are fetched. Search matches words rather
+    than substrings, so results are re-checked here, and if search is unavailable
+    (e.g. its separate rate limit is exhausted) we fall back to listing open PRs.
+    """
+    query = f'repo:{repo_name} is:pr is:open in:title "{title_pattern}"'
+    try:
+        candidates = list(client.paginate("/search/issues", {"q": query}, key="items"))
+    except HTTPError as e:
+        print(f"Warning: PR search failed ({e}), listing open PRs instead")
+        candidates = list(client.paginate(f"/repos/{repo_name}/pulls", {"state": "open"}))
+    return [pr for pr in candidates if title_pattern in pr["title"]]
+
+
+def find_branches(client: GitHubClient, repo_name: str, branch_pattern: str) -> list[str]:
+    """Find branches starting with branch_pattern using the matching-refs endpoint"""
+    refs = client.paginate(f"/repos/{repo_name}/git/matching-refs/heads/{branch_pattern}")
+    branches = [ref["ref"].removeprefix("refs/heads/") for ref in refs]
+    return [branch for branch in branches if branch not in PROTECTED_BRANCHES]
+
+
+def run_concurrently(action: Callable[[str], None], targets: list, max_concurrency: int) -> list:
+    """Apply action to each target with a bounded thread pool, returning the targets that failed"""
+    def attempt(target):
+        try:
+            action(target)
+            return None
+        except Exception as e:
+            print(f"Warning: {e}")
+            return target
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return [target for target in executor.map(attempt, targets) if target is not None]
+
+
+def check_and_cleanup_existing(
+    repo_name: str,
+    title_pattern: str,
+    branch_pattern: str,
+    delete: bool = False,
+    token: str = None,
+    dry_run: bool = False,
+    max_concurrency: int = 4,
+    api_url: Optional[str] = None,
+    graphql: bool = False,
+) -> bool:
     """Check if there's already an open PR with the given title pattern and optionally clean up
     
+    Matching PRs and branches are found with server-side filtering (the search API and
+    the matching-refs endpoint) rather than by listing every PR and branch, and PRs are
+    closed and branches deleted concurrently.
+    
     Args:
         repo_name: The repository name in format 'owner/repo'
         title_pattern: Pattern to match in PR titles (e.g., "🤖 Automated: Bump SDK version")
-        branch_pattern: Pattern to match in branch names (e.g., "automated/bump-sdk-version")
+        branch_pattern: Prefix of branch names to delete (e.g., "automated/bump-sdk-version")
         delete: If True, close existing PRs and delete branches
+        dry_run: If True, report what delete would do without changing anything
+        max_concurrency: Maximum number of concurrent close/delete requests
+        api_url: GitHub API root, e.g. a local fake server (default: GITHUB_API_URL or api.github.com)
+        graphql: If True, fetch the head branches of the matching PRs with one GraphQL query
     
     Returns:
         bool: True if an open PR with matching title exists, False otherwise
     """
+    client = get_client(token, api_url, graphql=graphql)
     
-    github = Github(token)
-    repo = github.get_repo(repo_name)
-    
-    found_existing = False
-    
-    # Get all open PRs
-    open_prs = repo.get_pulls(state='open')
-    
+    open_prs = find_open_prs(client, repo_name, title_pattern)
     for pr in open_prs:
-        if title_pattern in pr.title:
-            print(f"Found existing open PR #{pr.number}: {pr.title}")
-            found_existing = True
-            
-            if delete:
-                print(f"Closing PR #{pr.number} and deleting branch {pr.head.ref}")
-                # Close the PR
-                pr.create_issue_comment("This PR was automatically closed by a new SDK version bump workflow run.")
-                pr.edit(state="closed")
-                
-                # Delete the branch
-                try:
-                    repo.get_git_ref(f"heads/{pr.head.ref}").delete()
-                    print(f"Successfully deleted branch {pr.head.ref}")
-                except Exception as e:
-                    print(f"Warning: Could not delete branch {pr.head.ref}: {e}")
+        print(f"Found existing open PR #{pr['number']}: {pr['title']}")
+    found_existing = bool(open_prs)
     
-    # Also check for orphaned branches (branches without PRs)
     if delete:
-        try:
-            branches = repo.get_branches()
+        # Search results don't include the head branch, so fetch it for each matching PR
+        pulls = client.get_pulls(repo_name, [pr["number"] for pr in open_prs], max_concurrency)
+        branches = find_branches(client, repo_name, branch_pattern)
+        # PR branches are deleted along with the orphaned ones, whether or not they match the prefix
+        for pull in pulls:
+            if pull["head"]["ref"] not in branches and pull["head"]["ref"] not in PROTECTED_BRANCHES:
+                branches.append(pull["head"]["ref"])
+        
+        if dry_run:
+            print(f"\nDry run: would close {len(pulls)} PR(s) and delete {len(branches)} branch(es)")
+            for pull in pulls:
+                print(f"  - close PR #{pull['number']}: {pull['title']}")
             for branch in branches:
-                if branch_pattern in branch.name and branch.name != "main" and branch.name != "production":
-                    print(f"Found orphaned branch: {branch.name}")
-                    try:
-                        repo.get_git_ref(f"heads/{branch.name}").delete()
-                        print(f"Successfully deleted orphaned branch {branch.name}")
-                    except Exception as e:
-                        print(f"Warning: Could not delete orphaned branch {branch.name}: {e}")
-        except Exception as e:
-            print(f"Warning: Could not check for orphaned branches: {e}")
+                print(f"  - delete branch {branch}")
+        else:
+            def close_pr(pull: dict) -> None:
+                print(f"Closing PR #{pull['number']}")
+                client.request("POST", f"/repos/{repo_name}/issues/{pull['number']}/comments", {"body": CLOSE_COMMENT})
+                client.request("PATCH", f"/repos/{repo_name}/pulls/{pull['number']}", {"state": "closed"})
+
+            def delete_branch(branch: str) -> None:
+                try:
+                    client.request("DELETE", f"/repos/{repo_name}/git/refs/heads/{branch}")
+                except HTTPError as e:
+                    raise RuntimeError(f"Could not delete branch {branch}: {e}") from e
+                print(f"Successfully deleted branch {branch}")
+
+            failed_prs = run_concurrently(close_pr, pulls, max_concurrency)
+            failed_branches = run_concurrently(delete_branch, branches, max_concurrency)
+            print(
+                f"\nClosed {len(pulls) - len(failed_prs)}/{len(pulls)} PR(s) and "
+                f"deleted {len(branches) - len(failed_branches)}/{len(branches)} branch(es)"
+            )
     
     if not found_existing:
         print(f"No existing open PR found with pattern: {title_pattern}")
     
+    client.print_stats()
     return found_existing
 
 def main():
     parser = argparse.ArgumentParser(description="Check for existing PRs with title pattern and optionally clean up")
     parser.add_argument("--repo-name", type=str, required=True, help="Repository name in format 'owner/repo'")
     parser.add_argument("--title-pattern", type=str, required=True, help="Pattern to match in PR titles")
-    parser.add_argument("--branch-pattern", type=str, required=True, help="Pattern to match in branch names")
+    parser.add_argument("--branch-pattern", type=str, required=True, help="Prefix of branch names to delete")
     parser.add_argument("--delete", action="store_true", default=False, help="Close existing PRs and delete branches")
+    parser.add_argument("--dry-run", action="store_true", default=False, help="With --delete, only report what would be closed and deleted")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Maximum concurrent close/delete requests (default: 4)")
+    parser.add_argument("--graphql", action="store_true", default=False, help="Fetch the head branches of the matching PRs in a single GraphQL query")
     parser.add_argument("--token", type=str, help="GitHub token")
+    parser.add_argument("--api-url", type=str, help="GitHub API URL, e.g. a local fake API server (default: GITHUB_API_URL or https://api.github.com)")
     args = parser.parse_args()
 
     try:
@@ -86,7 +154,11 @@ def main():
             title_pattern=args.title_pattern,
             branch_pattern=args.branch_pattern,
             delete=args.delete,
-            token=args.token or os.getenv("DEPLOY_PAT_TOKEN")
+            token=args.token or os.getenv("DEPLOY_PAT_TOKEN"),
+            dry_run=args.dry_run,
+            max_concurrency=args.max_concurrency,
+            api_url=args.api_url,
+            graphql=args.graphql,
         )
         exit(0 if not exists else 1)  # Exit 0 if no existing PR, 1 if exists
     except Exception as e:
@@ -94,4 +166,4 @@ def main():
         exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
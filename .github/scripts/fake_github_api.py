@@ -0,0 +1,309 @@
+"""In-memory stand-in for the parts of the GitHub REST API the scripts use.
+
+Used to exercise the scripts locally without a token or rate limit:
+
+    with FakeGitHub() as github:
+        github.add_pull("owner/repo", 1, head_sha="abc", head_ref="feature")
+        github.set_check_run("owner/repo", "abc", "tests", status="in_progress")
+        wait_for_checks("owner/repo", 1, api_url=github.url)
+
+or run it standalone with `python .github/scripts/fake_github_api.py --port 8000`.
+Responses carry ETags and honour If-None-Match, and every request is counted in
+`github.requests`.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, unquote, urlencode
+
+RATE_LIMIT = 5000
+
+
+class FakeGitHub:
+    """Threaded HTTP server holding repository state in plain dicts."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.pulls: dict[str, dict[int, dict]] = {}
+        self.branches: dict[str, dict[str, str]] = {}
+        self.comments: dict[str, dict[int, list[str]]] = {}
+        self.statuses: dict[str, dict[str, dict[str, dict]]] = {}
+        self.check_runs: dict[str, dict[str, dict[str, dict]]] = {}
+        self.requests: Counter = Counter()
+        self.rate_limit_remaining = RATE_LIMIT
+        self.latency = latency
+        self.lock = threading.Lock()
+        # Called with (method, path) before each request is handled, so tests can
+        # change state as polling goes on.
+        self.on_request: Optional[Callable[[str, str], None]] = None
+        self.routes: list[tuple[str, re.Pattern, Callable]] = []
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/pulls", self._list_pulls)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)", self._get_pull)
+        self.route("PATCH", r"/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)", self._update_pull)
+        self.route("POST", r"/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/comments", self._create_comment)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/branches", self._list_branches)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/git/matching-refs/heads/(?P<prefix>.*)", self._matching_refs)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/git/ref/heads/(?P<branch>.+)", self._get_ref)
+        self.route("PATCH", r"/repos/(?P<repo>[^/]+/[^/]+)/git/refs/heads/(?P<branch>.+)", self._update_ref)
+        self.route("DELETE", r"/repos/(?P<repo>[^/]+/[^/]+)/git/refs/heads/(?P<branch>.+)", self._delete_ref)
+        self.route("GET", r"/search/issues", self._search_issues)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<ref>[^/]+)", self._get_commit)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>[^/]+)/status", self._get_status)
+        self.route("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>[^/]+)/check-runs", self._get_check_runs)
+        self.route("POST", r"/graphql", self._graphql)
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, method: str, pattern: str, handler: Callable) -> None:
+        self.routes.append((method, re.compile(f"{pattern}$"), handler))
+
+    def __enter__(self) -> "FakeGitHub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    # State helpers
+
+    def add_branch(self, repo: str, name: str, sha: str = "0" * 40) -> None:
+        with self.lock:
+            self.branches.setdefault(repo, {})[name] = sha
+
+    def add_pull(self, repo: str, number: int, head_sha: str, head_ref: str,
+                 title: str = "", mergeable_state: str = "clean") -> dict:
+        self.add_branch(repo, head_ref, head_sha)
+        pull = {
+            "number": number,
+            "title": title,
+            "state": "open",
+            "mergeable_state": mergeable_state,
+            "head": {"sha": head_sha, "ref": head_ref},
+        }
+        with self.lock:
+            self.pulls.setdefault(repo, {})[number] = pull
+        return pull
+
+    def set_status(self, repo: str, sha: str, context: str, state: str) -> None:
+        with self.lock:
+            self.statuses.setdefault(repo, {}).setdefault(sha, {})[context] = {
+                "context": context, "state": state,
+            }
+
+    def set_check_run(self, repo: str, sha: str, name: str, status: str,
+                      conclusion: Optional[str] = None) -> None:
+        with self.lock:
+            self.check_runs.setdefault(repo, {}).setdefault(sha, {})[name] = {
+                "name": name, "status": status, "conclusion": conclusion,
+            }
+
+    # Handlers return (status code, JSON body) or (status code, JSON body, headers)
+
+    def _page(self, path: str, query: dict, items: list) -> tuple[int, Any, dict]:
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(items):
+            params = {k: v for k, v in query.items() if k != "body"}
+            next_page = urlencode({**params, "page": page + 1})
+            headers["Link"] = f'<{self.url}{path}?{next_page}>; rel="next"'
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+    def _list_pulls(self, query: dict, repo: str) -> tuple[int, Any, dict]:
+        state = query.get("state", "open")
+        pulls = [p for p in self.pulls.get(repo, {}).values() if state == "all" or p["state"] == state]
+        return self._page(f"/repos/{repo}/pulls", query, pulls)
+
+    def _update_pull(self, query: dict, repo: str, number: str) -> tuple[int, Any]:
+        pull = self.pulls.get(repo, {}).get(int(number))
+        if not pull:
+            return 404, {"message": "Not Found"}
+        pull.update(query.get("body") or {})
+        return 200, pull
+
+    def _create_comment(self, query: dict, repo: str, number: str) -> tuple[int, Any]:
+        body = (query.get("body") or {}).get("body", "")
+        self.comments.setdefault(repo, {}).setdefault(int(number), []).append(body)
+        return 201, {"body": body}
+
+    def _list_branches(self, query: dict, repo: str) -> tuple[int, Any, dict]:
+        branches = [
+            {"name": name, "commit": {"sha": sha}}
+            for name, sha in sorted(self.branches.get(repo, {}).items())
+        ]
+        return self._page(f"/repos/{repo}/branches", query, branches)
+
+    def _matching_refs(self, query: dict, repo: str, prefix: str) -> tuple[int, Any]:
+        prefix = unquote(prefix)
+        refs = [
+            {"ref": f"refs/heads/{name}", "object": {"sha": sha, "type": "commit"}}
+            for name, sha in sorted(self.branches.get(repo, {}).items())
+            if name.startswith(prefix)
+        ]
+        return 200, refs
+
+    def _get_ref(self, query: dict, repo: str, branch: str) -> tuple[int, Any]:
+        sha = self.branches.get(repo, {}).get(unquote(branch))
+        if sha is None:
+            return 404, {"message": "Not Found"}
+        return 200, {"ref": f"refs/heads/{unquote(branch)}", "object": {"sha": sha, "type": "commit"}}
+
+    def _update_ref(self, query: dict, repo: str, branch: str) -> tuple[int, Any]:
+        branches = self.branches.get(repo, {})
+        if unquote(branch) not in branches:
+            return 422, {"message": "Reference does not exist"}
+        # Every update is taken as forced; there are no commits to check ancestry with
+        branches[unquote(branch)] = (query.get("body") or {})["sha"]
+        return self._get_ref(query, repo, branch)
+
+    def _delete_ref(self, query: dict, repo: str, branch: str) -> tuple[int, Any]:
+        if self.branches.get(repo, {}).pop(unquote(branch), None) is None:
+            return 422, {"message": "Reference does not exist"}
+        return 204, None
+
+    def _search_issues(self, query: dict) -> tuple[int, Any, dict]:
+        # Supports the qualifiers the scripts use: repo:, is:pr, is:open and a
+        # quoted phrase, matched as a substring of the title.
+        terms = query.get("q", "")
+        repo = re.search(r"repo:(\S+)", terms)
+        phrase = re.search(r'"([^"]*)"', terms)
+        pulls = self.pulls.get(repo.group(1), {}).values() if repo else []
+        items = [
+            {"number": p["number"], "title": p["title"], "state": p["state"], "pull_request": {}}
+            for p in pulls
+            if ("is:open" not in terms or p["state"] == "open")
+            and (not phrase or phrase.group(1) in p["title"])
+        ]
+        status, page, headers = self._page("/search/issues", query, items)
+        return status, {"total_count": len(items), "items": page}, headers
+
+    def _graphql(self, query: dict) -> tuple[int, Any]:
+        # Supports the query GitHubClient.get_pulls sends: aliased pullRequest fields
+        # of one repository, given as the owner and name variables.
+        request = query.get("body") or {}
+        variables = request.get("variables") or {}
+        pulls = self.pulls.get(f"{variables.get('owner')}/{variables.get('name')}", {})
+        repository = {}
+        for alias, number in re.findall(r"(\w+): pullRequest\(number: (\d+)\)", request.get("query", "")):
+            pull = pulls.get(int(number))
+            repository[alias] = pull and {
+                "number": pull["number"],
+                "title": pull["title"],
+                "state": pull["state"].upper(),
+                "headRefName": pull["head"]["ref"],
+                "headRefOid": pull["head"]["sha"],
+            }
+        missing = [alias for alias, pull in repository.items() if pull is None]
+        if missing:
+            errors = [{"message": f"Could not resolve to a PullRequest ({alias})"} for alias in missing]
+            return 200, {"data": {"repository": repository}, "errors": errors}
+        return 200, {"data": {"repository": repository}}
+
+    def _get_pull(self, query: dict, repo: str, number: str) -> tuple[int, Any]:
+        pull = self.pulls.get(repo, {}).get(int(number))
+        return (200, pull) if pull else (404, {"message": "Not Found"})
+
+    def _get_commit(self, query: dict, repo: str, ref: str) -> tuple[int, Any]:
+        # A branch name resolves to its head, anything else is taken as a SHA
+        sha = self.branches.get(repo, {}).get(unquote(ref), ref)
+        return 200, {"sha": sha, "commit": {"message": ""}}
+
+    def _get_status(self, query: dict, repo: str, sha: str) -> tuple[int, Any, dict]:
+        statuses = list(self.statuses.get(repo, {}).get(sha, {}).values())
+        status, page, headers = self._page(f"/repos/{repo}/commits/{sha}/status", query, statuses)
+        return status, {"sha": sha, "statuses": page, "total_count": len(statuses)}, headers
+
+    def _get_check_runs(self, query: dict, repo: str, sha: str) -> tuple[int, Any, dict]:
+        runs = list(self.check_runs.get(repo, {}).get(sha, {}).values())
+        status, page, headers = self._page(f"/repos/{repo}/commits/{sha}/check-runs", query, runs)
+        return status, {"check_runs": page, "total_count": len(runs)}, headers
+
+
+def _handler_for(github: FakeGitHub) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _handle(self, method: str) -> None:
+            path, _, query_string = self.path.partition("?")
+            query = dict(parse_qsl(query_string))
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            if github.on_request:
+                github.on_request(method, path)
+            if github.latency:
+                time.sleep(github.latency)
+            with github.lock:
+                github.requests[(method, path)] += 1
+                for route_method, pattern, handler in github.routes:
+                    match = pattern.match(path)
+                    if route_method == method and match:
+                        if body is not None:
+                            query = {**query, "body": body}
+                        status, payload, *headers = handler(query, **match.groupdict())
+                        break
+                else:
+                    status, payload, headers = 404, {"message": "Not Found"}, []
+                self._respond(status, payload, headers[0] if headers else {})
+
+        def _respond(self, status: int, payload: Any, headers: dict) -> None:
+            data = json.dumps(payload).encode() if payload is not None else b""
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            # Conditional requests answered with 304 are free, as on GitHub.
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, data = 304, b""
+            elif github.rate_limit_remaining > 0:
+                github.rate_limit_remaining -= 1
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("X-RateLimit-Remaining", str(github.rate_limit_remaining))
+            self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if data:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            self._handle("GET")
+
+        def do_POST(self) -> None:
+            self._handle("POST")
+
+        def do_PATCH(self) -> None:
+            self._handle("PATCH")
+
+        def do_DELETE(self) -> None:
+            self._handle("DELETE")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake GitHub API server")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay each response")
+    args = parser.parse_args()
+
+    github = FakeGitHub(port=args.port, latency=args.latency)
+    print(f"Fake GitHub API listening on {github.url}")
+    github.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
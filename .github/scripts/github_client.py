@@ -0,0 +1,247 @@
+"""Minimal GitHub REST client shared by the automation scripts.
+
+GET requests are revalidated with the ETag of the previous response (If-None-Match),
+so polling a resource that hasn't changed gets a 304 that doesn't count against the
+rate limit. The ETags can be persisted to a JSON file, so the saving carries over
+between runs (e.g. a file restored with actions/cache).
+
+`get_client` hands out one client per token and API root, so everything in a process
+shares its keep-alive connection pool and caches. Every request is counted and timed
+per route; `print_stats` shows where the requests went. With `graphql=True`, lookups
+of several pull requests are batched into a single GraphQL query.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+DEFAULT_API_URL = "https://api.github.com"
+# Transient errors and secondary rate limits are retried with exponential backoff
+RETRY = Retry(
+    total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False
+)
+# Connections kept alive per host; enough for the scripts' thread pools
+POOL_SIZE = 16
+# Fields of the REST pull request objects that get_pulls fills in from GraphQL
+PULL_QUERY_FIELDS = "number title state headRefName headRefOid"
+
+_clients: dict[tuple, "GitHubClient"] = {}
+_clients_lock = threading.Lock()
+
+
+def default_api_url() -> str:
+    """API root, taken from GITHUB_API_URL when running in GitHub Actions."""
+    return os.getenv("GITHUB_API_URL", DEFAULT_API_URL)
+
+
+def get_client(token: Optional[str] = None, api_url: Optional[str] = None,
+               cache_path: Optional[Path] = None, graphql: bool = False) -> "GitHubClient":
+    """The client of this process for the given token and API root, created on first use."""
+    key = (token, (api_url or default_api_url()).rstrip("/"), cache_path, graphql)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = GitHubClient(token, api_url, cache_path, graphql)
+        return _clients[key]
+
+
+def route_of(path: str) -> str:
+    """Path with the repository, branches, numbers and SHAs replaced by placeholders, for stats."""
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "/repos/{repo}", path)
+    path = re.sub(r"/heads/.*$", "/heads/{branch}", path)
+    return re.sub(r"/(\d+|[0-9a-f]{40})(?=/|$)", "/{id}", path)
+
+
+class GitHubClient:
+    """Thin wrapper around a requests session for the GitHub REST API."""
+
+    def __init__(self, token: Optional[str] = None, api_url: Optional[str] = None,
+                 cache_path: Optional[Path] = None, graphql: bool = False):
+        self.api_url = (api_url or default_api_url()).rstrip("/")
+        # GitHub Enterprise serves GraphQL next to, not under, the REST root
+        self.graphql_url = re.sub(r"/api/v3$", "/api/graphql", self.api_url)
+        if self.graphql_url == self.api_url:
+            self.graphql_url = f"{self.api_url}/graphql"
+        self.use_graphql = graphql
+        self.session = requests.Session()
+        adapter = HTTPAdapter(max_retries=RETRY, pool_connections=4, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._etags: dict[str, tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.cache_path = cache_path
+        if cache_path is not None and cache_path.exists():
+            try:
+                self._etags = {key: tuple(value) for key, value in json.loads(cache_path.read_text()).items()}
+            except (OSError, ValueError):
+                # stderr, as stdout of update_sdk_version.py --check is the commit SHA
+                print(f"Warning: ignoring unreadable GitHub cache {cache_path}", file=sys.stderr)
+        self.rate_limit_remaining: Optional[int] = None
+        self.rate_limit_reset: Optional[float] = None
+        self.not_modified = 0
+        self.stats: dict[str, list] = defaultdict(lambda: [0, 0.0])
+
+    def get(self, path: str, params: Optional[dict] = None) -> Any:
+        """GET a JSON resource, reusing the cached body if GitHub says it's unchanged."""
+        return self._get(f"{self.api_url}{path}", params)[0]
+
+    def get_all(self, path: str, params: Optional[dict] = None, key: Optional[str] = None) -> list:
+        """Every item of a list endpoint, following Link headers.
+
+        Unlike paginate, each page is a conditional request, so re-reading an unchanged
+        list costs no rate limit. `key` names the field holding the items, as for paginate.
+        """
+        url = f"{self.api_url}{path}"
+        params = {"per_page": 100, **(params or {})}
+        items = []
+        while url:
+            data, url = self._get(url, params)
+            items.extend(data[key] if key else data)
+            # The next link already carries the query string
+            params = None
+        return items
+
+    def _get(self, url: str, params: Optional[dict]) -> tuple[Any, Optional[str]]:
+        """Conditional GET returning the body and the URL of the next page, if any."""
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}"
+        with self._lock:
+            cached = self._etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self._send("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.not_modified += 1
+            # Entries cached before next links were kept have none
+            return cached[1], cached[2] if len(cached) > 2 else None
+        response.raise_for_status()
+        data = response.json()
+        next_url = response.links.get("next", {}).get("url")
+        if "ETag" in response.headers:
+            with self._lock:
+                self._etags[key] = (response.headers["ETag"], data, next_url)
+        return data, next_url
+
+    def paginate(self, path: str, params: Optional[dict] = None, key: Optional[str] = None) -> Iterator[Any]:
+        """Yield items from every page of a list endpoint, following Link headers.
+
+        For endpoints that wrap the list in an object (e.g. search), `key` names the
+        field holding the items.
+        """
+        url = f"{self.api_url}{path}"
+        params = {"per_page": 100, **(params or {})}
+        while url:
+            response = self._send("GET", url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield from data[key] if key else data
+            # The next link already carries the query string
+            url = response.links.get("next", {}).get("url")
+            params = None
+
+    def request(self, method: str, path: str, json: Any = None) -> Any:
+        """Make a non-cached request, returning the JSON body if there is one."""
+        response = self._send(method, f"{self.api_url}{path}", json=json)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        """Run a GraphQL query and return its data, raising if GitHub reports errors."""
+        response = self._send("POST", self.graphql_url, json={"query": query, "variables": variables or {}})
+        response.raise_for_status()
+        body = response.json()
+        # GraphQL errors come with a 200
+        if body.get("errors"):
+            messages = "; ".join(error.get("message", str(error)) for error in body["errors"])
+            raise RuntimeError(f"GraphQL query failed: {messages}")
+        return body["data"]
+
+    def get_pulls(self, repo_name: str, numbers: list[int], max_concurrency: int = 4) -> list[dict]:
+        """Fetch several pull requests, in the order of numbers.
+
+        With GraphQL batching this is a single request, and each pull request only has
+        the number, title, state and head (ref and sha) of the REST representation.
+        Otherwise the REST objects are fetched concurrently, one request each.
+        """
+        if not self.use_graphql or len(numbers) < 2:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                return list(executor.map(lambda number: self.get(f"/repos/{repo_name}/pulls/{number}"), numbers))
+        owner, name = repo_name.split("/")
+        aliases = "\n".join(
+            f"pr{number}: pullRequest(number: {number}) {{ {PULL_QUERY_FIELDS} }}" for number in numbers
+        )
+        data = self.graphql(
+            f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}",
+            {"owner": owner, "name": name},
+        )
+        return [
+            {
+                "number": pull["number"],
+                "title": pull["title"],
+                "state": pull["state"].lower(),
+                "head": {"ref": pull["headRefName"], "sha": pull["headRefOid"]},
+            }
+            for pull in (data["repository"][f"pr{number}"] for number in numbers)
+        ]
+
+    def save_cache(self) -> None:
+        """Write the cached ETags and bodies to cache_path, replacing it atomically."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_path.parent, prefix=f".{self.cache_path.name}.")
+        with os.fdopen(fd, "w") as f:
+            with self._lock:
+                json.dump(self._etags, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def print_stats(self) -> None:
+        """Print how many requests went to each route and how long they took."""
+        with self._lock:
+            stats = sorted(self.stats.items(), key=lambda item: -item[1][0])
+            total = sum(count for _, (count, _) in stats)
+            seconds = sum(elapsed for _, (_, elapsed) in stats)
+            print(f"GitHub API: {total} request(s) in {seconds:.1f}s, {self.not_modified} not modified")
+            for route, (count, elapsed) in stats:
+                print(f"  {count:>4} {route} ({elapsed:.2f}s)")
+
+    def seconds_until_reset(self) -> float:
+        if self.rate_limit_reset is None:
+            return 0.0
+        return max(self.rate_limit_reset - time.time(), 0.0)
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        start = time.perf_counter()
+        response = self.session.request(method, url, timeout=30, **kwargs)
+        elapsed = time.perf_counter() - start
+        route = f"{method} {route_of(urlsplit(url).path.removeprefix(urlsplit(self.api_url).path))}"
+        with self._lock:
+            self.stats[route][0] += 1
+            self.stats[route][1] += elapsed
+        self._record_rate_limit(response)
+        return response
+
+    def _record_rate_limit(self, response: requests.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                self.rate_limit_remaining = int(remaining)
+            if reset is not None:
+                self.rate_limit_reset = float(reset)
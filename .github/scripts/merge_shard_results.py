@@ -0,0 +1,169 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Merge the results of a sharded docs example run (`pytest --shard i/N`).
+
+Usage:
+    uv run .github/scripts/merge_shard_results.py \
+        --junit shard-*/junit.xml --junit-out junit.xml \
+        --report shard-*/example-report.json --report-out example-report.json
+
+Before merging, the shards are checked to have used the same partition of the
+examples, with every shard present exactly once, every shard reporting as many
+examples as it was assigned and no example reported twice, so a shard that silently
+ran the wrong examples fails the merge instead of hiding them. Examples deselected
+within a shard (e.g. with -k or --quarantine=exclude) count as missing.
+"""
+
+import argparse
+import json
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Manifest fields recorded by tests/sharding.py as JUnit properties (prefixed docs_)
+# and under "shard" in the example report.
+MANIFEST_FIELDS = ["shard", "fingerprint", "examples", "total_examples"]
+COUNTERS = ["tests", "errors", "failures", "skipped"]
+
+
+def check_manifests(manifests, check_counts=True):
+    """Return a list of problems with the shard manifests of one run."""
+    if not manifests:
+        return ["no shard manifests found; were the inputs produced with --shard?"]
+    problems = []
+    fingerprints = {manifest["fingerprint"] for manifest in manifests}
+    if len(fingerprints) > 1:
+        problems.append(f"shards used different partitions: {', '.join(sorted(fingerprints))}")
+    shards = [manifest["shard"] for manifest in manifests]
+    counts = {shard.split("/")[1] for shard in shards}
+    if len(counts) > 1:
+        problems.append(f"shards disagree on the number of shards: {', '.join(sorted(counts))}")
+    else:
+        shard_count = int(counts.pop())
+        expected = {f"{i}/{shard_count}" for i in range(1, shard_count + 1)}
+        missing = sorted(expected - set(shards))
+        duplicated = sorted({shard for shard in shards if shards.count(shard) > 1})
+        if missing:
+            problems.append(f"missing shards: {', '.join(missing)}")
+        if duplicated:
+            problems.append(f"shards given more than once: {', '.join(duplicated)}")
+    if check_counts and not problems:
+        total = int(manifests[0]["total_examples"])
+        covered = sum(int(manifest["examples"]) for manifest in manifests)
+        if covered != total:
+            problems.append(f"shards cover {covered} examples but the partition has {total}")
+        for manifest in manifests:
+            if manifest["reported"] != int(manifest["examples"]):
+                problems.append(f"shard {manifest['shard']} reported {manifest['reported']} examples but was assigned {manifest['examples']}")
+    return problems
+
+
+def merge_junit(paths, output):
+    """Merge JUnit files into one test suite, returning a list of problems."""
+    merged = ET.Element("testsuite", name="pytest")
+    totals = dict.fromkeys(COUNTERS, 0)
+    time = 0.0
+    manifests = []
+    seen = set()
+    duplicates = []
+    testcases = []
+    for path in paths:
+        root = ET.parse(path).getroot()
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        for suite in suites:
+            for counter in COUNTERS:
+                totals[counter] += int(suite.get(counter, 0))
+            time += float(suite.get("time", 0))
+            properties = {
+                prop.get("name"): prop.get("value") for prop in suite.iter("property")
+            }
+            if "docs_shard" in properties:
+                manifest = {field: properties[f"docs_{field}"] for field in MANIFEST_FIELDS}
+                manifest["reported"] = len(suite.findall("testcase"))
+                manifests.append(manifest)
+            for testcase in suite.findall("testcase"):
+                key = (testcase.get("classname"), testcase.get("name"))
+                if key in seen:
+                    duplicates.append("::".join(key))
+                seen.add(key)
+                testcases.append(testcase)
+
+    problems = check_manifests(manifests)
+    if duplicates:
+        problems.append(f"examples reported by more than one shard: {', '.join(duplicates)}")
+
+    for counter, value in totals.items():
+        merged.set(counter, str(value))
+    merged.set("time", f"{time:.3f}")
+    if manifests:
+        properties = ET.SubElement(merged, "properties")
+        ET.SubElement(properties, "property", name="docs_fingerprint", value=manifests[0]["fingerprint"])
+        ET.SubElement(properties, "property", name="docs_shards", value=str(len(manifests)))
+    merged.extend(testcases)
+    root = ET.Element("testsuites")
+    root.append(merged)
+    ET.indent(root)
+    ET.ElementTree(root).write(output, encoding="utf-8", xml_declaration=True)
+    print(f"📄 Merged {len(paths)} JUnit file(s), {totals['tests']} tests, into {output}")
+    return problems
+
+
+def merge_reports(paths, output):
+    """Merge --example-report files, returning a list of problems."""
+    merged = {"sdk_rev": None, "examples": {}, "shards": [], "import_time": {}}
+    problems = []
+    for path in paths:
+        report = json.loads(Path(path).read_text())
+        if merged["sdk_rev"] not in (None, report["sdk_rev"]):
+            problems.append(f"{path} ran against SDK rev {report['sdk_rev']}, not {merged['sdk_rev']}")
+        merged["sdk_rev"] = report["sdk_rev"]
+        if "shard" in report:
+            merged["shards"].append(report["shard"])
+        # Every shard has its own gw0, gw1, ...
+        shard = report["shard"]["shard"] if "shard" in report else path
+        for worker, seconds in report.get("import_time", {}).items():
+            merged["import_time"][f"{shard} {worker}"] = seconds
+        for label, metrics in report["examples"].items():
+            if label in merged["examples"]:
+                problems.append(f"{label} reported by more than one shard")
+            merged["examples"][label] = metrics
+    # Reports only list the examples that ran, so the counts can't be checked here.
+    problems += check_manifests(merged["shards"], check_counts=False)
+    merged["shards"].sort(key=lambda manifest: int(manifest["shard"].split("/")[0]))
+    Path(output).write_text(json.dumps(merged, indent=2, sort_keys=True))
+    print(f"📄 Merged {len(paths)} example report(s), {len(merged['examples'])} examples, into {output}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the results of a sharded docs example run")
+    parser.add_argument("--junit", nargs="*", default=[], help="Per-shard JUnit XML files")
+    parser.add_argument("--junit-out", help="Where to write the merged JUnit XML")
+    parser.add_argument("--report", nargs="*", default=[], help="Per-shard --example-report JSON files")
+    parser.add_argument("--report-out", help="Where to write the merged example report")
+    args = parser.parse_args()
+
+    if not (args.junit or args.report):
+        parser.error("nothing to merge; pass --junit and/or --report files")
+    if args.junit and not args.junit_out or args.report and not args.report_out:
+        parser.error("--junit needs --junit-out and --report needs --report-out")
+
+    problems = []
+    if args.junit:
+        problems += merge_junit(args.junit, args.junit_out)
+    if args.report:
+        problems += merge_reports(args.report, args.report_out)
+
+    if problems:
+        print("❌ The shards don't add up to one complete run:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("✅ All shards accounted for")
+
+
+if __name__ == "__main__":
+    main()
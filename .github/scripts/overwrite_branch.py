@@ -1,43 +1,47 @@
 # /// script
 # dependencies = [
-#   "PyGithub",
+#   "requests",
 #   "python-dotenv",
 # ]
 # ///
 
 import os
-from github import Github
 import argparse
+from typing import Optional
 from dotenv import load_dotenv
 
+from github_client import get_client
+
 load_dotenv()
 
-def overwrite_branch(repo_name: str, push: bool, target_branch: str, source_branch: str, token: str) -> None:
+def overwrite_branch(repo_name: str, push: bool, target_branch: str, source_branch: str, token: str,
+                     api_url: Optional[str] = None) -> None:
     """Overwrites target branch with source branch head
-    
+
     This is used to overwrite target branch with source branch head. This will force push
     the source branch to the target branch, completely replacing the target branch content.
-    
+
     Args:
         repo_name: The name of the repository to overwrite target branch with source branch
         push: If True, will overwrite target branch with source branch head
         target_branch: The branch to be overwritten
         source_branch: The branch whose head will overwrite the target branch
+        token: GitHub token
+        api_url: GitHub API root, e.g. a local fake server (default: GITHUB_API_URL or api.github.com)
 
     Returns:
         None
     """
-    github = Github(token)
-    repo = github.get_repo(repo_name)
-    source_ref = repo.get_branch(source_branch)
-    
+    client = get_client(token, api_url)
+    source_sha = client.get(f"/repos/{repo_name}/git/ref/heads/{source_branch}")["object"]["sha"]
+
     if not push:
-        print(f"Dry run: Would have overwritten {target_branch} branch with {source_branch} branch head")
+        print(f"Dry run: Would have overwritten {target_branch} branch with {source_branch} branch head ({source_sha})")
     else:
-        target_ref = repo.get_git_ref(f"heads/{target_branch}")
-        target_ref.edit(source_ref.commit.sha, force=True)
-        
-        print(f"{target_branch} branch successfully overwritten with {source_branch} branch head")
+        client.request("PATCH", f"/repos/{repo_name}/git/refs/heads/{target_branch}", {"sha": source_sha, "force": True})
+
+        print(f"{target_branch} branch successfully overwritten with {source_branch} branch head ({source_sha})")
+    client.print_stats()
 
 def main():
     parser = argparse.ArgumentParser(description="Deploy")
@@ -46,6 +50,7 @@ def main():
     parser.add_argument("--target-branch", type=str, required=True)
     parser.add_argument("--source-branch", type=str, required=True)
     parser.add_argument("--token", type=str, help="GitHub token")
+    parser.add_argument("--api-url", type=str, help="GitHub API URL, e.g. a local fake API server (default: GITHUB_API_URL or https://api.github.com)")
     args = parser.parse_args()
 
     overwrite_branch(
@@ -53,8 +58,9 @@ def main():
         push=args.push,
         target_branch=args.target_branch,
         source_branch=args.source_branch,
-        token=args.token or os.getenv("DEPLOY_PAT_TOKEN")
+        token=args.token or os.getenv("DEPLOY_PAT_TOKEN"),
+        api_url=args.api_url,
     )
-    
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
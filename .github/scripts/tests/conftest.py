@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The scripts import each other as top-level modules, as `uv run` runs them.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_github_api import FakeGitHub  # noqa: E402
+
+
+@pytest.fixture
+def github():
+    with FakeGitHub() as github:
+        yield github
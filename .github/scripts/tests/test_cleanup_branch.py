@@ -0,0 +1,53 @@
+from cleanup_branch import check_and_cleanup_existing
+
+REPO = "owner/repo"
+
+TITLE = "🤖 Automated: Bump SDK version"
+PREFIX = "automated/bump-sdk-version"
+
+
+def add_bump_prs(github):
+    github.add_pull(REPO, 1, "a" * 40, f"{PREFIX}-a", title=f"{TITLE} to a")
+    github.add_pull(REPO, 2, "b" * 40, "renamed", title=f"{TITLE} to b")
+    github.add_pull(REPO, 3, "c" * 40, "feature", title="Unrelated")
+    github.add_branch(REPO, f"{PREFIX}-orphan")
+    github.add_branch(REPO, "main")
+
+
+def cleanup(github, **kwargs):
+    return check_and_cleanup_existing(
+        REPO, TITLE, PREFIX, delete=True, token="token", api_url=github.url, **kwargs
+    )
+
+
+def test_dry_run_changes_nothing(github, capsys):
+    add_bump_prs(github)
+    assert cleanup(github, dry_run=True)
+    output = capsys.readouterr().out
+    assert "would close 2 PR(s) and delete 3 branch(es)" in output
+    for branch in [f"{PREFIX}-a", "renamed", f"{PREFIX}-orphan"]:
+        assert f"delete branch {branch}\n" in output
+    assert all(method == "GET" for method, _ in github.requests)
+    assert all(pull["state"] == "open" for pull in github.pulls[REPO].values())
+    assert len(github.branches[REPO]) == 5
+
+
+def test_closes_prs_and_deletes_branches(github):
+    add_bump_prs(github)
+    assert cleanup(github)
+    assert [pull["state"] for pull in github.pulls[REPO].values()] == [
+        "closed",
+        "closed",
+        "open",
+    ]
+    assert sorted(github.branches[REPO]) == ["feature", "main"]
+    assert len(github.comments[REPO][1]) == 1
+
+
+def test_graphql_fetches_the_prs_in_one_request(github):
+    add_bump_prs(github)
+    assert cleanup(github, dry_run=True, graphql=True)
+    assert github.requests[("POST", "/graphql")] == 1
+    assert not any(
+        path.startswith(f"/repos/{REPO}/pulls/") for _, path in github.requests
+    )
@@ -0,0 +1,41 @@
+import pytest
+
+from github_client import get_client
+
+REPO = "owner/repo"
+
+
+def test_get_pulls_batches_with_graphql(github):
+    for number in (1, 2, 3):
+        github.add_pull(
+            REPO, number, str(number) * 40, f"branch-{number}", f"PR {number}"
+        )
+    client = get_client("token", github.url, graphql=True)
+    pulls = client.get_pulls(REPO, [3, 1, 2])
+    assert github.requests == {("POST", "/graphql"): 1}
+    assert [pull["number"] for pull in pulls] == [3, 1, 2]
+    assert pulls[1] == {
+        "number": 1,
+        "title": "PR 1",
+        "state": "open",
+        "head": {"ref": "branch-1", "sha": "1" * 40},
+    }
+
+
+def test_get_pulls_matches_rest(github):
+    for number in (1, 2):
+        github.add_pull(
+            REPO, number, str(number) * 40, f"branch-{number}", f"PR {number}"
+        )
+    batched = get_client("token", github.url, graphql=True).get_pulls(REPO, [1, 2])
+    rest = get_client("token", github.url).get_pulls(REPO, [1, 2])
+    assert github.requests[("GET", f"/repos/{REPO}/pulls/1")] == 1
+    for pull, rest_pull in zip(batched, rest):
+        assert pull == {key: rest_pull[key] for key in pull}
+        assert pull["head"] == {key: rest_pull["head"][key] for key in ("ref", "sha")}
+
+
+def test_get_pulls_raises_graphql_errors(github):
+    github.add_pull(REPO, 1, "1" * 40, "branch-1")
+    with pytest.raises(RuntimeError, match="Could not resolve"):
+        get_client("token", github.url, graphql=True).get_pulls(REPO, [1, 404])
@@ -0,0 +1,75 @@
+import json
+import xml.etree.ElementTree as ET
+
+from merge_shard_results import merge_junit, merge_reports
+
+
+def write_shard(tmp_path, shard, names, examples=None, fingerprint="abc"):
+    """JUnit file of one shard of two, with one testcase per name."""
+    suite = ET.Element("testsuite", name="pytest", tests=str(len(names)))
+    properties = ET.SubElement(suite, "properties")
+    manifest = {
+        "shard": f"{shard}/2",
+        "fingerprint": fingerprint,
+        "examples": len(names) if examples is None else examples,
+        "total_examples": 4,
+    }
+    for name, value in manifest.items():
+        ET.SubElement(properties, "property", name=f"docs_{name}", value=str(value))
+    for name in names:
+        ET.SubElement(
+            suite, "testcase", classname="test_code_examples", name=f"test[{name}]"
+        )
+    path = tmp_path / f"shard-{shard}-{fingerprint}.xml"
+    ET.ElementTree(suite).write(path)
+    return path
+
+
+def test_complete_shards_merge(tmp_path):
+    paths = [
+        write_shard(tmp_path, 1, ["a", "b"]),
+        write_shard(tmp_path, 2, ["c", "d"]),
+    ]
+    assert merge_junit(paths, tmp_path / "junit.xml") == []
+    merged = ET.parse(tmp_path / "junit.xml").getroot()
+    assert len(merged.findall("testsuite/testcase")) == 4
+
+
+def test_shard_missing_examples_fails(tmp_path):
+    paths = [
+        write_shard(tmp_path, 1, ["a", "b"]),
+        write_shard(tmp_path, 2, ["c"], examples=2),
+    ]
+    assert merge_junit(paths, tmp_path / "junit.xml") == [
+        "shard 2/2 reported 1 examples but was assigned 2"
+    ]
+
+
+def test_mismatched_partitions_and_missing_shards_fail(tmp_path):
+    paths = [
+        write_shard(tmp_path, 1, ["a", "b"]),
+        write_shard(tmp_path, 1, ["c", "d"], fingerprint="def"),
+    ]
+    assert merge_junit(paths, tmp_path / "junit.xml") == [
+        "shards used different partitions: abc, def",
+        "missing shards: 2/2",
+        "shards given more than once: 1/2",
+    ]
+
+
+def test_reports_keep_each_shards_import_times(tmp_path):
+    paths = []
+    for shard, label in [(1, "a"), (2, "b")]:
+        manifest = {"shard": f"{shard}/2", "fingerprint": "abc"}
+        report = {
+            "sdk_rev": "rev",
+            "examples": {label: {"wall_time": 1.0}},
+            "import_time": {"gw0": float(shard)},
+            "shard": manifest,
+        }
+        paths.append(tmp_path / f"report-{shard}.json")
+        paths[-1].write_text(json.dumps(report))
+    assert merge_reports(paths, tmp_path / "report.json") == []
+    merged = json.loads((tmp_path / "report.json").read_text())
+    assert merged["import_time"] == {"1/2 gw0": 1.0, "2/2 gw0": 2.0}
+    assert set(merged["examples"]) == {"a", "b"}
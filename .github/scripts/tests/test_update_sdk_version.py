@@ -0,0 +1,67 @@
+import pytest
+
+from update_sdk_version import locate_source_fields, parse_update, patch_sources
+
+PYPROJECT = """\
+[project]
+name = "docs-test"  # rev = "not this one"
+
+[tool.uv.sources]
+# pinned by the bump workflow
+portia-sdk-python = { git = "https://github.com/portiaAI/portia-sdk-python.git", rev = "old" }
+'other' = {git='https://example.com/other.git',tag='v1'}
+
+[tool.uv.sources.third]
+git = "https://example.com/third.git"
+rev = 'abc'   # keep this comment
+"""
+
+
+def test_locates_inline_and_sub_table_fields():
+    fields = locate_source_fields(PYPROJECT)
+    assert {key: value for key, (_, _, value) in fields.items()} == {
+        (
+            "portia-sdk-python",
+            "git",
+        ): "https://github.com/portiaAI/portia-sdk-python.git",
+        ("portia-sdk-python", "rev"): "old",
+        ("other", "git"): "https://example.com/other.git",
+        ("other", "tag"): "v1",
+        ("third", "git"): "https://example.com/third.git",
+        ("third", "rev"): "abc",
+    }
+    start, end, value = fields[("third", "rev")]
+    assert PYPROJECT[start:end] == value
+
+
+def test_patches_only_the_value_spans():
+    updates = {
+        ("portia-sdk-python", "rev"): "0123abcd",
+        ("other", "tag"): "v2.0.0",
+        ("third", "rev"): "def",
+    }
+    patched = patch_sources(PYPROJECT, updates)
+    expected = (
+        PYPROJECT.replace('rev = "old"', 'rev = "0123abcd"')
+        .replace("tag='v1'", "tag='v2.0.0'")
+        .replace("rev = 'abc'", "rev = 'def'")
+    )
+    assert patched == expected
+
+
+def test_rejects_missing_fields():
+    with pytest.raises(ValueError, match="Could not find third.tag"):
+        patch_sources(PYPROJECT, {("third", "tag"): "v1"})
+
+
+def test_rejects_values_that_break_the_toml():
+    with pytest.raises(ValueError, match="doesn't match"):
+        patch_sources(PYPROJECT, {("portia-sdk-python", "rev"): 'a", tag = "b'})
+
+
+def test_parse_update_defaults_to_rev():
+    assert parse_update("portia-sdk-python=abc") == (
+        ("portia-sdk-python", "rev"),
+        "abc",
+    )
+    assert parse_update("other.tag=v1.2.0") == (("other", "tag"), "v1.2.0")
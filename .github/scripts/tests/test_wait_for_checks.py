@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import wait_for_checks
+from github_client import get_client
+from wait_for_checks import wait_for_checks as wait
+
+REPO = "owner/repo"
+SHA = "a" * 40
+REQUIRED = "Check code examples in docs"
+
+
+@pytest.fixture(autouse=True)
+def short_grace(monkeypatch):
+    monkeypatch.setattr(wait_for_checks, "CHECKS_START_GRACE_SECONDS", 0.5)
+
+
+def run(github, **kwargs):
+    options = {"timeout_minutes": 0.025, "wait_seconds": 1, "token": "token"}
+    return wait(REPO, 1, api_url=github.url, **{**options, **kwargs})
+
+
+def test_waits_out_the_grace_period_when_checks_already_passed(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    start = time.monotonic()
+    assert run(github) == "success"
+    assert time.monotonic() - start >= 0.5
+
+
+def test_waits_for_required_checks_to_register(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    polls = []
+
+    def register_late(method, path):
+        if path.endswith("/check-runs"):
+            polls.append(path)
+        if len(polls) == 3:
+            github.set_check_run(REPO, SHA, REQUIRED, "completed", "success")
+
+    github.on_request = register_late
+    assert run(github, require_checks=[REQUIRED]) == "success"
+    assert len(polls) >= 3
+
+
+def test_times_out_without_required_checks(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    assert run(github, require_checks=[REQUIRED]) == "timeout"
+
+
+def test_unknown_mergeable_state_is_not_ready(github):
+    github.add_pull(
+        REPO, 1, head_sha=SHA, head_ref="feature", mergeable_state="unknown"
+    )
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    assert run(github) == "timeout"
+
+
+def test_times_out_while_checks_are_pending(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "tests", status="in_progress")
+    assert run(github) == "timeout"
+
+
+def test_reports_failures(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    github.set_status(REPO, SHA, "deploy", state="failure")
+    assert run(github) == "failure"
+
+
+def test_ignored_checks_dont_fail_the_pr(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_status(REPO, SHA, "Vercel", state="failure")
+    github.set_check_run(REPO, SHA, "lint", status="completed", conclusion="success")
+    assert run(github, ignore_checks=["vercel"]) == "success"
+
+
+def test_unchanged_polls_are_not_modified(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    github.set_check_run(REPO, SHA, "tests", status="in_progress")
+    assert run(github) == "timeout"
+    polls = github.requests[("GET", f"/repos/{REPO}/pulls/1")]
+    assert polls > 1
+    # Every poll after the first gets a 304 for the PR, statuses and check runs.
+    assert get_client("token", github.url).not_modified == 3 * (polls - 1)
+
+
+def test_reads_every_page_of_check_runs(github):
+    github.add_pull(REPO, 1, head_sha=SHA, head_ref="feature")
+    for i in range(150):
+        github.set_check_run(REPO, SHA, f"check {i}", "completed", "success")
+    github.set_check_run(REPO, SHA, "last", status="completed", conclusion="failure")
+    assert run(github) == "failure"
+    assert github.requests[("GET", f"/repos/{REPO}/commits/{SHA}/check-runs")] == 2
+
+
+def test_get_all_follows_links(github):
+    sha = "a" * 40
+    for i in range(250):
+        github.set_status(REPO, sha, f"context {i}", "success")
+    client = get_client("token", github.url)
+    path = f"/repos/{REPO}/commits/{sha}/status"
+    assert len(client.get_all(path, key="statuses")) == 250
+    assert len(client.get_all(path, key="statuses")) == 250
+    assert github.requests[("GET", path)] == 6
+    assert client.not_modified == 3
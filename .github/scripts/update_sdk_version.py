@@ -1,106 +1,229 @@
 #!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#   "requests",
+# ]
+# ///
 """
 Script to update the portia-sdk-python commit hash in pyproject.toml.
 
 Usage:
     uv run .github/scripts/update_sdk_version.py <new_commit_hash>
     uv run .github/scripts/update_sdk_version.py --latest  # Fetch latest from GitHub API
+    uv run .github/scripts/update_sdk_version.py --latest --check  # Print it, exit 3 if already pinned
+    uv run .github/scripts/update_sdk_version.py --set portia-sdk-python.rev=<hash> --set other-package.tag=v1.2.0
+
+Only the targeted values in [tool.uv.sources] are rewritten; the rest of the file,
+including comments and formatting, is left byte-for-byte as it was. If a uv.lock sits
+next to pyproject.toml, just the changed packages are re-locked.
 """
 
 import argparse
+import difflib
+import os
 import re
+import shutil
+import subprocess
 import sys
+import tempfile
+import tomllib
 import requests
 from pathlib import Path
 
+from github_client import get_client
+
+SDK_PACKAGE = "portia-sdk-python"
+SDK_REPO = "portiaAI/portia-sdk-python"
+# Where the ETag of the last commit lookup is kept between runs
+DEFAULT_CACHE_PATH = ".sdk-commit-cache.json"
+# Exit code for --check when pyproject.toml already pins the latest commit
+NO_CHANGE_EXIT_CODE = 3
+SOURCES_TABLE = ("tool", "uv", "sources")
+
+_TABLE_HEADER = re.compile(r'^\s*\[\s*([^\[\]]+?)\s*\]\s*(#.*)?$')
+_KEY = r'(?:"([^"]+)"|\'([^\']+)\'|([A-Za-z0-9_-]+))'
+_ENTRY = re.compile(rf'^\s*{_KEY}\s*=\s*(.*)$')
+_STRING_VALUE = r'\s*=\s*(?:"([^"]*)"|\'([^\']*)\')'
+
+
+def _split_key_path(path):
+    """Split a dotted TOML key path such as tool.uv."sources" into its parts."""
+    return tuple(next(g for g in match.groups() if g is not None) for match in re.finditer(_KEY, path))
+
+
+def locate_source_fields(content):
+    """Find every string field of every [tool.uv.sources] entry in one pass.
+
+    Handles both inline tables (`pkg = { git = "...", rev = "..." }`) and sub-tables
+    (`[tool.uv.sources.pkg]`). Returns {(package, field): (start, end, value)} where
+    start/end are the offsets of the value between its quotes.
+    """
+    fields = {}
+    table = ()
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        header = _TABLE_HEADER.match(line)
+        if header:
+            table = _split_key_path(header.group(1))
+        elif table == SOURCES_TABLE:
+            entry = _ENTRY.match(line)
+            if entry:
+                package = next(g for g in entry.groups()[:3] if g is not None)
+                value_start = offset + entry.start(4)
+                for field in re.finditer(rf'{_KEY}{_STRING_VALUE}', entry.group(4)):
+                    _record(fields, package, field, value_start)
+        elif table[:3] == SOURCES_TABLE and len(table) == 4:
+            field = re.match(rf'\s*{_KEY}{_STRING_VALUE}', line)
+            if field:
+                _record(fields, table[3], field, offset)
+        offset += len(line)
+    return fields
+
+
+def _record(fields, package, match, base):
+    name = next(g for g in match.groups()[:3] if g is not None)
+    group = 4 if match.group(4) is not None else 5
+    fields[(package, name)] = (base + match.start(group), base + match.end(group), match.group(group))
+
+
+def patch_sources(content, updates):
+    """Apply {(package, field): value} to the [tool.uv.sources] entries in content.
+
+    Returns the patched content, or raises ValueError if a field doesn't exist or the
+    result doesn't parse to exactly the requested change.
+    """
+    fields = locate_source_fields(content)
+    missing = [f"{package}.{field}" for package, field in updates if (package, field) not in fields]
+    if missing:
+        found = ", ".join(f"{package}.{field}" for package, field in fields) or "none"
+        raise ValueError(f"Could not find {', '.join(missing)} in [tool.uv.sources] (found: {found})")
+
+    patched = content
+    # Replace from the end of the file backwards so earlier offsets stay valid
+    for key in sorted(updates, key=lambda key: fields[key][0], reverse=True):
+        start, end, _ = fields[key]
+        patched = patched[:start] + updates[key] + patched[end:]
 
-def get_latest_commit():
-    """Fetch the latest commit hash from portiaAI/portia-sdk-python main branch."""
+    expected = tomllib.loads(content)
+    sources = expected["tool"]["uv"]["sources"]
+    for (package, field), value in updates.items():
+        sources[package][field] = value
+    if tomllib.loads(patched) != expected:
+        raise ValueError("Patched pyproject.toml doesn't match the requested changes")
+    return patched
+
+
+def write_atomically(path, content):
+    """Write via a temporary file in the same directory and rename it over path."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
     try:
-        response = requests.get(
-            "https://api.github.com/repos/portiaAI/portia-sdk-python/commits/main",
-            timeout=10
-        )
-        response.raise_for_status()
-        return response.json()["sha"]
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def relock(pyproject_file, packages):
+    """Re-lock only the changed packages, if the project has a lockfile."""
+    if not (pyproject_file.parent / "uv.lock").exists():
+        print("ℹ️ No uv.lock next to pyproject.toml, skipping lock update")
+        return
+    command = ["uv", "lock"]
+    for package in sorted(packages):
+        command += ["--upgrade-package", package]
+    print(f"🔒 Running: {' '.join(command)}")
+    try:
+        subprocess.run(command, cwd=pyproject_file.parent, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error updating uv.lock: {e}")
+        sys.exit(1)
+
+
+def get_latest_commit(token=None, cache_path=DEFAULT_CACHE_PATH):
+    """Fetch the latest commit hash from portiaAI/portia-sdk-python main branch.
+
+    The request is conditional on the ETag cached in cache_path by the previous run,
+    so if main hasn't moved GitHub answers 304 and the cached SHA is used.
+    """
+    client = get_client(token, cache_path=Path(cache_path) if cache_path else None)
+    try:
+        sha = client.get(f"/repos/{SDK_REPO}/commits/main")["sha"]
     except requests.RequestException as e:
-        print(f"Error fetching latest commit: {e}")
+        print(f"Error fetching latest commit: {e}", file=sys.stderr)
         sys.exit(1)
+    if client.not_modified:
+        print("♻️ main is unchanged since the last lookup, using cached commit", file=sys.stderr)
+    try:
+        client.save_cache()
+    except OSError as e:
+        print(f"Warning: could not save commit cache: {e}", file=sys.stderr)
+    return sha
+
+
+def get_pinned_commit(pyproject_path="pyproject.toml"):
+    """The portia-sdk-python rev currently pinned in pyproject.toml, if any."""
+    fields = locate_source_fields(Path(pyproject_path).read_text())
+    pinned = fields.get((SDK_PACKAGE, "rev"))
+    return pinned[2] if pinned else None
 
 
-def update_pyproject_toml(commit_hash, pyproject_path="pyproject.toml"):
-    """Update the portia-sdk-python commit hash in pyproject.toml."""
+def update_pyproject_toml(commit_hash=None, pyproject_path="pyproject.toml", updates=None, lock=True):
+    """Update [tool.uv.sources] entries in pyproject.toml.
+
+    commit_hash sets the portia-sdk-python rev; updates maps (package, field) to new
+    values for any other sources.
+    """
     pyproject_file = Path(pyproject_path)
     
     if not pyproject_file.exists():
         print(f"Error: {pyproject_path} not found")
         sys.exit(1)
+
+    updates = dict(updates or {})
+    if commit_hash:
+        updates[(SDK_PACKAGE, "rev")] = commit_hash
     
     try:
-        with open(pyproject_file, 'r') as f:
-            content = f.read()
-        
-        
-        # Find the line containing portia-sdk-python in [tool.uv.sources]
-        lines = content.split('\n')
-        updated_lines = []
-        found = False
-        
-        for line in lines:
-            if 'portia-sdk-python' in line and 'rev = "' in line:
-                # Extract the current commit hash
-                current_match = re.search(r'rev = "([a-f0-9]+)"', line)
-                if current_match:
-                    current_hash = current_match.group(1)
-                    # Replace just the commit hash
-                    updated_line = line.replace(f'rev = "{current_hash}"', f'rev = "{commit_hash}"')
-                    updated_lines.append(updated_line)
-                    found = True
-                    print(f"🔍 Found and updated line: {line.strip()}")
-                    print(f"📝 Updated to: {updated_line.strip()}")
-                else:
-                    updated_lines.append(line)
-            else:
-                updated_lines.append(line)
-        
-        if not found:
-            print("Error: Could not find portia-sdk-python dependency with rev in pyproject.toml")
-            print("Looking for lines containing 'portia-sdk-python':")
-            for i, line in enumerate(lines):
-                if 'portia-sdk-python' in line:
-                    print(f"Line {i+1}: {line}")
-            sys.exit(1)
-        
-        updated_content = '\n'.join(updated_lines)
+        content = pyproject_file.read_text()
+        updated_content = patch_sources(content, updates)
         
         # Verify the replacement worked
         if updated_content == content:
             print("Error: No changes were made to pyproject.toml")
-            print("Current content:")
-            print(content)
             sys.exit(1)
         
-        # Write the updated content back
-        with open(pyproject_file, 'w') as f:
-            f.write(updated_content)
-        
-        print(f"✅ Successfully updated pyproject.toml with commit: {commit_hash}")
+        write_atomically(pyproject_file, updated_content)
         
-        # Show the updated line for verification
-        lines = updated_content.split('\n')
-        for i, line in enumerate(lines):
-            if 'portia-sdk-python' in line:
-                print(f"Updated line {i+1}: {line.strip()}")
-                break
-        
-        # Show the full updated content for debugging
-        print("\n📄 Updated pyproject.toml content:")
-        print(updated_content)
-                
-    except Exception as e:
+        print(f"✅ Successfully updated {pyproject_path}:")
+        diff = difflib.unified_diff(
+            content.splitlines(), updated_content.splitlines(),
+            f"a/{pyproject_path}", f"b/{pyproject_path}", n=0, lineterm=""
+        )
+        for line in diff:
+            print(line)
+    except (ValueError, tomllib.TOMLDecodeError, OSError) as e:
         print(f"Error updating pyproject.toml: {e}")
         sys.exit(1)
 
+    if lock:
+        original = locate_source_fields(content)
+        changed = {package for (package, field), value in updates.items() if original[(package, field)][2] != value}
+        relock(pyproject_file, changed)
+
+
+def parse_update(text):
+    """Parse PACKAGE[.FIELD]=VALUE, with FIELD defaulting to rev."""
+    target, sep, value = text.partition("=")
+    if not sep or not target or not value:
+        raise argparse.ArgumentTypeError(f"Expected PACKAGE[.FIELD]=VALUE, got {text!r}")
+    # Package names can't contain dots, so anything after the first one is the field
+    package, _, field = target.partition(".")
+    return (package, field or "rev"), value
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -116,29 +239,69 @@ def main():
         action="store_true",
         help="Fetch the latest commit hash from GitHub API"
     )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=f"Only print the commit hash, exiting {NO_CHANGE_EXIT_CODE} if pyproject.toml already pins it"
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=DEFAULT_CACHE_PATH,
+        help=f"File caching the last --latest lookup for conditional requests (default: {DEFAULT_CACHE_PATH})"
+    )
+    parser.add_argument(
+        "--token",
+        default=os.getenv("GITHUB_TOKEN"),
+        help="GitHub token for the --latest lookup (default: GITHUB_TOKEN)"
+    )
+    parser.add_argument(
+        "--set",
+        dest="updates",
+        type=parse_update,
+        action="append",
+        default=[],
+        metavar="PACKAGE[.FIELD]=VALUE",
+        help="Update another [tool.uv.sources] field (FIELD defaults to rev); can be repeated"
+    )
     parser.add_argument(
         "--pyproject-path",
         default="pyproject.toml",
         help="Path to pyproject.toml file (default: pyproject.toml)"
     )
+    parser.add_argument(
+        "--no-lock",
+        action="store_true",
+        help="Don't update uv.lock for the changed packages"
+    )
     
     args = parser.parse_args()
     
+    commit_hash = None
     if args.latest:
-        commit_hash = get_latest_commit()
-        print(f"📥 Fetched latest commit: {commit_hash}")
+        commit_hash = get_latest_commit(args.token, args.cache_path)
+        print(f"📥 Fetched latest commit: {commit_hash}", file=sys.stderr if args.check else sys.stdout)
     elif args.commit_hash:
         commit_hash = args.commit_hash
         # Validate commit hash format (basic check)
         if not re.match(r'^[a-f0-9]{40}$', commit_hash):
-            print("Warning: Commit hash doesn't look like a valid SHA-1 hash")
-    else:
-        print("Error: Either provide a commit hash or use --latest flag")
+            print("Warning: Commit hash doesn't look like a valid SHA-1 hash", file=sys.stderr if args.check else sys.stdout)
+    elif not args.updates:
+        print("Error: Either provide a commit hash, use --latest or --set")
         parser.print_help()
         sys.exit(1)
+
+    if args.check:
+        if commit_hash is None:
+            parser.error("--check needs a commit hash or --latest")
+        # stdout holds just the hash so workflows can capture it
+        print(commit_hash)
+        if commit_hash == get_pinned_commit(args.pyproject_path):
+            print(f"✅ {args.pyproject_path} already pins {commit_hash}, nothing to do", file=sys.stderr)
+            sys.exit(NO_CHANGE_EXIT_CODE)
+        return
     
-    update_pyproject_toml(commit_hash, args.pyproject_path)
+    update_pyproject_toml(commit_hash, args.pyproject_path, dict(args.updates), lock=not args.no_lock)
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
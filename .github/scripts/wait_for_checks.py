@@ -1,6 +1,6 @@
 # /// script
 # dependencies = [
-#   "PyGithub",
+#   "requests",
 #   "python-dotenv",
 # ]
 # ///
@@ -8,42 +8,107 @@
 import os
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from github import Github
 from dotenv import load_dotenv
 
+from github_client import GitHubClient, get_client
+
 load_dotenv(override=True)
 
+# Checks take a few seconds to register after a push, and some register before
+# others, so no PR is treated as passing until this long after we started waiting.
+CHECKS_START_GRACE_SECONDS = 30
+# Bounds on the adaptive poll interval, as fractions/multiples of --wait-seconds
+MIN_INTERVAL_FACTOR = 0.25
+MAX_INTERVAL_FACTOR = 4
+BACKOFF = 1.5
+# Below this many remaining requests, polls are spread out until the limit resets
+LOW_RATE_LIMIT = 100
+
+PENDING_CHECK_RUN_STATUSES = ["queued", "in_progress", "waiting", "requested", "pending"]
+# GitHub computes mergeability in the background and reports "unknown" until then
+PENDING_MERGEABLE_STATES = ["unknown", "unstable"]
+
+
+def fetch_state(client: GitHubClient, executor: ThreadPoolExecutor, repo_name: str, pr_number: int, head_sha: Optional[str]) -> tuple[dict, list[dict], list[dict]]:
+    """Fetch the PR, its statuses and its check runs concurrently
+
+    The status and check run requests use the head SHA from the previous poll. If the
+    PR has moved on to a new commit since then, they're fetched again for the new one.
+    Statuses and check runs are read from every page.
+    """
+    pull_future = executor.submit(client.get, f"/repos/{repo_name}/pulls/{pr_number}")
+    if head_sha is None:
+        head_sha = pull_future.result()["head"]["sha"]
+    status_future = executor.submit(client.get_all, f"/repos/{repo_name}/commits/{head_sha}/status", key="statuses")
+    runs_future = executor.submit(client.get_all, f"/repos/{repo_name}/commits/{head_sha}/check-runs", key="check_runs")
+    pull = pull_future.result()
+    if pull["head"]["sha"] != head_sha:
+        return fetch_state(client, executor, repo_name, pr_number, pull["head"]["sha"])
+    return pull, status_future.result(), runs_future.result()
+
+
+def next_interval(interval: float, wait_seconds: int, progressed: bool, client: GitHubClient) -> float:
+    """Pick how long to sleep before the next poll
+
+    Polls come back quickly while checks are finishing and back off while nothing
+    changes. If the rate limit is running low, the remaining requests are spread over
+    the time until it resets.
+    """
+    if progressed:
+        interval = wait_seconds * MIN_INTERVAL_FACTOR
+    else:
+        interval = min(interval * BACKOFF, wait_seconds * MAX_INTERVAL_FACTOR)
+    remaining = client.rate_limit_remaining
+    if remaining is not None and remaining < LOW_RATE_LIMIT:
+        # Each poll costs up to three requests
+        polls_left = max(remaining // 3, 1)
+        interval = max(interval, client.seconds_until_reset() / polls_left)
+    return interval
+
+
 def wait_for_checks(
     repo_name: str, 
     pr_number: int, 
     timeout_minutes: int = 30,
     wait_seconds: int = 30,
     ignore_checks: Optional[List[str]] = None,
-    token: str = None
+    require_checks: Optional[List[str]] = None,
+    token: str = None,
+    api_url: Optional[str] = None,
 ) -> str:
     """Wait for PR checks to complete
     
     This function waits for all status checks and GitHub Actions checks to complete
     for a given pull request. It supports ignoring specific checks and has configurable
-    timeout and wait intervals.
+    timeout and wait intervals. Success needs every check in require_checks to have
+    registered and passed, and is never reported before CHECKS_START_GRACE_SECONDS,
+    since checks register one by one after a push.
+
+    Each poll fetches the PR, statuses and check runs concurrently using conditional
+    requests, so polls where nothing changed don't use up the rate limit. The interval
+    between polls adapts around wait_seconds, and the function returns as soon as the
+    checks reach a terminal state.
     
     Args:
         repo_name: The repository name in format 'owner/repo'
         pr_number: The pull request number
         timeout_minutes: Maximum time to wait in minutes (default: 30)
-        wait_seconds: Time to wait between checks in seconds (default: 30)
+        wait_seconds: Typical time to wait between checks in seconds (default: 30)
         ignore_checks: List of check names to ignore (default: None)
+        require_checks: Check names that must be present and pass (default: None)
+        api_url: GitHub API root, e.g. a local fake server (default: GITHUB_API_URL or api.github.com)
     
     Returns:
         str: Status result - 'success', 'failure', or 'timeout'
     """
     if ignore_checks is None:
         ignore_checks = []
+    ignore_checks = [check.lower() for check in ignore_checks]
+    require_checks = [check.lower() for check in require_checks or []]
     
-    github = Github(token)
-    repo = github.get_repo(repo_name)
-    pr = repo.get_pull(pr_number)
+    client = get_client(token, api_url)
     
     print(f"Waiting for PR #{pr_number} checks to complete...")
     print(f"Repository: {repo_name}")
@@ -51,97 +116,111 @@ def wait_for_checks(
     print(f"Check interval: {wait_seconds} seconds")
     if ignore_checks:
         print(f"Ignoring checks: {', '.join(ignore_checks)}")
+    if require_checks:
+        print(f"Requiring checks: {', '.join(require_checks)}")
     
-    # Wait for checks to start
-    print("Waiting 30 seconds for checks to start...")
-    time.sleep(30)
-    
-    # Calculate max attempts based on timeout
-    max_attempts = (timeout_minutes * 60) // wait_seconds
+    start = time.monotonic()
+    deadline = start + timeout_minutes * 60
+    interval = wait_seconds * MIN_INTERVAL_FACTOR
+    head_sha = None
+    last_counts = None
+    attempt = 0
     
-    for attempt in range(1, max_attempts + 1):
-        print(f"\nCheck status (attempt {attempt}/{max_attempts}):")
-        
-        # Get the PR's head SHA
-        pr_head_sha = pr.head.sha
-        
-        # Get status checks (external checks like Vercel)
-        status_response = repo.get_commit(pr_head_sha).get_statuses()
-        status_checks = list(status_response)
-        
-        # Get GitHub Actions check runs
-        check_runs = repo.get_commit(pr_head_sha).get_check_runs()
-        
-        # Filter out ignored checks
-        status_checks = [check for check in status_checks if check.context.lower() not in ignore_checks]
-        check_runs = [run for run in check_runs if run.name.lower() not in ignore_checks]
-        
-        # Count status checks by state
-        status_total = len(status_checks)
-        status_success = len([c for c in status_checks if c.state == "success"])
-        status_pending = len([c for c in status_checks if c.state == "pending"])
-        status_failure = len([c for c in status_checks if c.state in ["failure", "error"]])
-        
-        # Count GitHub Actions checks by status
-        checks_total = len(check_runs)
-        checks_success = len([r for r in check_runs if r.conclusion == "success"])
-        checks_pending = len([r for r in check_runs if r.status in ["in_progress", "queued"]])
-        checks_failure = len([r for r in check_runs if r.conclusion in ["failure", "cancelled", "timed_out"]])
-        
-        # Combined totals
-        total_checks = status_total + checks_total
-        total_success = status_success + checks_success
-        total_pending = status_pending + checks_pending
-        total_failure = status_failure + checks_failure
-        
-        print(f"  External status checks: {status_total} total, {status_success} success, {status_pending} pending, {status_failure} failed")
-        print(f"  GitHub Actions checks: {checks_total} total, {checks_success} success, {checks_pending} pending, {checks_failure} failed")
-        print(f"  Combined: {total_checks} total, {total_success} success, {total_pending} pending, {total_failure} failed")
-        
-        # Show pending external checks for debugging
-        if status_pending > 0:
-            print("  Pending external checks:")
-            for check in status_checks:
-                if check.state == "pending":
-                    print(f"    - {check.context} ({check.state})")
-        
-        # Show pending GitHub Actions checks for debugging
-        if checks_pending > 0:
-            print("  Pending GitHub Actions checks:")
-            for run in check_runs:
-                if run.status in ["in_progress", "queued"]:
-                    print(f"    - {run.name} ({run.status})")
-        
-        # Check PR's mergeable state
-        pr = repo.get_pull(pr_number) # Refresh to get latest mergeable state
-        mergeable_state = pr.mergeable_state
-        print(f"  PR mergeable state: {mergeable_state}")
-        
-        # Check if all required status checks are complete
-        if total_pending == 0 and total_failure == 0 and mergeable_state != "unstable":
-            print("All checks passed and PR is ready to merge!")
-            return "success"
-        elif total_failure > 0:
-            print("Checks failed!")
-            return "failure"
-        elif attempt == max_attempts:
-            print("Timeout waiting for checks to complete")
-            return "timeout"
-        
-        # Wait before next check
-        if attempt < max_attempts:
-            print(f"Waiting {wait_seconds} seconds before next check...")
-            time.sleep(wait_seconds)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        while True:
+            attempt += 1
+            print(f"\nCheck status (attempt {attempt}, {time.monotonic() - start:.0f}s elapsed):")
+            
+            pr, statuses, all_check_runs = fetch_state(client, executor, repo_name, pr_number, head_sha)
+            head_sha = pr["head"]["sha"]
+            
+            # The combined status holds the latest status for each context (external checks like Vercel)
+            status_checks = [check for check in statuses if check["context"].lower() not in ignore_checks]
+            # GitHub Actions check runs
+            check_runs = [run for run in all_check_runs if run["name"].lower() not in ignore_checks]
+            
+            # Count status checks by state
+            status_total = len(status_checks)
+            status_success = len([c for c in status_checks if c["state"] == "success"])
+            status_pending = len([c for c in status_checks if c["state"] == "pending"])
+            status_failure = len([c for c in status_checks if c["state"] in ["failure", "error"]])
+            
+            # Count GitHub Actions checks by status
+            checks_total = len(check_runs)
+            checks_success = len([r for r in check_runs if r["conclusion"] == "success"])
+            checks_pending = len([r for r in check_runs if r["status"] in PENDING_CHECK_RUN_STATUSES])
+            checks_failure = len([r for r in check_runs if r["conclusion"] in ["failure", "cancelled", "timed_out"]])
+            
+            # Combined totals
+            total_checks = status_total + checks_total
+            total_success = status_success + checks_success
+            total_pending = status_pending + checks_pending
+            total_failure = status_failure + checks_failure
+            
+            print(f"  External status checks: {status_total} total, {status_success} success, {status_pending} pending, {status_failure} failed")
+            print(f"  GitHub Actions checks: {checks_total} total, {checks_success} success, {checks_pending} pending, {checks_failure} failed")
+            print(f"  Combined: {total_checks} total, {total_success} success, {total_pending} pending, {total_failure} failed")
+            
+            # Show pending external checks for debugging
+            if status_pending > 0:
+                print("  Pending external checks:")
+                for check in status_checks:
+                    if check["state"] == "pending":
+                        print(f"    - {check['context']} ({check['state']})")
+            
+            # Show pending GitHub Actions checks for debugging
+            if checks_pending > 0:
+                print("  Pending GitHub Actions checks:")
+                for run in check_runs:
+                    if run["status"] in PENDING_CHECK_RUN_STATUSES:
+                        print(f"    - {run['name']} ({run['status']})")
+            
+            mergeable_state = pr["mergeable_state"]
+            print(f"  PR mergeable state: {mergeable_state}")
+            if client.rate_limit_remaining is not None:
+                print(f"  Rate limit remaining: {client.rate_limit_remaining} ({client.not_modified} unchanged responses so far)")
+            
+            registered = {check["context"].lower() for check in status_checks} | {run["name"].lower() for run in check_runs}
+            missing = [check for check in require_checks if check not in registered]
+            if missing:
+                print(f"  Required checks not registered yet: {', '.join(missing)}")
+            grace_over = time.monotonic() - start >= CHECKS_START_GRACE_SECONDS
+            
+            # Check if all required status checks are complete
+            if (grace_over and not missing and total_pending == 0 and total_failure == 0
+                    and mergeable_state not in PENDING_MERGEABLE_STATES):
+                print("All checks passed and PR is ready to merge!")
+                return "success"
+            elif total_failure > 0:
+                print("Checks failed!")
+                return "failure"
+            
+            counts = (head_sha, total_checks, total_success, total_pending, mergeable_state)
+            interval = next_interval(interval, wait_seconds, counts != last_counts, client)
+            last_counts = counts
+            
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                print("Timeout waiting for checks to complete")
+                return "timeout"
+            
+            # Wait before next check, polling one last time at the deadline
+            sleep_for = min(interval, remaining_time)
+            print(f"Waiting {sleep_for:.0f} seconds before next check...")
+            time.sleep(sleep_for)
 
 def main():
     parser = argparse.ArgumentParser(description="Wait for PR checks to complete")
     parser.add_argument("--repo-name", type=str, required=True, help="Repository name in format 'owner/repo'")
     parser.add_argument("--pr-number", type=int, required=True, help="Pull request number")
     parser.add_argument("--timeout-minutes", type=int, default=30, help="Maximum time to wait in minutes (default: 30)")
-    parser.add_argument("--wait-seconds", type=int, default=30, help="Time to wait between checks in seconds (default: 30)")
+    parser.add_argument("--wait-seconds", type=int, default=30, help="Typical time to wait between checks in seconds (default: 30)")
     parser.add_argument("--ignore-checks", type=str, nargs="*", default=[], help="List of check names to ignore")
+    parser.add_argument("--require-checks", type=str, nargs="*", default=[], help="Check names that must be present and pass before reporting success")
     parser.add_argument("--token", type=str, help="GitHub token")
+    parser.add_argument("--api-url", type=str, help="GitHub API URL, e.g. a local fake API server (default: GITHUB_API_URL or https://api.github.com)")
     args = parser.parse_args()
+    token = args.token or os.getenv("DEPLOY_PAT_TOKEN")
 
     try:
         result = wait_for_checks(
@@ -150,9 +229,12 @@ def main():
             timeout_minutes=args.timeout_minutes,
             wait_seconds=args.wait_seconds,
             ignore_checks=args.ignore_checks,
-            token=args.token or os.getenv("DEPLOY_PAT_TOKEN")
+            require_checks=args.require_checks,
+            token=token,
+            api_url=args.api_url,
         )
         print(f"\nFinal result: {result}")
+        get_client(token, args.api_url).print_stats()
         # Return different exit codes for different states
         if result == "success":
             exit(0)
@@ -167,4 +249,4 @@ def main():
         exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
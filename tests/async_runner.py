@@ -0,0 +1,264 @@
+"""Run the async examples of a worker concurrently on one shared event loop.
+
+Enabled with `--async-concurrency=N` (N > 1). Async examples (those calling
+`asyncio.run`) that need the same patches are ordered next to each other. When the
+first one runs, it starts the whole batch on a pool of N threads. Every
+`asyncio.run(...)` in the examples is served by one event loop running in a background
+thread, so the examples' network waits overlap. Each test in the batch then just waits
+for its own result.
+
+Only the awaiting overlaps: the synchronous parts of the examples run one at a time,
+since pytest-examples swaps `sys.modules["__main__"]` for each module it executes. An
+example takes its turn back, with its own `__main__`, once its coroutine is done.
+Examples that fail-fast would skip (see fail_fast.py) aren't submitted, and an example
+depending on an earlier one of its batch waits for that one's result before it starts,
+so a broken dependency skips it before it spends any LLM calls.
+
+The patches an example needs are process-wide, so a batch shares one set of them for
+as long as it runs. For the same reason this mode can't be combined with cassettes or
+the instrumentation report, which patch per example. Under xdist it needs
+`--dist loadgroup`, so that one worker runs every async example.
+"""
+
+import asyncio
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Any, Callable, ContextManager, Coroutine
+from unittest.mock import patch
+
+import pytest
+from pytest_examples import EvalExample
+
+from example_index import (
+    ExampleRecord,
+    get_example_index,
+    get_patch_names,
+    is_skip_tagged,
+)
+from result_cache import ResultCache
+from scheduling import uses_loadgroup
+
+ASYNC_GROUP = "async-examples"
+_async_key = pytest.StashKey[tuple[str, ...]]()
+
+
+def is_async_example(example: ExampleRecord) -> bool:
+    return "asyncio.run(" in example.source
+
+
+def get_example(item: pytest.Item) -> ExampleRecord | None:
+    callspec = getattr(item, "callspec", None)
+    return callspec.params.get("example") if callspec else None
+
+
+class SharedEventLoop:
+    """An event loop running in a background thread for the life of the worker."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine, **kwargs: Any) -> Any:
+        """Drop-in for `asyncio.run` that runs the coroutine on the shared loop."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class AsyncExampleRunner:
+    """Pytest plugin batching async examples onto a shared event loop."""
+
+    def __init__(self, config: pytest.Config, concurrency: int):
+        self.config = config
+        self.concurrency = concurrency
+        self._loop: SharedEventLoop | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._futures: dict[str, Future] = {}
+        # Every item of the running batch, set once the item has been reported.
+        self._reported: dict[str, threading.Event] = {}
+        self._stack: ExitStack | None = None
+        # Held by the batch thread executing module code, released while it awaits.
+        self._module_lock = threading.Lock()
+        self._holding = threading.local()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        index = get_example_index(config)
+        async_items = []
+        for item in items:
+            example = get_example(item)
+            if example is not None and is_async_example(index.resolve(example)):
+                item.stash[_async_key] = tuple(get_patch_names(example))
+                async_items.append(item)
+                if uses_loadgroup(config):
+                    item.add_marker(pytest.mark.xdist_group(name=ASYNC_GROUP))
+        if not async_items:
+            return
+        # Batches are runs of consecutive async items needing the same patches.
+        first = items.index(async_items[0])
+        rest = [item for item in items if _async_key not in item.stash]
+        async_items.sort(key=lambda item: item.stash[_async_key])
+        items[:] = rest[:first] + async_items + rest[first:]
+
+    def handles(self, item: pytest.Item) -> bool:
+        return _async_key in item.stash
+
+    def run(
+        self,
+        request: pytest.FixtureRequest,
+        eval_example: EvalExample,
+        execute: Callable[[ExampleRecord, EvalExample], None],
+        contexts: list[ContextManager],
+        result_cache: ResultCache,
+    ) -> None:
+        """Wait for the item's example, starting a batch with it first if needed."""
+        item = request.node
+        if item.nodeid not in self._futures:
+            self._start_batch(request, eval_example, execute, contexts, result_cache)
+        self._futures.pop(item.nodeid).result()
+
+    def _start_batch(
+        self,
+        request: pytest.FixtureRequest,
+        eval_example: EvalExample,
+        execute: Callable[[ExampleRecord, EvalExample], None],
+        contexts: list[ContextManager],
+        result_cache: ResultCache,
+    ) -> None:
+        self._finish_batch()
+        if self._loop is None:
+            self._loop = SharedEventLoop()
+            self._executor = ThreadPoolExecutor(self.concurrency, "async-example")
+
+        self._stack = ExitStack()
+        # The last example to finish leaves its own module as __main__.
+        self._stack.callback(
+            sys.modules.__setitem__, "__main__", sys.modules["__main__"]
+        )
+        for context in contexts:
+            self._stack.enter_context(context)
+        self._stack.enter_context(patch("asyncio.run", self._run_coroutine))
+
+        item = request.node
+        batch = [item, *self._batch_after(item)]
+        self._reported = {member.nodeid: threading.Event() for member in batch}
+        self._futures[item.nodeid] = self._executor.submit(
+            self._execute, item, [], execute, get_example(item), eval_example
+        )
+        index = get_example_index(self.config)
+        tmp_path_factory = request.getfixturevalue("tmp_path_factory")
+        fail_fast = self.config.pluginmanager.get_plugin("docs_fail_fast")
+        earlier = {str(get_example(item)): item.nodeid}
+        for member in batch[1:]:
+            example = get_example(member)
+            earlier[str(example)] = member.nodeid
+            if is_skip_tagged(example) or result_cache.is_cached(
+                index.resolve(example)
+            ):
+                continue
+            waits = []
+            if fail_fast is not None:
+                if fail_fast.skip_reason(member) is not None:
+                    continue
+                if fail_fast.dependencies:
+                    waits = [
+                        self._reported[earlier[str(dependency)]]
+                        for dependency in index.dependencies(example)
+                        if str(dependency) in earlier
+                    ]
+            member_eval_example = EvalExample(
+                tmp_path=tmp_path_factory.mktemp("async-example"),
+                pytest_request=request,
+            )
+            self._futures[member.nodeid] = self._executor.submit(
+                self._execute, member, waits, execute, example, member_eval_example
+            )
+
+    def _execute(
+        self,
+        item: pytest.Item,
+        waits: list[threading.Event],
+        execute: Callable[[ExampleRecord, EvalExample], None],
+        example: ExampleRecord,
+        eval_example: EvalExample,
+    ) -> None:
+        """Run one example of the batch, holding the module lock but while awaiting.
+
+        The pool runs the batch in order, so the dependencies waited for have started.
+        """
+        for reported in waits:
+            reported.wait()
+        with self._module_lock:
+            self._holding.value = True
+            try:
+                # A dependency may have failed since the batch was submitted.
+                fail_fast = self.config.pluginmanager.get_plugin("docs_fail_fast")
+                if fail_fast is not None:
+                    fail_fast.skip_if_blocked(item)
+                execute(example, eval_example)
+            finally:
+                self._holding.value = False
+
+    def _run_coroutine(self, coroutine: Coroutine, **kwargs: Any) -> Any:
+        """`asyncio.run` for the batch, letting other examples execute meanwhile."""
+        if not getattr(self._holding, "value", False):
+            # Called from a thread of the example's own.
+            return self._loop.run(coroutine)
+        main = sys.modules.get("__main__")
+        self._holding.value = False
+        self._module_lock.release()
+        try:
+            return self._loop.run(coroutine)
+        finally:
+            self._module_lock.acquire()
+            self._holding.value = True
+            sys.modules["__main__"] = main
+
+    def _batch_after(self, item: pytest.Item) -> list[pytest.Item]:
+        items = item.session.items
+        batch = []
+        for candidate in items[items.index(item) + 1 :]:
+            if candidate.stash.get(_async_key, None) != item.stash[_async_key]:
+                break
+            batch.append(candidate)
+        return batch
+
+    def _finish_batch(self) -> None:
+        """Wait for the running batch and lift its patches."""
+        if self._stack is None:
+            return
+        # Release the examples waiting on items that were never reported.
+        for reported in self._reported.values():
+            reported.set()
+        wait(self._futures.values())
+        self._futures.clear()
+        self._reported.clear()
+        self._stack.close()
+        self._stack = None
+
+    def pytest_runtest_setup(self, item: pytest.Item) -> None:
+        # Nothing outside the batch may run while its patches are active.
+        if item.nodeid not in self._reported:
+            self._finish_batch()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_runtest_teardown(self, item: pytest.Item) -> None:
+        # Fail-fast has marked the item broken, if it failed, by now.
+        if item.nodeid in self._reported:
+            self._reported[item.nodeid].set()
+        if not self._futures:
+            self._finish_batch()
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        self._finish_batch()
+        if self._loop is not None:
+            self._executor.shutdown()
+            self._loop.close()
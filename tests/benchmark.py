@@ -0,0 +1,230 @@
+"""Benchmark the SDK with the docs examples as workloads.
+
+Enabled with `--benchmark N`. Each example runs once to warm up (imports, caches),
+N more times to measure its latency, and once more under `tracemalloc` to measure
+the high-water mark of the memory it allocates. The p50/p90/max latency and the peak
+memory of every example are appended to a history file (`--benchmark-history`,
+one entry per SDK rev), and the run is compared against the latest entry for a
+different rev.
+
+Run it with `--cassette-mode=replay` so LLM and tool latency doesn't drown out the
+SDK's own; `--cassette-sdk-rev` replays the traffic recorded at the old rev against
+a new one, so both revs see the same responses. Print the comparison of the latest
+two revs in a history file as Markdown with
+`python tests/benchmark.py .benchmarks/history.json --markdown`.
+"""
+
+import argparse
+import json
+import math
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from example_index import is_skip_tagged
+from harness import atomic_write_bytes, pinned_sdk_rev
+from scheduling import get_label
+
+BENCHMARK_PROPERTY = "example_benchmark"
+DEFAULT_HISTORY_PATH = Path(".benchmarks", "history.json")
+MAX_HISTORY_RUNS = 20
+# An example regressed if its p50 latency or peak memory grew by more than this
+# factor, and by more than the noise floor.
+REGRESSION_FACTOR = 1.2
+NOISE_FLOORS = {"p50": 0.01, "peak_memory": 2**20}
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of `values`, with `q` between 0 and 100."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def load_history(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())["runs"]
+
+
+def previous_run(runs: list[dict[str, Any]], sdk_rev: str) -> dict[str, Any] | None:
+    """The latest run in the history for an SDK rev other than `sdk_rev`."""
+    return next((run for run in reversed(runs) if run["sdk_rev"] != sdk_rev), None)
+
+
+def compare(before: dict[str, Any], after: dict[str, Any]) -> list[dict[str, Any]]:
+    """Examples measured in both runs with their p50 and peak memory before and
+    after, regressions first and then by the change in latency."""
+    rows = []
+    for label, new in after["examples"].items():
+        old = before["examples"].get(label)
+        if old is None:
+            continue
+        regressed = [
+            metric
+            for metric, floor in NOISE_FLOORS.items()
+            if new[metric] > old[metric] * REGRESSION_FACTOR
+            and new[metric] - old[metric] > floor
+        ]
+        rows.append(
+            {"example": label, "before": old, "after": new, "regressed": regressed}
+        )
+    rows.sort(
+        key=lambda row: (
+            not row["regressed"],
+            -(row["after"]["p50"] / max(row["before"]["p50"], 1e-9)),
+        )
+    )
+    return rows
+
+
+def _change(before: float, after: float) -> str:
+    return f"{(after / before - 1) * 100:+.0f}%" if before else "n/a"
+
+
+def render_table(rows: list[dict[str, Any]], before: dict, after: dict) -> list[str]:
+    """Markdown table of the comparison, preceded by a one-line verdict."""
+    regressions = sum(1 for row in rows if row["regressed"])
+    lines = [
+        f"**{regressions} of {len(rows)} examples regressed** between "
+        f"`{before['sdk_rev'][:12]}` and `{after['sdk_rev'][:12]}` "
+        f"(p50 of {after['iterations']} runs each; more than "
+        f"{(REGRESSION_FACTOR - 1) * 100:.0f}% slower or bigger counts as a "
+        "regression)",
+        "",
+        "| example | p50 before | p50 after | change | p90 after "
+        "| peak MiB before | peak MiB after | change |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for row in rows:
+        old, new = row["before"], row["after"]
+        marker = " ⚠️" if row["regressed"] else ""
+        lines.append(
+            f"| `{row['example']}`{marker} | {old['p50'] * 1000:.0f}ms "
+            f"| {new['p50'] * 1000:.0f}ms | {_change(old['p50'], new['p50'])} "
+            f"| {new['p90'] * 1000:.0f}ms | {old['peak_memory'] / 2**20:.1f} "
+            f"| {new['peak_memory'] / 2**20:.1f} "
+            f"| {_change(old['peak_memory'], new['peak_memory'])} |"
+        )
+    return lines
+
+
+class Benchmark:
+    """Pytest plugin running each example repeatedly and recording the results."""
+
+    def __init__(self, config: pytest.Config, iterations: int, history_path: Path):
+        self.config = config
+        self.iterations = iterations
+        self.history_path = history_path
+        self.results: dict[str, dict[str, Any]] = {}
+        self.run: dict[str, Any] | None = None
+        self.baseline: dict[str, Any] | None = None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pyfunc_call(self, pyfuncitem: pytest.Function) -> bool | None:
+        callspec = getattr(pyfuncitem, "callspec", None)
+        example = callspec.params.get("example") if callspec else None
+        if example is None or is_skip_tagged(example):
+            return None
+        funcargs = {
+            name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+        }
+        pyfuncitem.obj(**funcargs)
+        latencies = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            pyfuncitem.obj(**funcargs)
+            latencies.append(time.perf_counter() - start)
+        # tracemalloc slows everything down, so memory gets a run of its own.
+        # --memory-report keeps it tracing for the whole session.
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            pyfuncitem.obj(**funcargs)
+            peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        pyfuncitem.user_properties.append(
+            (
+                BENCHMARK_PROPERTY,
+                {
+                    "p50": percentile(latencies, 50),
+                    "p90": percentile(latencies, 90),
+                    "max": max(latencies),
+                    "peak_memory": peak_memory,
+                },
+            )
+        )
+        return True
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        properties = dict(report.user_properties)
+        if report.when == "call" and report.passed and BENCHMARK_PROPERTY in properties:
+            self.results[get_label(report)] = properties[BENCHMARK_PROPERTY]
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if hasattr(self.config, "workerinput") or not self.results:
+            return
+        self.run = {
+            "sdk_rev": pinned_sdk_rev(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "iterations": self.iterations,
+            "examples": self.results,
+        }
+        runs = load_history(self.history_path)
+        self.baseline = previous_run(runs, self.run["sdk_rev"])
+        # A rerun at the same rev replaces the earlier numbers.
+        runs = [run for run in runs if run["sdk_rev"] != self.run["sdk_rev"]]
+        runs = (runs + [self.run])[-MAX_HISTORY_RUNS:]
+        atomic_write_bytes(
+            self.history_path, json.dumps({"runs": runs}, indent=2).encode()
+        )
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if self.run is None:
+            return
+        terminalreporter.section("docs example benchmark")
+        terminalreporter.line(
+            f"{len(self.results)} examples measured, history written to "
+            f"{self.history_path}"
+        )
+        if self.baseline is None:
+            terminalreporter.line("No earlier SDK rev in the history to compare with")
+            return
+        rows = compare(self.baseline, self.run)
+        for line in render_table(rows, self.baseline, self.run):
+            terminalreporter.line(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the latest two SDK revs in a benchmark history"
+    )
+    parser.add_argument("history", nargs="?", type=Path, default=DEFAULT_HISTORY_PATH)
+    parser.add_argument(
+        "--markdown", action="store_true", help="Only print the Markdown table"
+    )
+    args = parser.parse_args()
+
+    runs = load_history(args.history)
+    if not runs:
+        parser.error(f"no benchmark runs in {args.history}")
+    latest = runs[-1]
+    baseline = previous_run(runs, latest["sdk_rev"])
+    if baseline is None:
+        print(f"Only SDK rev `{latest['sdk_rev'][:12]}` has been benchmarked so far.")
+        return
+    if not args.markdown:
+        print(f"{args.history}: {baseline['recorded_at']} vs {latest['recorded_at']}")
+    print("\n".join(render_table(compare(baseline, latest), baseline, latest)))
+
+
+if __name__ == "__main__":
+    main()
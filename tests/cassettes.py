@@ -0,0 +1,156 @@
+"""Record and replay the HTTP traffic (LLM providers, tools, Portia Cloud) of examples.
+
+With `--cassette-mode=record` every example runs live and its traffic is stored in a
+gzipped cassette under tests/cassettes. With `--cassette-mode=replay` the traffic is
+served from the cassette by vcrpy instead, so the suite runs offline. Cassettes are
+named after a hash of the example's resolved source, tags and the pinned SDK rev, so
+editing an example or bumping the SDK leaves the old cassette unused.
+"""
+
+import contextlib
+import gzip
+import os
+from pathlib import Path
+from typing import Any, ContextManager
+
+import pytest
+import vcr
+from pytest_examples import CodeExample
+from vcr.persisters.filesystem import CassetteDecodeError, CassetteNotFoundError
+from vcr.serialize import deserialize, serialize
+from vcr.serializers import jsonserializer
+
+from example_index import DOCS_PATH
+from harness import atomic_write_bytes, example_digest
+
+CASSETTE_DIR = Path("tests/cassettes")
+CASSETTE_MODES = ("off", "record", "replay")
+
+# Never write credentials into cassettes.
+FILTERED_HEADERS = [
+    "authorization",
+    "api-key",
+    "x-api-key",
+    "x-goog-api-key",
+    "openai-organization",
+    "cookie",
+]
+FILTERED_PARAMETERS = ["appid", "api_key", "key"]
+# Everything else in a response is noise as far as the SDK clients are concerned.
+KEPT_RESPONSE_HEADERS = {"content-type"}
+# Client constructors refuse to start without a key, even though replayed requests
+# never reach the provider.
+REPLAY_ENV_VARS = [
+    "PORTIA_API_KEY",
+    "OPENAI_API_KEY",
+    "ANTHROPIC_API_KEY",
+    "MISTRAL_API_KEY",
+    "GOOGLE_API_KEY",
+    "TAVILY_API_KEY",
+    "OPENWEATHERMAP_API_KEY",
+]
+
+
+class GzipPersister:
+    """vcrpy persister storing cassettes as gzipped JSON."""
+
+    @classmethod
+    def load_cassette(cls, cassette_path: str, serializer: Any) -> tuple[list, list]:
+        try:
+            data = gzip.decompress(Path(cassette_path).read_bytes())
+        except FileNotFoundError:
+            raise CassetteNotFoundError() from None
+        except (OSError, EOFError) as e:
+            raise CassetteDecodeError(f"Can't read cassette {cassette_path}") from e
+        return deserialize(data.decode(), serializer)
+
+    @staticmethod
+    def save_cassette(cassette_path: str, cassette_dict: dict, serializer: Any) -> None:
+        data = serialize(cassette_dict, serializer)
+        atomic_write_bytes(Path(cassette_path), gzip.compress(data.encode(), mtime=0))
+
+
+def _compact_response(response: dict) -> dict:
+    response["headers"] = {
+        name: value
+        for name, value in response["headers"].items()
+        if name.lower() in KEPT_RESPONSE_HEADERS
+    }
+    return response
+
+
+class CassetteLibrary:
+    """Hands out the cassette context for each example according to the mode."""
+
+    def __init__(
+        self,
+        mode: str,
+        directory: Path = CASSETTE_DIR,
+        ignore_localhost: bool = False,
+        sdk_rev: str | None = None,
+    ):
+        self.mode = mode
+        self.directory = directory
+        # Replay the cassettes recorded at another SDK rev than the pinned one.
+        self.sdk_rev = sdk_rev
+        self._vcr = vcr.VCR(
+            serializer="json",
+            record_mode="all" if mode == "record" else "none",
+            # Bodies contain run ids and timestamps, so requests are matched on
+            # their target and replayed in the order they were recorded.
+            match_on=["method", "scheme", "host", "port", "path", "query"],
+            filter_headers=FILTERED_HEADERS,
+            filter_query_parameters=FILTERED_PARAMETERS,
+            filter_post_data_parameters=FILTERED_PARAMETERS,
+            decode_compressed_response=True,
+            before_record_response=_compact_response,
+            # Traffic to the --local-cloud stand-in is neither recorded nor replayed.
+            ignore_localhost=ignore_localhost,
+        )
+        self._vcr.register_persister(GzipPersister)
+
+    def path_for(self, example: CodeExample) -> Path:
+        page = Path(example.path).with_suffix("").relative_to(DOCS_PATH)
+        return (
+            self.directory
+            / page
+            / f"{example_digest(example, self.sdk_rev)[:16]}.json.gz"
+        )
+
+    def use(self, example: CodeExample) -> ContextManager:
+        """Context that records or replays the traffic of the (resolved) example."""
+        if self.mode == "off":
+            return contextlib.nullcontext()
+        path = self.path_for(example)
+        if self.mode == "replay" and not path.exists():
+            pytest.skip(
+                f"No cassette for the current source and SDK rev at {path}, "
+                "re-record with --cassette-mode=record"
+            )
+        if self.mode == "record":
+            return self._record(path)
+        return self._vcr.use_cassette(str(path))
+
+    @contextlib.contextmanager
+    def _record(self, path: Path):
+        with self._vcr.use_cassette(str(path)):
+            yield
+        # vcrpy only writes cassettes that saw traffic, but replay needs to know the
+        # example was recorded too.
+        if not path.exists():
+            GzipPersister.save_cassette(
+                str(path), {"requests": [], "responses": []}, jsonserializer
+            )
+
+    def prune(self, examples: list[CodeExample]) -> list[Path]:
+        """Delete cassettes that no (resolved) example in `examples` maps to."""
+        expected = {self.path_for(example) for example in examples}
+        stale = [p for p in self.directory.glob("**/*.json.gz") if p not in expected]
+        for path in stale:
+            path.unlink()
+        return stale
+
+
+def set_replay_env() -> None:
+    for name in REPLAY_ENV_VARS:
+        os.environ.setdefault(name, "replayed-from-cassette")
@@ -0,0 +1,133 @@
+"""Reuse the compiled code of examples whose source hasn't changed.
+
+pytest-examples writes every example to a fresh temporary file and imports it through
+pytest's assertion rewriting hook, which parses, rewrites and compiles it from scratch:
+the hook's own pyc cache sits next to the temporary file and never outlives the test.
+This plugin keeps the rewritten code objects in the harness cache directory instead,
+keyed by a hash of the source and of everything else the rewrite depends on, so every
+xdist worker and every later run (the CI cache keeps `.pytest_cache`) skips the work
+for examples that are unchanged. Only the example files pytest-examples writes under
+pytest's temporary directory go through the cache; test modules and conftests keep
+the hook's usual pyc cache. Pass `--no-compile-cache` to compile everything.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+from _pytest.assertion import rewrite
+
+from harness import atomic_write_bytes, get_cache_dir
+
+COMPILE_CACHE_OUTPUT_KEY = "docs_compile_cache"
+# Entries not used for this long are removed at the end of a run.
+MAX_ENTRY_AGE_SECONDS = 30 * 24 * 60 * 60
+
+
+def _retarget(code: types.CodeType, filename: str) -> types.CodeType:
+    """`code` and the code objects nested in it, pointed at `filename`."""
+    consts = tuple(
+        _retarget(const, filename) if isinstance(const, types.CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+class CompileCache:
+    """Pytest plugin serving the assertion-rewritten code of examples from disk."""
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self.directory = get_cache_dir(config) / "compiled"
+        self.hits = 0
+        self.misses = 0
+        self.seconds_compiling = 0.0
+        self._original = rewrite._rewrite_test
+        self._basetemp: Path | None = None
+        # The rewritten code depends on the interpreter, pytest and this ini option,
+        # besides the source itself.
+        self._salt = "\0".join(
+            [
+                rewrite.PYTEST_TAG,
+                sys.version,
+                str(config.getini("enable_assertion_pass_hook")),
+            ]
+        ).encode()
+
+    def entry_path(self, source: bytes) -> Path:
+        digest = hashlib.sha256(self._salt + b"\0" + source).hexdigest()
+        return self.directory / f"{digest}.bin"
+
+    def is_example(self, fn: Path) -> bool:
+        """Whether `fn` is an example written to a test's `tmp_path`."""
+        if self._basetemp is None:
+            # The same base directory the `tmp_path` fixtures are created in.
+            self._basetemp = self.config._tmp_path_factory.getbasetemp().resolve()
+        return fn.resolve().is_relative_to(self._basetemp)
+
+    def rewrite_test(
+        self, fn: Path, config: pytest.Config
+    ) -> tuple[os.stat_result, types.CodeType]:
+        """Drop-in for `_pytest.assertion.rewrite._rewrite_test`."""
+        if not self.is_example(fn):
+            return self._original(fn, config)
+        path = self.entry_path(fn.read_bytes())
+        try:
+            code = marshal.loads(path.read_bytes())
+            # Bump the mtime so entries still in use aren't pruned.
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            start = time.perf_counter()
+            stat, code = self._original(fn, config)
+            self.seconds_compiling += time.perf_counter() - start
+            self.misses += 1
+            atomic_write_bytes(path, marshal.dumps(code))
+            return stat, code
+        self.hits += 1
+        # Tracebacks and the print checks need the code to name this run's file.
+        return os.stat(fn), _retarget(code, str(fn))
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        rewrite._rewrite_test = self.rewrite_test
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        rewrite._rewrite_test = self._original
+        if hasattr(self.config, "workerinput"):
+            self.config.workeroutput[COMPILE_CACHE_OUTPUT_KEY] = (
+                self.hits,
+                self.misses,
+                self.seconds_compiling,
+            )
+            return
+        cutoff = time.time() - MAX_ENTRY_AGE_SECONDS
+        for path in self.directory.glob("*.bin"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error) -> None:
+        counts = getattr(node, "workeroutput", {}).get(COMPILE_CACHE_OUTPUT_KEY)
+        if counts is not None:
+            hits, misses, seconds = counts
+            self.hits += hits
+            self.misses += misses
+            self.seconds_compiling += seconds
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        total = self.hits + self.misses
+        if hasattr(self.config, "workerinput") or not total:
+            return
+        terminalreporter.section("docs example compile cache")
+        terminalreporter.line(
+            f"{self.hits} of {total} example modules loaded from the cache "
+            f"({self.hits / total:.0%} hit rate), {self.misses} compiled in "
+            f"{self.seconds_compiling:.2f}s"
+        )
@@ -0,0 +1,371 @@
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+
+from async_runner import AsyncExampleRunner
+from benchmark import DEFAULT_HISTORY_PATH, Benchmark
+from cassettes import CASSETTE_DIR, CASSETTE_MODES, CassetteLibrary, set_replay_env
+from compile_cache import CompileCache
+from example_index import ExampleIndex, get_example_index
+from fail_fast import FailFast
+from flakes import QUARANTINE_MODES, FlakeTracker
+from import_profile import ImportProfile
+from instrumentation import InstrumentationReport
+from local_cloud import LocalCloud
+from memory_tracking import MemoryTracker, WorkerRecycler
+from patches import PATCHES
+from preflight import check_examples
+from result_cache import ResultCache
+from scheduling import DurationScheduler
+from sharding import ShardSelector, load_durations, parse_shard
+from snapshots import DependencySnapshots
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("docs-examples")
+    group.addoption(
+        "--cassette-mode",
+        choices=CASSETTE_MODES,
+        default="off",
+        help="Record the HTTP traffic of each example to the cassette directory, or "
+        "replay it from there instead of calling live services (default: off).",
+    )
+    group.addoption(
+        "--cassette-dir",
+        type=Path,
+        default=CASSETTE_DIR,
+        metavar="DIR",
+        help=f"Directory to record cassettes to and replay them from "
+        f"(default: {CASSETTE_DIR}).",
+    )
+    group.addoption(
+        "--cassette-sdk-rev",
+        default=None,
+        metavar="REV",
+        help="With --cassette-mode=replay, replay the cassettes recorded at SDK rev "
+        "REV instead of the pinned one.",
+    )
+    group.addoption(
+        "--all-examples",
+        action="store_true",
+        default=False,
+        help="Run every example, including those that already passed with the same "
+        "source, tags and SDK rev on an earlier run.",
+    )
+    group.addoption(
+        "--example-report",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Record wall time, import time, LLM calls, tokens and tool calls of "
+        "each example and write them to PATH as JSON.",
+    )
+    group.addoption(
+        "--snapshot-dependencies",
+        action="store_true",
+        default=False,
+        help="Run each depends_on chain once per worker and start the examples "
+        "depending on it from a copy of the resulting namespace.",
+    )
+    group.addoption(
+        "--import-profile",
+        action="store_true",
+        default=False,
+        help="Report how long each worker spends importing portia and friends.",
+    )
+    group.addoption(
+        "--async-concurrency",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Run up to N async examples at once on a shared event loop "
+        "(default: 1, one example at a time).",
+    )
+    group.addoption(
+        "--benchmark",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Run every example N more times after a warm-up run and record its "
+        "latency percentiles and peak memory in the --benchmark-history file.",
+    )
+    group.addoption(
+        "--benchmark-history",
+        type=Path,
+        default=DEFAULT_HISTORY_PATH,
+        metavar="PATH",
+        help=f"Benchmark history to add to and compare with (default: "
+        f"{DEFAULT_HISTORY_PATH}).",
+    )
+    group.addoption(
+        "--local-cloud",
+        action="store_true",
+        default=False,
+        help="Serve the Portia Cloud storage and tool endpoints from a local "
+        "in-memory stand-in instead of the hosted API.",
+    )
+    group.addoption(
+        "--local-cloud-latency",
+        type=float,
+        default=0.05,
+        metavar="SECONDS",
+        help="Delay each response of the --local-cloud stand-in by SECONDS "
+        "(default: 0.05).",
+    )
+    group.addoption(
+        "--memory-report",
+        action="store_true",
+        default=False,
+        help="Report how much memory each example adds to its worker and the "
+        "threads, event loops and files it leaves open.",
+    )
+    group.addoption(
+        "--max-worker-memory",
+        type=int,
+        default=0,
+        metavar="MB",
+        help="Replace an xdist worker with a fresh one once its resident set grows "
+        "past MB megabytes.",
+    )
+    group.addoption(
+        "--max-llm-tokens",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Skip the remaining examples, and fail the run, once the LLM responses "
+        "of the run add up to N tokens (default: 0, no limit).",
+    )
+    group.addoption(
+        "--no-fail-fast",
+        action="store_true",
+        default=False,
+        help="Run examples even when an example they depend on has already failed.",
+    )
+    group.addoption(
+        "--retries",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Run a failed example up to N more times if it called an LLM, "
+        "except with --cassette-mode=replay (default: 0).",
+    )
+    group.addoption(
+        "--quarantine",
+        choices=QUARANTINE_MODES,
+        default="include",
+        help="Whether to run the examples quarantined for being flaky: include "
+        "them, exclude them, or run only them (default: include).",
+    )
+    group.addoption(
+        "--no-compile-cache",
+        action="store_true",
+        default=False,
+        help="Compile every example instead of reusing the compiled code of "
+        "unchanged examples from earlier runs.",
+    )
+    group.addoption(
+        "--no-preflight",
+        action="store_true",
+        default=False,
+        help="Don't check the example tags and depends_on graph before the run.",
+    )
+    group.addoption(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="Only run the i-th of N shards of the examples, keeping each depends_on "
+        "chain within one shard.",
+    )
+    group.addoption(
+        "--shard-durations",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Balance --shard using the example durations in an --example-report "
+        "of an earlier run. Every shard must be given the same file.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    load_dotenv(override=True)
+    _run_preflight(config)
+    if config.getoption("snapshot_dependencies") and (
+        config.getoption("cassette_mode") != "off"
+    ):
+        # A cassette holds the traffic of the whole chain, which a snapshot skips.
+        raise pytest.UsageError(
+            "--snapshot-dependencies can't be combined with --cassette-mode"
+        )
+    if config.getoption("cassette_sdk_rev") and (
+        config.getoption("cassette_mode") != "replay"
+    ):
+        raise pytest.UsageError("--cassette-sdk-rev needs --cassette-mode=replay")
+    config.pluginmanager.register(ResultCache(config), "docs_result_cache")
+    config.pluginmanager.register(DurationScheduler(config), "docs_scheduler")
+    if not config.getoption("no_compile_cache"):
+        config.pluginmanager.register(CompileCache(config), "docs_compile_cache")
+    config.pluginmanager.register(
+        FlakeTracker(
+            config, config.getoption("retries"), config.getoption("quarantine")
+        ),
+        "docs_flakes",
+    )
+    if not config.getoption("no_fail_fast") or config.getoption("max_llm_tokens"):
+        config.pluginmanager.register(
+            FailFast(config, config.getoption("max_llm_tokens")), "docs_fail_fast"
+        )
+    if config.getoption("shard"):
+        # Registered after the scheduler so shards are selected before it orders them.
+        durations = load_durations(config.getoption("shard_durations"))
+        config.pluginmanager.register(
+            ShardSelector(config, *config.getoption("shard"), durations),
+            "docs_sharding",
+        )
+    if config.getoption("async_concurrency") > 1:
+        _check_async_concurrency(config)
+        config.pluginmanager.register(
+            AsyncExampleRunner(config, config.getoption("async_concurrency")),
+            "docs_async_runner",
+        )
+    if config.getoption("benchmark"):
+        _check_benchmark(config)
+        config.pluginmanager.register(
+            Benchmark(
+                config,
+                config.getoption("benchmark"),
+                config.getoption("benchmark_history"),
+            ),
+            "docs_benchmark",
+        )
+    if config.getoption("local_cloud"):
+        config.pluginmanager.register(
+            LocalCloud(config, config.getoption("local_cloud_latency")),
+            "docs_local_cloud",
+        )
+    if config.getoption("example_report"):
+        config.pluginmanager.register(
+            InstrumentationReport(config, config.getoption("example_report")),
+            "docs_instrumentation",
+        )
+    if config.getoption("import_profile"):
+        config.pluginmanager.register(ImportProfile(config), "docs_import_profile")
+    if config.getoption("memory_report"):
+        config.pluginmanager.register(MemoryTracker(config), "docs_memory")
+    if config.getoption("max_worker_memory"):
+        # xdist clears -n on the workers themselves.
+        if not hasattr(config, "workerinput") and not config.getoption(
+            "numprocesses", None
+        ):
+            raise pytest.UsageError("--max-worker-memory needs xdist (-n)")
+        config.pluginmanager.register(
+            WorkerRecycler(config, config.getoption("max_worker_memory") * 2**20),
+            "docs_worker_recycler",
+        )
+    if config.getoption("cassette_mode") == "replay":
+        set_replay_env()
+
+
+def _run_preflight(config: pytest.Config) -> None:
+    # On the controller only, so a run with broken tags stops before workers start.
+    if (
+        config.getoption("no_preflight")
+        or config.getoption("help")
+        or hasattr(config, "workerinput")
+    ):
+        return
+    problems = check_examples(get_example_index(config), PATCHES)
+    if problems:
+        raise pytest.UsageError(
+            "Problems with the example tags in the docs (use --no-preflight to run "
+            "anyway):\n  " + "\n  ".join(problems)
+        )
+
+
+def _check_async_concurrency(config: pytest.Config) -> None:
+    # Batches share one set of process-wide patches for as long as they run.
+    if (
+        config.getoption("cassette_mode") != "off"
+        or config.getoption("example_report")
+        or config.getoption("memory_report")
+        or config.getoption("max_llm_tokens")
+        or config.getoption("retries")
+    ):
+        raise pytest.UsageError(
+            "--async-concurrency can't be combined with --cassette-mode, "
+            "--example-report, --memory-report, --max-llm-tokens or --retries"
+        )
+    # A batch is a run of consecutive async items in the worker's collection order,
+    # and an example only waits for dependencies submitted before it. That holds
+    # under xdist because `--dist loadgroup` sends the whole async-examples group to
+    # one worker, in collection order.
+    if config.getoption("numprocesses", None) and (
+        config.getoption("dist") != "loadgroup"
+    ):
+        raise pytest.UsageError("--async-concurrency needs --dist loadgroup with xdist")
+
+
+def _check_benchmark(config: pytest.Config) -> None:
+    # Every run of an example has to do the same work.
+    if (
+        config.getoption("snapshot_dependencies")
+        or config.getoption("async_concurrency") > 1
+        or config.getoption("retries")
+    ):
+        raise pytest.UsageError(
+            "--benchmark can't be combined with --snapshot-dependencies, "
+            "--async-concurrency or --retries"
+        )
+    if config.getoption("cassette_mode") == "record":
+        raise pytest.UsageError(
+            "--benchmark can't be combined with --cassette-mode=record"
+        )
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    # Only the xdist controller (or a non-distributed run) cleans up, once.
+    if config.getoption("cassette_mode") == "record" and not hasattr(
+        config, "workerinput"
+    ):
+        index = get_example_index(config)
+        library = CassetteLibrary("record", config.getoption("cassette_dir"))
+        library.prune([index.resolve(example) for example in index.examples])
+
+
+@pytest.fixture(scope="session")
+def example_index(request: pytest.FixtureRequest) -> ExampleIndex:
+    return get_example_index(request.config)
+
+
+@pytest.fixture(scope="session")
+def cassettes(request: pytest.FixtureRequest) -> CassetteLibrary:
+    return CassetteLibrary(
+        request.config.getoption("cassette_mode"),
+        request.config.getoption("cassette_dir"),
+        ignore_localhost=request.config.getoption("local_cloud"),
+        sdk_rev=request.config.getoption("cassette_sdk_rev"),
+    )
+
+
+@pytest.fixture(scope="session")
+def result_cache(request: pytest.FixtureRequest) -> ResultCache:
+    return request.config.pluginmanager.get_plugin("docs_result_cache")
+
+
+@pytest.fixture(scope="session")
+def snapshots(request: pytest.FixtureRequest) -> DependencySnapshots | None:
+    if request.config.getoption("snapshot_dependencies"):
+        return DependencySnapshots()
+    return None
+
+
+@pytest.fixture(scope="session")
+def local_cloud(request: pytest.FixtureRequest) -> LocalCloud | None:
+    return request.config.pluginmanager.get_plugin("docs_local_cloud")
+
+
+@pytest.fixture(scope="session")
+def async_runner(request: pytest.FixtureRequest) -> AsyncExampleRunner | None:
+    return request.config.pluginmanager.get_plugin("docs_async_runner")
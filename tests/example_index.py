@@ -0,0 +1,331 @@
+"""Session-wide index of the code examples in the docs.
+
+Parsing every page in docs/product is the slowest part of collecting the example
+tests, so the parsed examples are pickled into the pytest cache together with each
+page's mtime, size and content hash. All xdist workers share the same cache file and
+only pages that actually changed are parsed again.
+
+The index holds compact `ExampleRecord`s rather than `CodeExample`s: where each
+example is and what its tags are, but not its source. Pages are parsed one at a time
+and their examples reduced to records straight away, and the source is only read back
+from the page when an example (or something depending on it) actually runs.
+"""
+
+import functools
+import hashlib
+import pickle
+import shlex
+from dataclasses import dataclass, replace
+from pathlib import Path
+from textwrap import dedent
+from typing import Iterator
+
+import pytest
+from pytest_examples import CodeExample, find_examples
+
+from harness import atomic_write_bytes, get_cache_dir
+
+DOCS_PATH = Path("docs/product/")
+INDEX_CACHE_FILE = "example_index.pickle"
+# Bump when the layout of the cached data changes.
+INDEX_CACHE_VERSION = 2
+
+_index_key = pytest.StashKey["ExampleIndex"]()
+
+
+class ExampleRecord:
+    """Location and tags of an example, standing in for a `CodeExample` until it runs.
+
+    Supports what the harness needs at collection time: `str()` (the test id),
+    `path`, the line numbers and `prefix_tags()`. `source` is read from the page on
+    first access; `ExampleIndex.load` turns a record into a real `CodeExample`.
+    """
+
+    __slots__ = (
+        "path",
+        "start_line",
+        "end_line",
+        "start_index",
+        "end_index",
+        "prefix",
+        "indent",
+        "tags",
+        "_source",
+        "_name",
+    )
+    # Derived on first use and left out of the index cache.
+    _TRANSIENT = ("_source", "_name")
+
+    def __init__(
+        self,
+        path: Path,
+        start_line: int,
+        end_line: int,
+        start_index: int,
+        end_index: int,
+        prefix: str,
+        indent: int,
+    ):
+        self.path = path
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_index = start_index
+        self.end_index = end_index
+        self.prefix = prefix
+        self.indent = indent
+        self.tags = _parse_tags(prefix)
+        self._source: str | None = None
+        self._name: str | None = None
+
+    @classmethod
+    def from_code_example(cls, example: CodeExample) -> "ExampleRecord":
+        return cls(
+            example.path,
+            example.start_line,
+            example.end_line,
+            example.start_index,
+            example.end_index,
+            example.prefix,
+            example.indent,
+        )
+
+    @property
+    def source(self) -> str:
+        if self._source is None:
+            text = _read_page(self.path)
+            self._source = dedent(text[self.start_index : self.end_index])
+        return self._source
+
+    def prefix_tags(self) -> set[str]:
+        return set(self.tags)
+
+    def __str__(self) -> str:
+        # Same as CodeExample, so test ids don't change.
+        if self._name is None:
+            try:
+                path = self.path.relative_to(Path.cwd())
+            except ValueError:
+                path = self.path
+            self._name = f"{path}:{self.start_line}-{self.end_line}"
+        return self._name
+
+    def __repr__(self) -> str:
+        return f"ExampleRecord({self})"
+
+    def __getstate__(self) -> tuple:
+        # The source is cheap to read back and would bloat the index cache.
+        return tuple(
+            getattr(self, name)
+            for name in self.__slots__
+            if name not in self._TRANSIENT
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        names = [name for name in self.__slots__ if name not in self._TRANSIENT]
+        for name, value in zip(names, state):
+            setattr(self, name, value)
+        for name in self._TRANSIENT:
+            setattr(self, name, None)
+
+
+def _parse_tags(prefix: str) -> frozenset[str]:
+    """The tags of a fence prefix, parsed as `CodeExample.prefix_tags` does."""
+    tags = {tag.lstrip(".") for tag in shlex.split(prefix.strip(" {}")) if tag}
+    tags.discard("py")
+    return frozenset(tags)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_page(path: Path) -> str:
+    # Dependencies usually live on the same page, so keep a few pages around.
+    return path.read_text("utf-8")
+
+
+def iter_records(path: Path) -> Iterator[ExampleRecord]:
+    """Stream the examples of one page as records, dropping each source right away."""
+    for example in find_examples(path):
+        yield ExampleRecord.from_code_example(example)
+
+
+@dataclass(frozen=True)
+class _CachedPage:
+    mtime_ns: int
+    size: int
+    digest: str
+    examples: list[ExampleRecord]
+
+
+def get_example_id(example: CodeExample | ExampleRecord) -> str | None:
+    """Return the value of the example's `id=` tag, if it has one."""
+    for tag in example.prefix_tags():
+        if tag.startswith("id="):
+            return tag.split("id=")[1]
+    return None
+
+
+def get_dependency_ids(example: CodeExample | ExampleRecord) -> list[str]:
+    """Return the ids listed in the example's `depends_on=` tag."""
+    for tag in example.prefix_tags():
+        if tag.startswith("depends_on="):
+            dependency_ids = tag.split("depends_on=")[1].split(",")
+            return [dep_id.strip() for dep_id in dependency_ids]
+    return []
+
+
+def get_patch_names(example: CodeExample | ExampleRecord) -> list[str]:
+    """Return the names of the optional patches requested with `patch=` tags."""
+    return [tag.split("patch=")[1] for tag in example.prefix_tags() if "patch=" in tag]
+
+
+def is_skip_tagged(example: CodeExample | ExampleRecord) -> bool:
+    return "skip=true" in example.prefix_tags()
+
+
+class ExampleIndex:
+    """All examples in the docs, looked up by `id=` tag, with the dependency chain of
+    every example resolved once up front."""
+
+    def __init__(self, examples: list[ExampleRecord]):
+        self.examples = examples
+        self.by_id: dict[str, ExampleRecord] = {}
+        for example in examples:
+            example_id = get_example_id(example)
+            # The first example with a given id wins, as in a linear search.
+            if example_id and example_id not in self.by_id:
+                self.by_id[example_id] = example
+        self._dependencies = {
+            str(example): self._resolve_dependencies(example) for example in examples
+        }
+        # Line numbers move whenever prose above an example is edited, so examples are
+        # labelled by page and `id=` tag, or by their position in the page.
+        self._labels = {}
+        positions: dict[Path, int] = {}
+        for example in examples:
+            positions[example.path] = positions.get(example.path, 0) + 1
+            suffix = get_example_id(example) or str(positions[example.path])
+            self._labels[str(example)] = f"{example.path}#{suffix}"
+
+    def get(self, example_id: str) -> ExampleRecord:
+        try:
+            return self.by_id[example_id]
+        except KeyError:
+            raise ValueError(f"Example with id {example_id} not found") from None
+
+    def label(self, example: ExampleRecord) -> str:
+        """Stable name of the example for reports and histories."""
+        return self._labels[str(example)]
+
+    def dependencies(self, example: ExampleRecord) -> list[ExampleRecord]:
+        """All examples that must run before `example`, in execution order."""
+        return self._dependencies[str(example)]
+
+    def load(self, example: ExampleRecord) -> CodeExample:
+        """A fresh `CodeExample` for the record, with its source read from the page.
+
+        `EvalExample.run` modifies the examples it runs, so each run gets its own.
+        """
+        return CodeExample(
+            source=example.source,
+            path=example.path,
+            start_line=example.start_line,
+            end_line=example.end_line,
+            start_index=example.start_index,
+            end_index=example.end_index,
+            prefix=example.prefix,
+            indent=example.indent,
+        )
+
+    def resolve(self, example: ExampleRecord) -> CodeExample:
+        """The example loaded with the source of its dependencies prepended."""
+        return replace(
+            self.load(example),
+            source="\n".join(
+                [dependency.source for dependency in self.dependencies(example)]
+                + [example.source]
+            ),
+        )
+
+    def _resolve_dependencies(
+        self, example: ExampleRecord, visited: set[str] = None
+    ) -> list[ExampleRecord]:
+        if visited is None:
+            visited = set()
+
+        # Prevent infinite loops
+        example_id = get_example_id(example)
+        if example_id and example_id in visited:
+            return []
+        if example_id:
+            visited.add(example_id)
+
+        all_dependencies = []
+        for dep_id in get_dependency_ids(example):
+            try:
+                dep_example = self.get(dep_id)
+            except ValueError:
+                # Skip if dependency not found
+                continue
+            nested_dependencies = self._resolve_dependencies(
+                dep_example, visited.copy()
+            )
+            all_dependencies.extend(nested_dependencies)
+            if dep_example not in all_dependencies:
+                all_dependencies.append(dep_example)
+        return all_dependencies
+
+
+def build_index(
+    docs_path: Path = DOCS_PATH, cache_dir: Path | None = None
+) -> ExampleIndex:
+    """Build the index, re-parsing only the pages whose content changed since the
+    cached copy in `cache_dir` was written."""
+    cache_file = cache_dir / INDEX_CACHE_FILE if cache_dir else None
+    cached = _read_cache(cache_file) if cache_file else {}
+
+    pages: dict[str, _CachedPage] = {}
+    for path in sorted(p for p in docs_path.glob("**/*") if p.is_file()):
+        stat = path.stat()
+        page = cached.get(str(path))
+        if page and (page.mtime_ns, page.size) == (stat.st_mtime_ns, stat.st_size):
+            pages[str(path)] = page
+            continue
+        # CI checkouts touch every file, so fall back to the content hash before
+        # deciding to parse the page again.
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if page and page.digest == digest:
+            pages[str(path)] = replace(
+                page, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+            )
+        else:
+            pages[str(path)] = _CachedPage(
+                stat.st_mtime_ns, stat.st_size, digest, list(iter_records(path))
+            )
+
+    if cache_file and pages != cached:
+        atomic_write_bytes(cache_file, pickle.dumps((INDEX_CACHE_VERSION, pages)))
+
+    return ExampleIndex(
+        [example for page in pages.values() for example in page.examples]
+    )
+
+
+def get_example_index(config: pytest.Config) -> ExampleIndex:
+    """The index for this pytest process, built on first use."""
+    if _index_key not in config.stash:
+        config.stash[_index_key] = build_index(cache_dir=get_cache_dir(config))
+    return config.stash[_index_key]
+
+
+def _read_cache(cache_file: Path) -> dict[str, _CachedPage]:
+    try:
+        version, pages = pickle.loads(cache_file.read_bytes())
+    except (
+        OSError,
+        EOFError,
+        pickle.UnpicklingError,
+        AttributeError,
+        ValueError,
+        TypeError,
+    ):
+        return {}
+    return pages if version == INDEX_CACHE_VERSION else {}
@@ -0,0 +1,211 @@
+"""Stop spending time and LLM calls on examples that can't pass.
+
+An example that `depends_on` a broken example runs the broken code again (LLM calls
+included) and then fails the same way. When an example fails, the traceback tells
+which part of its source raised: its own code or one of the dependencies prepended to
+it. The `id=` of that example is marked broken in a directory shared by the xdist
+workers of the run, and examples depending on it that haven't started yet are
+skipped as "blocked by id=...". Examples already running on other workers finish as
+usual. Pass `--no-fail-fast` to run every example anyway.
+
+`--max-llm-tokens N` is a budget for the whole run. The tokens in the LLM responses
+of every example are added up across the workers, and once N is reached the
+remaining examples are skipped and the run fails.
+"""
+
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from types import TracebackType
+from urllib.parse import quote, unquote
+
+import pytest
+
+from async_runner import get_example
+from example_index import (
+    ExampleIndex,
+    ExampleRecord,
+    get_example_id,
+    get_example_index,
+)
+from harness import get_cache_dir
+from instrumentation import ExampleMetrics, count_llm_calls
+from scheduling import get_label
+
+RUN_DIRECTORY_KEY = "docs_fail_fast_directory"
+BLOCKED_PROPERTY = "blocked_by"
+BROKEN_PROPERTY = "broken_ids"
+OVER_BUDGET_PROPERTY = "over_llm_budget"
+
+
+def _failing_line(example: ExampleRecord, tb: TracebackType | None) -> int | None:
+    """Line of the example's resolved source that was running when it raised."""
+    module_file = f"{example.path.stem}_{example.start_line}_{example.end_line}.py"
+    while tb is not None:
+        filename = tb.tb_frame.f_code.co_filename
+        if filename == str(example.path):
+            # pytest-examples moves the frames it re-raises to the lines of the page.
+            return tb.tb_lineno - example.start_line
+        if Path(filename).name == module_file:
+            return tb.tb_lineno
+        tb = tb.tb_next
+    return None
+
+
+def find_broken(
+    index: ExampleIndex, example: ExampleRecord, tb: TracebackType | None
+) -> ExampleRecord:
+    """The example in `example`'s dependency chain whose code raised.
+
+    `ExampleIndex.resolve` joins the sources of the chain with newlines, so each part
+    starts one line after the previous one ends. Without a frame in the example's
+    module, the example itself is to blame.
+    """
+    line = _failing_line(example, tb)
+    if line is None:
+        return example
+    start = 1
+    for part in index.dependencies(example):
+        start += part.source.count("\n") + 1
+        if line < start:
+            return part
+    return example
+
+
+class FailFast:
+    """Pytest plugin skipping examples blocked by a broken dependency or the budget."""
+
+    def __init__(self, config: pytest.Config, max_tokens: int):
+        self.config = config
+        self.dependencies = not config.getoption("no_fail_fast")
+        self.max_tokens = max_tokens
+        self.directory: Path | None = None
+        self.process = getattr(config, "workerinput", {}).get("workerid", "main")
+        self.tokens = 0
+        self.blocked: Counter[str] = Counter()
+        self.broken: dict[str, str] = {}
+        self.over_budget = 0
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        # Before xdist starts the workers, which are given the directory.
+        workerinput = getattr(self.config, "workerinput", None)
+        if workerinput is not None:
+            self.directory = Path(workerinput[RUN_DIRECTORY_KEY])
+            return
+        parent = get_cache_dir(self.config) / "fail-fast"
+        parent.mkdir(exist_ok=True)
+        self.directory = Path(tempfile.mkdtemp(dir=parent))
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node) -> None:
+        node.workerinput[RUN_DIRECTORY_KEY] = str(self.directory)
+
+    def broken_ids(self) -> dict[str, str]:
+        """Ids marked broken by any process so far, with the example that failed."""
+        return {
+            unquote(path.name.removeprefix("broken-")): path.read_text()
+            for path in self.directory.glob("broken-*")
+        }
+
+    def tokens_used(self) -> int:
+        return sum(int(path.read_text()) for path in self.directory.glob("tokens-*"))
+
+    def skip_reason(self, item: pytest.Item) -> tuple[str, object, str] | None:
+        """Why `item` is to be skipped, as (user property, value, reason), if it is."""
+        example = get_example(item)
+        if example is None:
+            return None
+        if self.max_tokens and self.tokens_used() >= self.max_tokens:
+            reason = f"LLM token budget of {self.max_tokens} used up"
+            return OVER_BUDGET_PROPERTY, True, reason
+        if not self.dependencies:
+            return None
+        broken = self.broken_ids()
+        for dependency in get_example_index(self.config).dependencies(example):
+            example_id = get_example_id(dependency)
+            if example_id in broken:
+                reason = f"blocked by id={example_id} (failed in {broken[example_id]})"
+                return BLOCKED_PROPERTY, example_id, reason
+        return None
+
+    def skip_if_blocked(self, item: pytest.Item) -> None:
+        skip = self.skip_reason(item)
+        if skip is not None:
+            name, value, reason = skip
+            item.user_properties.append((name, value))
+            pytest.skip(reason)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_setup(self, item: pytest.Item) -> None:
+        self.skip_if_blocked(item)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: pytest.Item):
+        if not self.max_tokens or get_example(item) is None:
+            yield
+            return
+        metrics = ExampleMetrics()
+        with count_llm_calls(metrics):
+            yield
+        self.tokens += metrics.tokens_in + metrics.tokens_out
+        (self.directory / f"tokens-{self.process}").write_text(str(self.tokens))
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item, call: pytest.CallInfo):
+        outcome = yield
+        report = outcome.get_result()
+        example = get_example(item)
+        if (
+            not self.dependencies
+            or example is None
+            or call.when != "call"
+            or not report.failed
+        ):
+            return
+        index = get_example_index(self.config)
+        # Whatever depends on a failed example is stuck with its failure too.
+        culprits = [example, find_broken(index, example, call.excinfo.tb)]
+        ids = sorted({i for i in map(get_example_id, culprits) if i is not None})
+        for example_id in ids:
+            path = self.directory / f"broken-{quote(example_id, safe='')}"
+            if not path.exists():
+                path.write_text(get_label(item))
+        report.user_properties.append((BROKEN_PROPERTY, ids))
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        properties = dict(report.user_properties)
+        # The teardown report carries the same properties as the skipped setup.
+        if report.skipped and BLOCKED_PROPERTY in properties:
+            self.blocked[properties[BLOCKED_PROPERTY]] += 1
+        if report.skipped and OVER_BUDGET_PROPERTY in properties:
+            self.over_budget += 1
+        for example_id in properties.get(BROKEN_PROPERTY, []):
+            self.broken.setdefault(example_id, get_label(report))
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if hasattr(self.config, "workerinput") or self.directory is None:
+            return
+        self.tokens = self.tokens_used()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        # A run cut short by the budget mustn't look like a passing one.
+        if self.over_budget and session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if hasattr(self.config, "workerinput"):
+            return
+        if self.blocked:
+            terminalreporter.section("docs example fail-fast")
+            for example_id, count in sorted(self.blocked.items()):
+                terminalreporter.line(
+                    f"id={example_id} (failed in {self.broken.get(example_id, '?')}): "
+                    f"{count} dependent example(s) skipped"
+                )
+        if self.max_tokens:
+            terminalreporter.section("docs example LLM budget")
+            line = f"{self.tokens} of {self.max_tokens} tokens used"
+            if self.over_budget:
+                line += f", {self.over_budget} example(s) skipped"
+            terminalreporter.line(line)
@@ -0,0 +1,166 @@
+"""Retry flaky examples in place and quarantine the chronically flaky ones.
+
+LLM output isn't deterministic, so a few examples fail now and then for no fault of
+their own. With `--retries N` an example that fails is run again, up to N more times,
+in the same worker and with the same fixtures, as long as the failed attempt called
+an LLM (replayed cassettes are deterministic, so nothing is retried in replay mode).
+
+Whether each example passed first time, passed after a retry or failed is kept in a
+rolling history in the pytest cache. An example that needed a retry in at least
+`QUARANTINE_FLAKE_RATE` of its last runs is quarantined: `--quarantine=exclude`
+leaves it out of the run, `--quarantine=only` runs nothing but the quarantined
+examples (CI runs them in a step of their own that doesn't fail the build), and the
+default `--quarantine=include` runs everything. Examples leave the quarantine by
+themselves once the runs of the quarantine pass bring their flake rate back down.
+"""
+
+import pytest
+
+from async_runner import get_example
+from example_index import get_example_index
+from instrumentation import ExampleMetrics, count_llm_calls
+from scheduling import get_label
+
+FLAKES_CACHE_KEY = "docs-examples/flakes"
+ATTEMPTS_PROPERTY = "example_attempts"
+QUARANTINE_MODES = ("include", "exclude", "only")
+QUARANTINE_EFFECTS = {
+    "include": "run as usual",
+    "exclude": "left out of this run",
+    "only": "the only examples in this run",
+}
+# Outcomes kept per example: passed first time, passed after a retry, or failed.
+PASSED, FLAKY, FAILED = "p", "f", "x"
+HISTORY_LENGTH = 20
+# Too few runs say nothing about how flaky an example is.
+QUARANTINE_MIN_RUNS = 5
+QUARANTINE_FLAKE_RATE = 0.2
+
+
+def flake_rate(outcomes: str) -> float:
+    return outcomes.count(FLAKY) / len(outcomes) if outcomes else 0.0
+
+
+def is_quarantined(outcomes: str) -> bool:
+    return (
+        len(outcomes) >= QUARANTINE_MIN_RUNS
+        and flake_rate(outcomes) >= QUARANTINE_FLAKE_RATE
+    )
+
+
+class FlakeTracker:
+    """Pytest plugin retrying failed examples and keeping their flake history."""
+
+    def __init__(self, config: pytest.Config, retries: int, quarantine: str):
+        self.config = config
+        # Replayed responses fail the same way every time.
+        self.retries = 0 if config.getoption("cassette_mode") == "replay" else retries
+        self.quarantine = quarantine
+        # No flake history without the pytest cache (`-p no:cacheprovider`).
+        self.cache = getattr(config, "cache", None)
+        self.history: dict[str, str] = (
+            self.cache.get(FLAKES_CACHE_KEY, {}) if self.cache is not None else {}
+        )
+        self.outcomes: dict[str, str] = {}
+        self.retried: dict[str, int] = {}
+        self.quarantined = self.quarantined_labels()
+
+    def quarantined_labels(self) -> list[str]:
+        return sorted(
+            label
+            for label, outcomes in self.history.items()
+            if is_quarantined(outcomes)
+        )
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        if self.quarantine == "include":
+            return
+        index = get_example_index(config)
+        quarantined = set(self.quarantined)
+        kept, deselected = [], []
+        for item in items:
+            example = get_example(item)
+            if example is None:
+                kept.append(item)
+            elif (index.label(example) in quarantined) == (self.quarantine == "only"):
+                kept.append(item)
+            else:
+                deselected.append(item)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = kept
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pyfunc_call(self, pyfuncitem: pytest.Function) -> bool | None:
+        if not self.retries or get_example(pyfuncitem) is None:
+            return None
+        funcargs = {
+            name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+        }
+        attempt = 1
+        try:
+            while True:
+                metrics = ExampleMetrics()
+                try:
+                    with count_llm_calls(metrics):
+                        pyfuncitem.obj(**funcargs)
+                    return True
+                # pytest.fail() (e.g. a print check) isn't an Exception.
+                except (Exception, pytest.fail.Exception):
+                    if attempt > self.retries or not metrics.llm_calls:
+                        raise
+                attempt += 1
+        finally:
+            pyfuncitem.user_properties.append((ATTEMPTS_PROPERTY, attempt))
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        if report.when != "call" or report.skipped:
+            return
+        label = get_label(report)
+        if label is None:
+            return
+        attempts = dict(report.user_properties).get(ATTEMPTS_PROPERTY, 1)
+        if attempts > 1:
+            self.retried[label] = attempts
+        if report.failed:
+            self.outcomes[label] = FAILED
+        else:
+            self.outcomes[label] = FLAKY if attempts > 1 else PASSED
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if hasattr(self.config, "workerinput") or not self.outcomes:
+            return
+        history = dict(self.history)
+        for label, outcome in self.outcomes.items():
+            history[label] = (history.get(label, "") + outcome)[-HISTORY_LENGTH:]
+        if self.cache is not None:
+            self.cache.set(FLAKES_CACHE_KEY, history)
+        self.history = history
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if hasattr(self.config, "workerinput"):
+            return
+        quarantined = self.quarantined_labels()
+        if not (self.retried or quarantined):
+            return
+        terminalreporter.section("docs example flakes")
+        for label, attempts in sorted(self.retried.items()):
+            outcome = "failed" if self.outcomes[label] == FAILED else "passed"
+            terminalreporter.line(f"{label}: {outcome} after {attempts} attempts")
+        if quarantined:
+            terminalreporter.line(
+                f"{len(quarantined)} example(s) quarantined, "
+                f"{QUARANTINE_EFFECTS[self.quarantine]}:"
+            )
+        for label in quarantined:
+            outcomes = self.history[label]
+            change = "" if label in self.quarantined else " (new)"
+            terminalreporter.line(
+                f"  {label}: needed a retry in {flake_rate(outcomes):.0%} of the "
+                f"last {len(outcomes)} runs{change}"
+            )
+        for label in sorted(set(self.quarantined) - set(quarantined)):
+            terminalreporter.line(f"  {label}: no longer quarantined")
@@ -0,0 +1,76 @@
+"""Shared helpers for the docs example test harness."""
+
+import functools
+import hashlib
+import os
+import tempfile
+import tomllib
+from pathlib import Path
+
+import pytest
+from pytest_examples import CodeExample
+
+# Lives inside pytest's own cache directory so `--cache-clear` resets it too.
+CACHE_DIR = Path(".pytest_cache", "d", "docs-examples")
+PYPROJECT_PATH = Path("pyproject.toml")
+LOCK_PATH = Path("uv.lock")
+HARNESS_DIR = Path(__file__).parent
+
+
+def get_cache_dir(config: pytest.Config | None = None) -> Path:
+    """Directory shared by every xdist worker (and by later runs) for harness caches."""
+    # No cache with `-p no:cacheprovider`.
+    cache = getattr(config, "cache", None)
+    if cache is not None:
+        return cache.mkdir("docs-examples")
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return CACHE_DIR
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write a file via a temporary file and rename so concurrent readers never see
+    a partially written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+@functools.cache
+def pinned_sdk_rev() -> str:
+    """The portia-sdk-python git rev pinned in pyproject.toml (empty if unpinned)."""
+    pyproject = tomllib.loads(PYPROJECT_PATH.read_text())
+    source = pyproject["tool"]["uv"]["sources"].get("portia-sdk-python", {})
+    return source.get("rev", "")
+
+
+def example_digest(example: CodeExample, sdk_rev: str | None = None) -> str:
+    """Hash identifying what an example run depends on: its (dependency-resolved)
+    source, its prefix tags and the SDK rev (the pinned one unless given)."""
+    if sdk_rev is None:
+        sdk_rev = pinned_sdk_rev()
+    digest = hashlib.sha256()
+    for part in [example.source, *sorted(example.prefix_tags()), sdk_rev]:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@functools.cache
+def harness_digest() -> str:
+    """Hash of the harness modules (tests/*.py, e.g. the patches and mocked modules)
+    and the dependency set, which change how an example runs without touching it."""
+    digest = hashlib.sha256()
+    paths = sorted(HARNESS_DIR.glob("*.py")) + [PYPROJECT_PATH, LOCK_PATH]
+    for path in paths:
+        if path.exists():
+            digest.update(path.name.encode())
+            digest.update(b"\0")
+            digest.update(path.read_bytes())
+            digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,95 @@
+"""Startup cost of the docs example workers.
+
+Enabled with `--import-profile`. Every worker (or the single pytest process) times
+importing the heavy modules the examples need, and the controller prints those times
+together with the slowest modules reported by `python -X importtime` for the same
+imports in a fresh interpreter.
+"""
+
+import functools
+import importlib
+import subprocess
+import sys
+import time
+
+import pytest
+
+HEAVY_MODULES = ["portia", "steelthread"]
+TOP_MODULES = 15
+PROFILE_OUTPUT_KEY = "docs_import_profile"
+
+
+def time_imports(modules: list[str]) -> dict[str, float]:
+    """Seconds it took this process to import each module (0 if already imported)."""
+    timings = {}
+    for module in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        timings[module] = time.perf_counter() - start
+    return timings
+
+
+@functools.cache
+def heavy_import_times() -> dict[str, float]:
+    """`time_imports(HEAVY_MODULES)`, measured once per process."""
+    return time_imports(HEAVY_MODULES)
+
+
+def importtime_profile(modules: list[str]) -> list[tuple[float, str]]:
+    """Cumulative import time in seconds of the slowest modules in a fresh process."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:TOP_MODULES]
+
+
+class ImportProfile:
+    """Pytest plugin collecting each worker's import timings."""
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self.workers: dict[str, dict[str, float]] = {}
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        workerinput = getattr(self.config, "workerinput", None)
+        # The xdist controller never imports the examples' dependencies.
+        if workerinput is None and self.config.getoption("numprocesses", None):
+            return
+        timings = heavy_import_times()
+        if workerinput is None:
+            self.workers["main"] = timings
+        else:
+            self.config.workeroutput[PROFILE_OUTPUT_KEY] = timings
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error) -> None:
+        timings = getattr(node, "workeroutput", {}).get(PROFILE_OUTPUT_KEY)
+        if timings is not None:
+            self.workers[node.gateway.id] = timings
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if not self.workers:
+            return
+        terminalreporter.section("docs example import profile")
+        for worker, timings in sorted(self.workers.items()):
+            details = ", ".join(f"{name} {t:.2f}s" for name, t in timings.items())
+            terminalreporter.line(
+                f"{worker}: {sum(timings.values()):.2f}s importing ({details})"
+            )
+        terminalreporter.line(
+            f"Slowest imports (python -X importtime, cumulative) for {HEAVY_MODULES}:"
+        )
+        for seconds, name in importtime_profile(HEAVY_MODULES):
+            terminalreporter.line(f"  {seconds:>6.3f}s  {name}")
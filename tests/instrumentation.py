@@ -0,0 +1,230 @@
+"""Per-example timing, LLM usage and tool call report.
+
+Enabled with `--example-report=PATH`. While each example runs, HTTP responses from LLM
+providers are counted and their `usage` blocks summed (Amazon Bedrock calls, which go
+through botocore rather than httpx, are counted there) and `Tool._run`/`Tool._arun`
+calls are counted. Import cost is measured once per worker instead, by timing the
+heavy imports the examples need at the start of the session (see import_profile.py).
+The controller writes everything to PATH as JSON (together with the pinned SDK rev, so
+reports from before and after an SDK bump can be compared) and prints a table sorted
+by wall time.
+"""
+
+import contextlib
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator
+from unittest.mock import patch
+
+import pytest
+
+from harness import pinned_sdk_rev
+from import_profile import HEAVY_MODULES, heavy_import_times
+from scheduling import LABEL_PROPERTY, get_label
+
+METRICS_PROPERTY = "example_metrics"
+IMPORT_TIME_OUTPUT_KEY = "docs_import_time"
+LLM_HOST_SUFFIXES = (
+    "api.openai.com",
+    "openai.azure.com",
+    "api.anthropic.com",
+    "api.mistral.ai",
+    "generativelanguage.googleapis.com",
+    "aiplatform.googleapis.com",
+)
+BEDROCK_SERVICE = "bedrock-runtime"
+
+
+@dataclass
+class ExampleMetrics:
+    wall_time: float = 0.0
+    llm_calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tool_calls: int = 0
+
+    def record_llm_response(self, response: Any) -> None:
+        """Count a response from an LLM provider and add up its token usage."""
+        self.llm_calls += 1
+        try:
+            body = response.json()
+        except Exception:  # streamed, not yet read, or not JSON
+            return
+        if not isinstance(body, dict):
+            return
+        usage = body.get("usage") or {}
+        self.tokens_in += usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+        self.tokens_out += (
+            usage.get("completion_tokens") or usage.get("output_tokens") or 0
+        )
+        gemini_usage = body.get("usageMetadata") or {}
+        self.tokens_in += gemini_usage.get("promptTokenCount", 0)
+        self.tokens_out += gemini_usage.get("candidatesTokenCount", 0)
+
+    def record_bedrock_response(self, response: dict) -> None:
+        """Count a Bedrock runtime call and add up its token usage."""
+        self.llm_calls += 1
+        # Converse reports usage; InvokeModel's is in a body stream left unread.
+        usage = response.get("usage") or {}
+        self.tokens_in += usage.get("inputTokens", 0)
+        self.tokens_out += usage.get("outputTokens", 0)
+
+
+def _is_llm_host(host: str) -> bool:
+    return host.endswith(LLM_HOST_SUFFIXES)
+
+
+@contextlib.contextmanager
+def count_llm_calls(metrics: ExampleMetrics) -> Iterator[None]:
+    import httpx
+
+    original_send = httpx.Client.send
+    original_async_send = httpx.AsyncClient.send
+
+    def send(client, request, *args, **kwargs):
+        response = original_send(client, request, *args, **kwargs)
+        if _is_llm_host(request.url.host):
+            metrics.record_llm_response(response)
+        return response
+
+    async def async_send(client, request, *args, **kwargs):
+        response = await original_async_send(client, request, *args, **kwargs)
+        if _is_llm_host(request.url.host):
+            metrics.record_llm_response(response)
+        return response
+
+    with (
+        patch.object(httpx.Client, "send", send),
+        patch.object(httpx.AsyncClient, "send", async_send),
+        _count_bedrock_calls(metrics),
+    ):
+        yield
+
+
+@contextlib.contextmanager
+def _count_bedrock_calls(metrics: ExampleMetrics) -> Iterator[None]:
+    try:
+        from botocore.client import BaseClient
+    except ImportError:  # the SDK's Bedrock extra isn't installed
+        yield
+        return
+
+    original_make_api_call = BaseClient._make_api_call
+
+    def make_api_call(client, operation_name, api_params):
+        response = original_make_api_call(client, operation_name, api_params)
+        if client.meta.service_model.service_name == BEDROCK_SERVICE:
+            metrics.record_bedrock_response(response)
+        return response
+
+    with patch.object(BaseClient, "_make_api_call", make_api_call):
+        yield
+
+
+@contextlib.contextmanager
+def _count_tool_calls(metrics: ExampleMetrics) -> Iterator[None]:
+    from portia.tool import Tool
+
+    original_run = Tool._run
+    original_arun = Tool._arun
+
+    def run(tool, *args, **kwargs):
+        metrics.tool_calls += 1
+        return original_run(tool, *args, **kwargs)
+
+    async def arun(tool, *args, **kwargs):
+        metrics.tool_calls += 1
+        return await original_arun(tool, *args, **kwargs)
+
+    with patch.object(Tool, "_run", run), patch.object(Tool, "_arun", arun):
+        yield
+
+
+class InstrumentationReport:
+    """Pytest plugin measuring each example and reporting at the end of the run."""
+
+    def __init__(self, config: pytest.Config, path: Path):
+        self.config = config
+        self.path = path
+        self.results: dict[str, dict[str, Any]] = {}
+        # Seconds each worker spent importing HEAVY_MODULES.
+        self.import_times: dict[str, float] = {}
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        workerinput = getattr(self.config, "workerinput", None)
+        # The xdist controller never imports the examples' dependencies.
+        if workerinput is None and self.config.getoption("numprocesses", None):
+            return
+        seconds = sum(heavy_import_times().values())
+        if workerinput is None:
+            self.import_times["main"] = seconds
+        else:
+            self.config.workeroutput[IMPORT_TIME_OUTPUT_KEY] = seconds
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error) -> None:
+        seconds = getattr(node, "workeroutput", {}).get(IMPORT_TIME_OUTPUT_KEY)
+        if seconds is not None:
+            self.import_times[node.gateway.id] = seconds
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: pytest.Item):
+        if get_label(item) is None:
+            yield
+            return
+        metrics = ExampleMetrics()
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(count_llm_calls(metrics))
+            stack.enter_context(_count_tool_calls(metrics))
+            start = time.perf_counter()
+            yield
+            metrics.wall_time = time.perf_counter() - start
+        item.user_properties.append((METRICS_PROPERTY, asdict(metrics)))
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        properties = dict(report.user_properties)
+        if report.when == "call" and METRICS_PROPERTY in properties:
+            self.results[properties[LABEL_PROPERTY]] = {
+                **properties[METRICS_PROPERTY],
+                "outcome": report.outcome,
+            }
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if not self.results:
+            return
+        terminalreporter.section("docs example report")
+        rows = sorted(self.results.items(), key=lambda row: -row[1]["wall_time"])
+        width = max(len(label) for label, _ in rows)
+        terminalreporter.line(
+            f"{'example':<{width}}  {'wall s':>7}  {'llm':>4}  "
+            f"{'tok in':>7}  {'tok out':>7}  {'tools':>5}  outcome"
+        )
+        for label, m in rows:
+            terminalreporter.line(
+                f"{label:<{width}}  {m['wall_time']:>7.2f}  {m['llm_calls']:>4}  "
+                f"{m['tokens_in']:>7}  {m['tokens_out']:>7}  {m['tool_calls']:>5}  "
+                f"{m['outcome']}"
+            )
+        if self.import_times:
+            details = ", ".join(
+                f"{worker} {seconds:.2f}s"
+                for worker, seconds in sorted(self.import_times.items())
+            )
+            terminalreporter.line(f"Importing {HEAVY_MODULES}: {details}")
+        terminalreporter.line(f"Full report written to {self.path}")
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if hasattr(self.config, "workerinput") or not self.results:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "sdk_rev": pinned_sdk_rev(),
+            "examples": self.results,
+            "import_time": self.import_times,
+        }
+        sharding = self.config.pluginmanager.get_plugin("docs_sharding")
+        if sharding is not None:
+            report["shard"] = sharding.manifest()
+        self.path.write_text(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,370 @@
+"""Check the internal links and anchors of the docs without building the site.
+
+Docusaurus only reports a broken link in a full build, and not at all for links in
+JSX (`<a href="...">`), which most of the SDK reference links are. This checker
+parses every page under docs/ (product, SDK reference, portia-tools and the _lib
+partials) for its route, its heading anchors, its links and its imports, then checks
+every internal link in a single pass over that index:
+
+- `/route`, `/route#anchor` and relative links must point at a page (or a file in
+  static/ or a route of src/pages), and the anchor at one of its headings or ids;
+- `#anchor` must be a heading or id of the page itself;
+- links to `.md`/`.mdx` files must point at an existing page;
+- imports of partials (`@site/docs/_lib/...`, `./_partial.mdx`) must exist.
+
+Headings of an imported partial are anchors of the page importing it. Routes follow
+Docusaurus: the `slug:` front matter, else the path with number prefixes stripped,
+with `index`, `README` and a page named after its folder standing for the folder.
+
+Parsed pages are cached in the pytest cache with their mtime, size and content hash,
+so only changed pages are parsed again; with more than a handful of those they are
+parsed in a process pool. The check itself always covers every page, since a change
+to one page can break links in any other.
+
+Run it with `python tests/link_check.py`.
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path, PurePosixPath
+from urllib.parse import unquote, urljoin
+
+from harness import atomic_write_bytes, get_cache_dir
+
+DOCS_ROOT = Path("docs")
+STATIC_PATH = Path("static")
+SITE_PAGES_PATH = Path("src/pages")
+PAGE_SUFFIXES = (".md", ".mdx")
+LINK_CACHE_FILE = "link_index.pickle"
+# Bump when the layout of the cached data changes.
+LINK_CACHE_VERSION = 1
+# Below this many pages to parse, starting a process pool costs more than it saves.
+MIN_PARALLEL_PAGES = 32
+
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_EXPLICIT_ID = re.compile(r"\s*\{#([^}]+)\}\s*$")
+_INLINE_CODE = re.compile(r"`+[^`]*`+")
+# [text](target "title") and ![alt](src), with one level of brackets in the text.
+_MARKDOWN_LINK = re.compile(
+    r"!?\[(?:[^\[\]]|\[[^\]]*\])*\]\(\s*<?([^)\s>]*)>?(?:\s+[\"'][^)]*)?\)"
+)
+_REFERENCE_LINK = re.compile(r"^\s*\[[^\]]+\]:\s*<?(\S+?)>?(?:\s|$)")
+_ATTRIBUTE_LINK = re.compile(r"\b(?:href|to)=[\"']([^\"']*)[\"']")
+_ATTRIBUTE_ID = re.compile(r"\b(?:id|name)=[\"']([^\"']+)[\"']")
+_IMPORT = re.compile(r"^import\s.*?\sfrom\s+[\"']([^\"']+)[\"']")
+_NUMBER_PREFIX = re.compile(r"^\d+\s*[-_.]+\s*")
+_EXTERNAL = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class Page:
+    """What the check needs to know about a docs page.
+
+    `route` is None for partials, which aren't pages of their own. `links` and
+    `imports` are `(line, target)` pairs.
+    """
+
+    path: Path
+    route: str | None
+    anchors: frozenset[str]
+    links: list[tuple[int, str]]
+    imports: list[tuple[int, str]]
+
+
+@dataclass
+class _CachedPage:
+    mtime_ns: int
+    size: int
+    digest: str
+    page: Page
+
+
+def slugify(text: str) -> str:
+    """The anchor Docusaurus gives a heading, as github-slugger makes it."""
+    return re.sub(r"[^\w\- ]", "", text.lower()).replace(" ", "-")
+
+
+def heading_text(markdown: str) -> str:
+    """Plain text of a heading's markdown."""
+    text = _MARKDOWN_LINK.sub(lambda m: m.group(0)[1 : m.group(0).index("]")], markdown)
+    text = _HTML_TAG.sub("", text).replace("`", "")
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+def _front_matter(lines: list[str]) -> tuple[dict[str, str], int]:
+    """The `key: value` pairs of the front matter and the number of lines it spans."""
+    if not lines or lines[0].strip() != "---":
+        return {}, 0
+    fields = {}
+    for number, line in enumerate(lines[1:], start=2):
+        if line.strip() == "---":
+            return fields, number
+        key, sep, value = line.partition(":")
+        if sep and not key.startswith((" ", "\t")):
+            fields[key.strip()] = value.strip().strip("\"'")
+    return {}, 0
+
+
+def page_route(relative: PurePosixPath, front_matter: dict[str, str]) -> str | None:
+    """The URL path Docusaurus serves a page at, or None for a partial."""
+    if any(part.startswith("_") for part in relative.parts):
+        return None
+    directories = [_NUMBER_PREFIX.sub("", part) for part in relative.parent.parts]
+    directory = "/" + "".join(f"{part}/" for part in directories)
+    slug = front_matter.get("slug")
+    if slug and slug.startswith("/"):
+        return slug
+    stem = relative.name
+    index_names = {"index", "readme", (relative.parent.name or "").lower()}
+    if not slug and stem.lower() in index_names:
+        return directory
+    return directory + (slug or front_matter.get("id") or _NUMBER_PREFIX.sub("", stem))
+
+
+def parse_page(path: Path, docs_root: Path = DOCS_ROOT) -> Page:
+    """Route, anchors, links and imports of the page at `path`."""
+    lines = path.read_text().splitlines()
+    front_matter, start = _front_matter(lines)
+    anchors: set[str] = set()
+    slug_counts: dict[str, int] = {}
+    links: list[tuple[int, str]] = []
+    imports: list[tuple[int, str]] = []
+    fence = None
+    for number, line in enumerate(lines[start:], start=start + 1):
+        match = _FENCE.match(line)
+        if fence:
+            closing = match.group(1) if match else ""
+            if closing[:1] == fence[0] and len(closing) >= len(fence):
+                fence = None
+            continue
+        if match:
+            fence = match.group(1)
+            continue
+        if import_match := _IMPORT.match(line):
+            imports.append((number, import_match.group(1)))
+            continue
+        if heading := _HEADING.match(line):
+            text = heading.group(2)
+            explicit = _EXPLICIT_ID.search(text)
+            if explicit:
+                anchors.add(explicit.group(1))
+            else:
+                # Repeated headings get -1, -2, ... appended, as in github-slugger.
+                slug = slugify(heading_text(text))
+                count = slug_counts.get(slug, 0)
+                slug_counts[slug] = count + 1
+                anchors.add(f"{slug}-{count}" if count else slug)
+        code_free = _INLINE_CODE.sub("", line)
+        anchors.update(_ATTRIBUTE_ID.findall(code_free))
+        for pattern in (_MARKDOWN_LINK, _ATTRIBUTE_LINK, _REFERENCE_LINK):
+            links.extend((number, target) for target in pattern.findall(code_free))
+    relative = PurePosixPath(path.relative_to(docs_root).with_suffix("").as_posix())
+    return Page(
+        path, page_route(relative, front_matter), frozenset(anchors), links, imports
+    )
+
+
+def parse_pages(
+    docs_root: Path = DOCS_ROOT, cache_dir: Path | None = None, jobs: int | None = None
+) -> tuple[list[Page], int]:
+    """Every page under `docs_root`, and how many of them had to be parsed again
+    because their content changed since the cached copy in `cache_dir` was written."""
+    cache_file = cache_dir / LINK_CACHE_FILE if cache_dir else None
+    cached = _read_cache(cache_file) if cache_file else {}
+
+    pages: dict[str, _CachedPage] = {}
+    stale: dict[str, tuple[int, int, str]] = {}
+    for path in sorted(docs_root.glob("**/*")):
+        if path.suffix not in PAGE_SUFFIXES or not path.is_file():
+            continue
+        stat = path.stat()
+        page = cached.get(str(path))
+        if page and (page.mtime_ns, page.size) == (stat.st_mtime_ns, stat.st_size):
+            pages[str(path)] = page
+            continue
+        # CI checkouts touch every file, so fall back to the content hash before
+        # deciding to parse the page again.
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if page and page.digest == digest:
+            pages[str(path)] = replace(
+                page, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+            )
+        else:
+            stale[str(path)] = (stat.st_mtime_ns, stat.st_size, digest)
+
+    paths = [Path(name) for name in stale]
+    if len(paths) >= MIN_PARALLEL_PAGES and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            roots = [docs_root] * len(paths)
+            parsed = list(executor.map(parse_page, paths, roots, chunksize=16))
+    else:
+        parsed = [parse_page(path, docs_root) for path in paths]
+    for page in parsed:
+        pages[str(page.path)] = _CachedPage(*stale[str(page.path)], page)
+
+    if cache_file and pages != cached:
+        atomic_write_bytes(cache_file, pickle.dumps((LINK_CACHE_VERSION, pages)))
+
+    return [pages[name].page for name in sorted(pages)], len(parsed)
+
+
+def _read_cache(cache_file: Path) -> dict[str, _CachedPage]:
+    try:
+        version, pages = pickle.loads(cache_file.read_bytes())
+    except (
+        OSError,
+        EOFError,
+        pickle.UnpicklingError,
+        AttributeError,
+        ValueError,
+        TypeError,
+    ):
+        return {}
+    return pages if version == LINK_CACHE_VERSION else {}
+
+
+def _normalise(route: str) -> str:
+    return route.rstrip("/") or "/"
+
+
+def site_routes(site_pages_path: Path = SITE_PAGES_PATH) -> set[str]:
+    """Routes of the React and Markdown pages in src/pages."""
+    routes = set()
+    for path in site_pages_path.glob("**/*"):
+        relative = path.relative_to(site_pages_path)
+        if path.is_file() and not any(p.startswith("_") for p in relative.parts):
+            route = "/" + relative.with_suffix("").as_posix()
+            routes.add(_normalise(route.removesuffix("index")))
+    return routes
+
+
+def _resolve_import(page: Page, spec: str) -> Path | None:
+    """The file a docs import points at, or None for packages and theme components."""
+    if spec.startswith("@site/"):
+        return Path(spec.removeprefix("@site/"))
+    if spec.startswith("."):
+        return page.path.parent / spec
+    return None
+
+
+def check_links(
+    pages: list[Page],
+    static_path: Path = STATIC_PATH,
+    extra_routes: set[str] | frozenset[str] = frozenset(),
+) -> list[str]:
+    """Broken internal links and imports of `pages`, one `path:line: message` each."""
+    by_path = {page.path: page for page in pages}
+    # Anchors of a page include those of the partials it imports, at any depth.
+    anchors: dict[Path, set[str]] = {}
+
+    def page_anchors(page: Page, seen: frozenset[Path] = frozenset()) -> set[str]:
+        if page.path not in anchors:
+            found = set(page.anchors)
+            for _, spec in page.imports:
+                target = _resolve_import(page, spec)
+                partial = (
+                    by_path.get(Path(os.path.normpath(target))) if target else None
+                )
+                if partial and partial.path not in seen:
+                    found |= page_anchors(partial, seen | {page.path})
+            anchors[page.path] = found
+        return anchors[page.path]
+
+    routes = {_normalise(page.route): page for page in pages if page.route is not None}
+    problems = []
+    for page in pages:
+        for line, spec in page.imports:
+            target = _resolve_import(page, spec)
+            if target is None or target.suffix not in PAGE_SUFFIXES:
+                continue
+            if not target.is_file():
+                problems.append(f"{page.path}:{line}: import of missing file {spec}")
+        for line, link in page.links:
+            problem = _check_link(
+                page, link, routes, by_path, page_anchors, static_path, extra_routes
+            )
+            if problem:
+                problems.append(f"{page.path}:{line}: {problem}")
+    return problems
+
+
+def _check_link(page, link, routes, by_path, page_anchors, static_path, extra_routes):
+    """Why `link` on `page` is broken, or None if it isn't (or can't be checked)."""
+    # External, mail and JSX-computed links are somebody else's problem.
+    if not link or _EXTERNAL.match(link) or "{" in link:
+        return None
+    location, _, fragment = link.partition("#")
+    location = unquote(location.partition("?")[0])
+    if not location:
+        # A partial's own anchors are checked; the page including it is unknown.
+        if fragment and fragment not in page_anchors(page) and page.route is not None:
+            return f"no anchor #{fragment} on this page"
+        return None
+    if location.endswith(PAGE_SUFFIXES):
+        target_path = Path(os.path.normpath(page.path.parent / location))
+        target = by_path.get(target_path)
+        if target is None:
+            return f"link to missing page {location}"
+    elif location.startswith("/") or page.route is not None:
+        # Relative URLs resolve against the page's URL, as in the browser.
+        route = _normalise(urljoin(page.route or "/", location))
+        target = routes.get(route)
+        if target is None:
+            if route in extra_routes or (static_path / route.lstrip("/")).is_file():
+                return None
+            return f"broken link to {link}"
+    else:
+        return None
+    if fragment and fragment not in page_anchors(target):
+        return f"no anchor #{fragment} on {target.route or target.path} (in {link})"
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "docs_root",
+        nargs="?",
+        type=Path,
+        default=DOCS_ROOT,
+        help=f"Directory of docs pages to check (default: {DOCS_ROOT})",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Processes to parse changed pages with (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Parse every page instead of reusing the results for unchanged pages",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache_dir = None if args.no_cache else get_cache_dir()
+    pages, parsed = parse_pages(args.docs_root, cache_dir, args.jobs)
+    problems = check_links(pages, extra_routes=site_routes())
+    for problem in problems:
+        print(problem)
+    links = sum(len(page.links) for page in pages)
+    print(
+        f"{links} links in {len(pages)} pages checked ({parsed} parsed) in "
+        f"{time.perf_counter() - start:.2f}s, {len(problems)} problem(s) found"
+    )
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Local stand-in for the Portia Cloud storage and tool endpoints.
+
+Enabled with `--local-cloud`. Every process that runs examples starts a threaded HTTP
+server holding plans, plan runs, outputs, end users and tool calls in memory, and
+points `PORTIA_API_ENDPOINT` at it, so `StorageClass.CLOUD`, `PortiaCloudStorage`
+and the Portia tool registry go through the SDK's real serialization and HTTP code
+without leaving the machine. `patch=portia_cloud_storage` is then not needed and is
+ignored. Each response is delayed by `--local-cloud-latency` seconds to stand in for
+the round trip to the hosted API, and the number and duration of the requests to
+each endpoint are reported at the end of the run.
+
+The tool registry serves every `portia:...` tool id mentioned in the examples selected
+to run (or their dependencies), with a schema accepting any arguments and a canned
+result.
+
+Run it on its own, e.g. to benchmark the SDK's storage paths, with
+`python tests/local_cloud.py --port 8000`.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, unquote
+
+import pytest
+
+from async_runner import get_example
+from example_index import get_example_index
+
+LOCAL_CLOUD_OUTPUT_KEY = "docs_local_cloud"
+# Patches made redundant by the stand-in.
+REPLACED_PATCHES = frozenset({"portia_cloud_storage"})
+PLAN_RUNS_PAGE_SIZE = 20
+TOOL_ID_PATTERN = re.compile(r"portia:[\w:]*\w")
+# The SDK sends ids both as `prun-<uuid>` and as the bare uuid.
+ID_PREFIX_PATTERN = re.compile(r"^(plan|prun|clar|step)-(?=[0-9a-f]{8}-)")
+NOT_FOUND = {"detail": "Not found."}
+NO_API_KEY = {"detail": "Authentication credentials were not provided."}
+
+
+def _key(object_id: str) -> str:
+    return ID_PREFIX_PATTERN.sub("", unquote(object_id))
+
+
+class LocalPortiaCloud:
+    """Threaded HTTP server holding the cloud's records in indexed dicts."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.plans: dict[str, dict] = {}
+        self.plan_runs: dict[str, dict] = {}
+        self.outputs: dict[tuple[str, str], dict] = {}
+        self.end_users: dict[str, dict] = {}
+        self.tool_calls: list[dict] = []
+        self.tools: dict[str, dict] = {}
+        # Secondary indexes, kept up to date by the handlers.
+        self._plans_by_query: dict[str, str] = {}
+        self._runs_by_state: dict[str, set[str]] = defaultdict(set)
+        # (method, route) -> [request count, seconds spent handling them]
+        self.stats: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0.0])
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.routes: list[tuple[str, str, re.Pattern, Callable]] = []
+        self.route("POST", r"/api/v0/plans/", self._save_plan)
+        self.route("GET", r"/api/v0/plans/", self._find_plan)
+        self.route("GET", r"/api/v0/plans/(?P<plan_id>[^/]+)/", self._get_plan)
+        self.route("POST", r"/api/v0/plans/embeddings/search/", self._similar_plans)
+        self.route("PUT", r"/api/v0/plan-runs/(?P<run_id>[^/]+)/", self._save_plan_run)
+        self.route("POST", r"/api/v0/plan-runs/", self._save_plan_run)
+        self.route("GET", r"/api/v0/plan-runs/", self._list_plan_runs)
+        self.route("GET", r"/api/v0/plan-runs/(?P<run_id>[^/]+)/", self._get_plan_run)
+        outputs = (
+            r"/api/v0/agent-memory/plan-runs/(?P<run_id>[^/]+)/outputs/(?P<name>[^/]+)/"
+        )
+        self.route("PUT", outputs, self._save_output)
+        self.route("POST", outputs, self._save_output)
+        self.route("GET", outputs, self._get_output)
+        self.route("POST", r"/api/v0/tool-calls/", self._save_tool_call)
+        self.route("POST", r"/api/v0/end-user/", self._save_end_user)
+        self.route(
+            "GET", r"/api/v0/end-user/(?P<external_id>[^/]+)/", self._get_end_user
+        )
+        self.route("GET", r"/api/v0/tools/descriptions/", self._list_tools)
+        self.route("GET", r"/api/v0/tools/descriptions-v2/", self._list_tools)
+        self.route("POST", r"/api/v0/tools/batch/ready/", self._ready)
+        self.route("POST", r"/api/v0/tools/(?P<tool_id>[^/]+)/ready/", self._ready)
+        self.route("POST", r"/api/v0/tools/(?P<tool_id>[^/]+)/run/", self._run_tool)
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, method: str, pattern: str, handler: Callable) -> None:
+        # Reported as e.g. /api/v0/plans/{plan_id}/
+        name = re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern)
+        self.routes.append((method, name, re.compile(f"{pattern}$"), handler))
+
+    def __enter__(self) -> "LocalPortiaCloud":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_tool(self, tool_id: str, description: str = "", output: Any = None) -> None:
+        """Serve `tool_id` from the registry; running it returns `output`."""
+        name = tool_id.rsplit(":", 1)[-1]
+        description = description or f"Local stand-in for {tool_id}"
+        with self.lock:
+            self.tools[tool_id] = {
+                "tool_id": tool_id,
+                "tool_name": name,
+                "should_summarize": False,
+                "description": {
+                    "overview_description": description,
+                    "overview": "",
+                    "output_description": "The result of the tool call",
+                },
+                "schema": {
+                    "title": name,
+                    "type": "object",
+                    "properties": {},
+                    "additionalProperties": True,
+                },
+                "output": output if output is not None else f"Result of {tool_id}",
+            }
+
+    # Handlers return (status code, JSON body)
+
+    def _save_plan(self, query: dict) -> tuple[int, Any]:
+        plan = query.get("body") or {}
+        plan_id = _key(plan.get("id", ""))
+        self.plans[plan_id] = plan
+        if "query" in plan:
+            self._plans_by_query[plan["query"]] = plan_id
+        return 201, plan
+
+    def _get_plan(self, query: dict, plan_id: str) -> tuple[int, Any]:
+        plan = self.plans.get(_key(plan_id))
+        return (200, plan) if plan else (404, NOT_FOUND)
+
+    def _find_plan(self, query: dict) -> tuple[int, Any]:
+        plan_id = self._plans_by_query.get(query.get("query", ""))
+        results = [self.plans[plan_id]] if plan_id else []
+        return 200, {"results": results, "count": len(results)}
+
+    def _similar_plans(self, query: dict) -> tuple[int, Any]:
+        # Word overlap stands in for the embedding similarity of the hosted API.
+        body = query.get("body") or {}
+        words = set(body.get("query", "").lower().split())
+        scored = []
+        for plan in self.plans.values():
+            other = set(plan.get("query", "").lower().split())
+            score = len(words & other) / len(words | other) if words | other else 0.0
+            if score >= float(body.get("threshold", 0.5)):
+                scored.append((score, plan))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return 200, [plan for _, plan in scored[: int(body.get("limit", 5))]]
+
+    def _save_plan_run(self, query: dict, run_id: str = "") -> tuple[int, Any]:
+        body = query.get("body") or {}
+        run_id = _key(run_id or body.get("id", ""))
+        previous = self.plan_runs.get(run_id)
+        if previous:
+            self._runs_by_state[previous.get("state", "")].discard(run_id)
+        plan_run = {"id": f"prun-{run_id}", **(previous or {}), **body}
+        self.plan_runs[run_id] = plan_run
+        self._runs_by_state[plan_run.get("state", "")].add(run_id)
+        return 200, self._plan_run_response(plan_run)
+
+    def _plan_run_response(self, plan_run: dict) -> dict:
+        # Stored in the shape the SDK sends, returned in the shape it reads.
+        return {
+            **plan_run,
+            "plan": {"id": plan_run.get("plan_id")},
+            "end_user": plan_run.get("end_user_id"),
+        }
+
+    def _get_plan_run(self, query: dict, run_id: str) -> tuple[int, Any]:
+        plan_run = self.plan_runs.get(_key(run_id))
+        if not plan_run:
+            return 404, NOT_FOUND
+        return 200, self._plan_run_response(plan_run)
+
+    def _list_plan_runs(self, query: dict) -> tuple[int, Any]:
+        state = query.get("run_state")
+        run_ids = self._runs_by_state.get(state, set()) if state else self.plan_runs
+        runs = [self._plan_run_response(self.plan_runs[run_id]) for run_id in run_ids]
+        page = int(query.get("page", 1))
+        total_pages = max(1, -(-len(runs) // PLAN_RUNS_PAGE_SIZE))
+        start = (page - 1) * PLAN_RUNS_PAGE_SIZE
+        return 200, {
+            "results": runs[start : start + PLAN_RUNS_PAGE_SIZE],
+            "count": len(runs),
+            "current_page": page,
+            "total_pages": total_pages,
+        }
+
+    def _save_output(self, query: dict, run_id: str, name: str) -> tuple[int, Any]:
+        output = query.get("body") or {}
+        self.outputs[(_key(run_id), unquote(name))] = output
+        return 200, output
+
+    def _get_output(self, query: dict, run_id: str, name: str) -> tuple[int, Any]:
+        output = self.outputs.get((_key(run_id), unquote(name)))
+        return (200, output) if output else (404, NOT_FOUND)
+
+    def _save_tool_call(self, query: dict) -> tuple[int, Any]:
+        self.tool_calls.append(query.get("body") or {})
+        return 201, {}
+
+    def _save_end_user(self, query: dict) -> tuple[int, Any]:
+        end_user = query.get("body") or {}
+        self.end_users[end_user.get("external_id", "")] = end_user
+        return 200, end_user
+
+    def _get_end_user(self, query: dict, external_id: str) -> tuple[int, Any]:
+        end_user = self.end_users.get(unquote(external_id))
+        return (200, end_user) if end_user else (404, NOT_FOUND)
+
+    def _list_tools(self, query: dict) -> tuple[int, Any]:
+        return 200, [
+            {k: v for k, v in tool.items() if k != "output"}
+            for tool in self.tools.values()
+        ]
+
+    def _ready(self, query: dict, tool_id: str = "") -> tuple[int, Any]:
+        return 200, {"ready": True, "clarifications": []}
+
+    def _run_tool(self, query: dict, tool_id: str) -> tuple[int, Any]:
+        tool = self.tools.get(unquote(tool_id))
+        if not tool:
+            return 404, {"detail": f"Unknown tool {unquote(tool_id)}"}
+        return 200, {"output": {"value": tool["output"]}}
+
+
+def _handler_for(cloud: LocalPortiaCloud) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _handle(self, method: str) -> None:
+            start = time.perf_counter()
+            path, _, query_string = self.path.partition("?")
+            query = dict(parse_qsl(query_string))
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            if body is not None:
+                query["body"] = body
+            if cloud.latency:
+                time.sleep(cloud.latency)
+            with cloud.lock:
+                if not self.headers.get("Authorization", "").startswith("Api-Key "):
+                    route, status, payload = "unauthorized", 401, NO_API_KEY
+                else:
+                    for route_method, route, pattern, handler in cloud.routes:
+                        match = pattern.match(path)
+                        if route_method == method and match:
+                            status, payload = handler(query, **match.groupdict())
+                            break
+                    else:
+                        route, status, payload = f"unhandled {path}", 404, NOT_FOUND
+                data = json.dumps(payload).encode()
+                stats = cloud.stats[(method, route)]
+                stats[0] += 1
+                stats[1] += time.perf_counter() - start
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            self._handle("GET")
+
+        def do_POST(self) -> None:
+            self._handle("POST")
+
+        def do_PUT(self) -> None:
+            self._handle("PUT")
+
+    return Handler
+
+
+class LocalCloud:
+    """Pytest plugin running a `LocalPortiaCloud` in each process that runs examples."""
+
+    def __init__(self, config: pytest.Config, latency: float):
+        self.config = config
+        self.latency = latency
+        self.cloud: LocalPortiaCloud | None = None
+        self.stats: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0.0])
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        # The xdist controller never runs examples.
+        if not hasattr(self.config, "workerinput") and self.config.getoption(
+            "numprocesses", None
+        ):
+            return
+        self.cloud = LocalPortiaCloud(latency=self.latency).__enter__()
+        os.environ["PORTIA_API_ENDPOINT"] = self.cloud.url
+        # Any key will do, but one has to be set for the SDK to use the cloud.
+        os.environ.setdefault("PORTIA_API_KEY", "local-cloud")
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        if self.cloud is None:
+            return
+        # Only the examples that will run, so the other pages are never read.
+        index = get_example_index(config)
+        tool_ids = set()
+        for item in items:
+            example = get_example(item)
+            if example is not None:
+                source = index.resolve(example).source
+                tool_ids.update(TOOL_ID_PATTERN.findall(source))
+        for tool_id in sorted(tool_ids):
+            self.cloud.add_tool(tool_id)
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if self.cloud is None:
+            return
+        self.cloud.__exit__(None, None, None)
+        if hasattr(self.config, "workerinput"):
+            self.config.workeroutput[LOCAL_CLOUD_OUTPUT_KEY] = [
+                [method, route, count, seconds]
+                for (method, route), (count, seconds) in self.cloud.stats.items()
+            ]
+        else:
+            self._add_stats(
+                [method, route, count, seconds]
+                for (method, route), (count, seconds) in self.cloud.stats.items()
+            )
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error) -> None:
+        rows = getattr(node, "workeroutput", {}).get(LOCAL_CLOUD_OUTPUT_KEY, [])
+        self._add_stats(rows)
+
+    def _add_stats(self, rows) -> None:
+        for method, route, count, seconds in rows:
+            stats = self.stats[(method, route)]
+            stats[0] += count
+            stats[1] += seconds
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if hasattr(self.config, "workerinput"):
+            return
+        terminalreporter.section("docs example local cloud")
+        if not self.stats:
+            terminalreporter.line("no requests to the local Portia Cloud")
+            return
+        for (method, route), (count, seconds) in sorted(
+            self.stats.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            terminalreporter.line(
+                f"{count:>6} x {method:<4} {route}  {seconds / count * 1000:.1f}ms avg"
+            )
+        unhandled = [route for _, route in self.stats if route.startswith("unhandled")]
+        if unhandled:
+            terminalreporter.line(
+                f"{len(unhandled)} route(s) the stand-in doesn't implement were "
+                "called; those examples may have failed because of it",
+                yellow=True,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Portia Cloud stand-in")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to delay each response"
+    )
+    parser.add_argument(
+        "--tool", action="append", default=[], help="Tool id to serve (repeatable)"
+    )
+    args = parser.parse_args()
+
+    cloud = LocalPortiaCloud(port=args.port, latency=args.latency)
+    for tool_id in args.tool:
+        cloud.add_tool(tool_id)
+    print(f"Local Portia Cloud listening on {cloud.url}; set PORTIA_API_ENDPOINT to it")
+    cloud.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
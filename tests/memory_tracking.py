@@ -0,0 +1,223 @@
+"""Per-example memory use and leak detection, and recycling of bloated workers.
+
+Every example in a worker runs in the same interpreter, so whatever an example leaves
+behind (tool registries, MCP clients, background threads, event loops, sockets) stays
+for the rest of the run.
+
+With `--memory-report`, the growth of the process's resident set size and of the
+memory traced by `tracemalloc` is recorded for each example, together with the
+threads, event loops and file descriptors it opened and left open. The examples
+that grew the most and the ones that leaked are listed at the end of the run.
+
+With `--max-worker-memory MB`, an xdist worker whose resident set grows past MB after
+an example stops taking new examples, finishes the ones already assigned to it and
+is replaced by a fresh worker, as xdist does for crashed workers.
+"""
+
+import asyncio
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+from weakref import WeakSet
+
+import pytest
+
+from scheduling import get_label
+
+MEMORY_PROPERTY = "example_memory"
+RSS_PROPERTY = "worker_rss"
+TOP_EXAMPLES = 10
+# How long threads an example started get to finish before they count as leaked.
+THREAD_GRACE_SECONDS = 0.2
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where it can't be read)."""
+    try:
+        # The second field of statm is the resident set, in pages.
+        return int(Path("/proc/self/statm").read_text().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def open_files() -> dict[int, str]:
+    """This process's open file descriptors and what they point to, where the
+    platform lists them."""
+    fds = {}
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return fds
+    for name in names:
+        try:
+            fds[int(name)] = os.readlink(f"/proc/self/fd/{name}")
+        except OSError:
+            # Closed meanwhile, e.g. the descriptor used to list the directory.
+            pass
+    return fds
+
+
+def _mib(size: int) -> str:
+    return f"{size / 2**20:+.1f} MiB"
+
+
+class MemoryTracker:
+    """Pytest plugin measuring what each example leaves behind."""
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self.results: dict[str, dict[str, Any]] = {}
+        self.loops: WeakSet[asyncio.AbstractEventLoop] = WeakSet()
+        self._loop_patch = None
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        # The xdist controller never runs examples.
+        if not hasattr(self.config, "workerinput") and self.config.getoption(
+            "numprocesses", None
+        ):
+            return
+        tracemalloc.start()
+        loops = self.loops
+        original_init = asyncio.BaseEventLoop.__init__
+
+        def init(loop, *args, **kwargs):
+            original_init(loop, *args, **kwargs)
+            loops.add(loop)
+
+        self._loop_patch = patch.object(asyncio.BaseEventLoop, "__init__", init)
+        self._loop_patch.start()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: pytest.Item) -> Iterator[None]:
+        if get_label(item) is None:
+            yield
+            return
+        threads = set(threading.enumerate())
+        loops = set(self.loops)
+        files = open_files()
+        gc.collect()
+        rss, traced = current_rss(), tracemalloc.get_traced_memory()[0]
+        yield
+        # Whatever is merely unreferenced would be freed (and closed) anyway.
+        gc.collect()
+        deadline = time.monotonic() + THREAD_GRACE_SECONDS
+        new_threads = [t for t in threading.enumerate() if t not in threads]
+        for thread in new_threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        item.user_properties.append(
+            (
+                MEMORY_PROPERTY,
+                {
+                    "rss_delta": current_rss() - rss,
+                    "traced_delta": tracemalloc.get_traced_memory()[0] - traced,
+                    "threads": sorted(t.name for t in new_threads if t.is_alive()),
+                    "event_loops": sum(
+                        1
+                        for loop in self.loops
+                        if loop not in loops and not loop.is_closed()
+                    ),
+                    "files": sorted(
+                        target for fd, target in open_files().items() if fd not in files
+                    ),
+                },
+            )
+        )
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        properties = dict(report.user_properties)
+        if report.when == "call" and MEMORY_PROPERTY in properties:
+            self.results[get_label(report)] = properties[MEMORY_PROPERTY]
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if self._loop_patch is not None:
+            self._loop_patch.stop()
+            tracemalloc.stop()
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if hasattr(self.config, "workerinput") or not self.results:
+            return
+        terminalreporter.section("docs example memory")
+        by_growth = sorted(self.results.items(), key=lambda row: -row[1]["rss_delta"])
+        terminalreporter.line(f"Largest growth of the resident set ({TOP_EXAMPLES}):")
+        for label, m in by_growth[:TOP_EXAMPLES]:
+            terminalreporter.line(
+                f"  {label}: RSS {_mib(m['rss_delta'])}, "
+                f"traced {_mib(m['traced_delta'])}"
+            )
+        leaks = [
+            (label, m)
+            for label, m in sorted(self.results.items())
+            if m["threads"] or m["event_loops"] or m["files"]
+        ]
+        terminalreporter.line(f"{len(leaks)} example(s) left resources open:")
+        for label, m in leaks:
+            details = []
+            if m["threads"]:
+                details.append(f"threads {', '.join(m['threads'])}")
+            if m["event_loops"]:
+                details.append(f"{m['event_loops']} unclosed event loop(s)")
+            if m["files"]:
+                details.append(f"files {', '.join(m['files'])}")
+            terminalreporter.line(f"  {label}: {'; '.join(details)}")
+
+
+class WorkerRecycler:
+    """Pytest plugin replacing xdist workers that outgrow a memory limit.
+
+    Workers attach their resident set size to every report. On the controller, a
+    worker over the limit is sent xdist's shutdown command, so it is given no new
+    examples and exits once it has run the ones it already has. A new worker is then
+    started in its place, the same way xdist replaces a crashed one.
+    """
+
+    def __init__(self, config: pytest.Config, max_rss: int):
+        self.config = config
+        self.max_rss = max_rss
+        self.recycling: set = set()
+        self.recycled: list[tuple[str, int]] = []
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item, call: pytest.CallInfo):
+        outcome = yield
+        if call.when == "teardown":
+            outcome.get_result().user_properties.append((RSS_PROPERTY, current_rss()))
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        # xdist sets the worker a report came from on the controller only.
+        node = getattr(report, "node", None)
+        rss = dict(report.user_properties).get(RSS_PROPERTY, 0)
+        if node is None or rss <= self.max_rss or node in self.recycling:
+            return
+        if self.config.pluginmanager.getplugin("dsession").shuttingdown:
+            return
+        self.recycling.add(node)
+        self.recycled.append((node.gateway.id, rss))
+        node.shutdown()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error) -> None:
+        if node not in self.recycling:
+            return
+        self.recycling.discard(node)
+        dsession = self.config.pluginmanager.getplugin("dsession")
+        if error is None and not dsession.shuttingdown:
+            # How xdist starts the replacement of a crashed worker, without counting
+            # towards --max-worker-restart.
+            dsession._clone_node(node)
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if not self.recycled:
+            return
+        terminalreporter.section("docs example worker recycling")
+        for worker, rss in self.recycled:
+            terminalreporter.line(
+                f"{worker} replaced at {rss / 2**20:.0f} MiB "
+                f"(limit {self.max_rss / 2**20:.0f} MiB)"
+            )
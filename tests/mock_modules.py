@@ -0,0 +1,64 @@
+"""Importable stand-ins for the modules the docs import but that don't exist.
+
+The docs import things like `my_custom_tools.registry`. A meta path finder serves
+those names as real (and, once imported, cached) modules whose attributes come from
+stand-in objects, so every other import in the examples and the SDK runs through
+the normal import machinery untouched.
+"""
+
+import importlib.abc
+import importlib.machinery
+import sys
+import types
+from typing import Any, Callable
+
+
+class MockModuleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Finder and loader for the stand-in modules and their parent packages.
+
+    `get_stand_ins` returns a mapping of module name to the object providing its
+    attributes. It is only called when a stand-in is first imported.
+    """
+
+    def __init__(self, names: list[str], get_stand_ins: Callable[[], dict[str, Any]]):
+        self._names = set(names)
+        self._packages = {
+            name.rsplit(".", i)[0]
+            for name in names
+            for i in range(1, name.count(".") + 1)
+        }
+        self._get_stand_ins = get_stand_ins
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None):
+        if fullname in self._names or fullname in self._packages:
+            return importlib.machinery.ModuleSpec(
+                fullname, self, is_package=fullname in self._packages
+            )
+        return None
+
+    def create_module(self, spec: importlib.machinery.ModuleSpec) -> None:
+        return None  # use the default module creation
+
+    def exec_module(self, module: types.ModuleType) -> None:
+        if module.__name__ in self._names:
+            stand_in = self._get_stand_ins()[module.__name__]
+
+            # PEP 562: attributes the module doesn't define come from the stand-in,
+            # and are then kept on the module so later lookups are plain ones.
+            def __getattr__(name: str) -> Any:
+                # The import system probes for e.g. __path__ on every `from` import.
+                if name.startswith("__"):
+                    raise AttributeError(name)
+                value = getattr(stand_in, name)
+                setattr(module, name, value)
+                return value
+
+            module.__getattr__ = __getattr__
+
+    def install(self) -> None:
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        sys.meta_path.remove(self)
+        for name in self._names | self._packages:
+            sys.modules.pop(name, None)
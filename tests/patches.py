@@ -0,0 +1,57 @@
+"""Optional patches that examples request with `patch=<name>` tags."""
+
+import copy
+import functools
+from typing import Any, Callable
+from unittest.mock import MagicMock, patch
+
+
+@functools.cache
+def get_default_config() -> Any:
+    """The default portia Config, loaded once per worker.
+
+    Examples may modify the config they are given, so don't hand this one out.
+    """
+    from portia import Config
+
+    return Config.from_default()
+
+
+def _patch_cloud_storage():
+    get_plan_mock = MagicMock()
+    get_plan_mock.pretty_print.return_value = ""
+    get_plan_run_mock = MagicMock()
+    get_plan_run_mock.pretty_print.return_value = ""
+    get_storage_mock = MagicMock()
+    get_storage_mock.get_plan_run.return_value = get_plan_run_mock
+    get_storage_mock.get_plan.return_value = get_plan_mock
+    return patch("portia.storage.PortiaCloudStorage", return_value=get_storage_mock)
+
+
+def _patch_config():
+    # A copy per use, so one example's changes don't leak into the next.
+    return patch(
+        "portia.Config.from_default",
+        return_value=copy.deepcopy(get_default_config()),
+    )
+
+
+PATCHES: dict[str, Callable[[], Any]] = {
+    "st_process_stream": lambda: patch(
+        "steelthread.steelthread.SteelThread.process_stream"
+    ),
+    "st_run_evals": lambda: patch("steelthread.steelthread.SteelThread.run_evals"),
+    "mcp_registry_load_tools": lambda: patch("portia.McpToolRegistry._load_tools"),
+    "portia_run_plan": lambda: patch("portia.Portia.run_plan"),
+    "portia_arun_plan": lambda: patch("portia.Portia.arun_plan"),
+    "portia_cloud_storage": _patch_cloud_storage,
+    "portia_config": _patch_config,
+}
+
+
+def get_optional_patch(patch_name: str):
+    """Create fresh patch objects for each test to avoid parallel execution issues."""
+    if patch_name in PATCHES:
+        return PATCHES[patch_name]()
+    else:
+        raise ValueError(f"Unknown patch name: {patch_name}")
@@ -0,0 +1,123 @@
+"""Static checks of the example tags, run before any example does.
+
+Mistakes in the fence tags otherwise only show up once the affected example runs, or
+not at all: a `skip=true` without a `skip_reason=` fails inside the test, an unknown
+`patch=` name raises from `get_optional_patch`, and a `depends_on=` id that doesn't
+exist, is defined twice or leads back to itself is silently resolved to something
+other than what the author meant. The checks only read the example index, so they
+take well under a second and the xdist controller runs them before starting any
+workers.
+
+Run them on their own with `python tests/preflight.py`.
+"""
+
+import argparse
+import sys
+from collections.abc import Collection
+from pathlib import Path
+
+from example_index import (
+    DOCS_PATH,
+    ExampleIndex,
+    build_index,
+    get_dependency_ids,
+    get_example_id,
+    get_patch_names,
+    is_skip_tagged,
+)
+from harness import get_cache_dir
+from patches import PATCHES
+
+
+def check_examples(index: ExampleIndex, patch_names: Collection[str]) -> list[str]:
+    """Problems with the tags of the indexed examples, one `path:line: message` each."""
+    problems = []
+    first_with_id: dict[str, str] = {}
+    # Sync and async tabs of the same snippet often share an id, which only matters
+    # when something depends on it.
+    referenced = {d for example in index.examples for d in get_dependency_ids(example)}
+    for example in index.examples:
+        where = f"{example.path}:{example.start_line}"
+        tags = example.prefix_tags()
+        if is_skip_tagged(example) and not any(
+            tag.startswith("skip_reason=") for tag in tags
+        ):
+            problems.append(f"{where}: skip=true must be accompanied by a skip_reason=")
+        for name in get_patch_names(example):
+            if name not in patch_names:
+                problems.append(f"{where}: unknown patch={name}")
+        example_id = get_example_id(example)
+        if example_id in first_with_id and example_id in referenced:
+            problems.append(
+                f"{where}: id={example_id} is already used at "
+                f"{first_with_id[example_id]}, so depends_on={example_id} is ambiguous"
+            )
+        elif example_id and example_id not in first_with_id:
+            first_with_id[example_id] = where
+        for dependency_id in get_dependency_ids(example):
+            if dependency_id not in index.by_id:
+                problems.append(f"{where}: depends_on={dependency_id} matches no id=")
+    problems.extend(_check_cycles(index))
+    return problems
+
+
+def _check_cycles(index: ExampleIndex) -> list[str]:
+    """Report every `depends_on` cycle among the ids once."""
+    graph = {
+        example_id: [d for d in get_dependency_ids(example) if d in index.by_id]
+        for example_id, example in index.by_id.items()
+    }
+    problems = []
+    done: set[str] = set()
+    for start in sorted(graph):
+        if start in done:
+            continue
+        # Iterative depth-first search, tracking the current path to spot back edges.
+        path: list[str] = []
+        on_path: set[str] = set()
+        stack: list[tuple[str, int]] = [(start, 0)]
+        while stack:
+            node, i = stack.pop()
+            if i == 0:
+                path.append(node)
+                on_path.add(node)
+            if i < len(graph[node]):
+                stack.append((node, i + 1))
+                child = graph[node][i]
+                if child in on_path:
+                    cycle = path[path.index(child) :] + [child]
+                    example = index.by_id[child]
+                    problems.append(
+                        f"{example.path}:{example.start_line}: depends_on cycle "
+                        + " -> ".join(cycle)
+                    )
+                elif child not in done:
+                    stack.append((child, 0))
+            else:
+                path.pop()
+                on_path.discard(node)
+                done.add(node)
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "docs_path",
+        nargs="?",
+        type=Path,
+        default=DOCS_PATH,
+        help=f"Directory of docs pages to check (default: {DOCS_PATH})",
+    )
+    args = parser.parse_args()
+
+    index = build_index(args.docs_path, cache_dir=get_cache_dir())
+    problems = check_examples(index, PATCHES)
+    for problem in problems:
+        print(problem)
+    print(f"{len(index.examples)} examples checked, {len(problems)} problem(s) found")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Skip examples that already passed with exactly the same inputs.
+
+Every example run records the digest of its resolved source, tags and the pinned SDK
+rev (see `harness.example_digest`), combined with the digest of the harness itself and
+the dependency set (see `harness.harness_digest`). Digests of passing runs are kept in
+the pytest cache, and an example whose digest is already there is skipped on the next
+run.
+Failures are always re-run. Pass `--all-examples` to ignore the cache. Without the
+pytest cache (`-p no:cacheprovider`) or with `--quarantine=only` every example runs.
+"""
+
+import hashlib
+
+import pytest
+from pytest_examples import CodeExample
+
+from harness import example_digest, harness_digest
+from scheduling import get_label
+
+DIGEST_PROPERTY = "example_digest"
+
+
+class ResultCache:
+    """Pytest plugin holding the digests of examples that passed on earlier runs."""
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self.cache = getattr(config, "cache", None)
+        # Benchmarks need every example to run, and a quarantined example only leaves
+        # quarantine by passing again (see `flakes.FlakeTracker`).
+        self.enabled = self.cache is not None and not (
+            config.getoption("all_examples")
+            or config.getoption("benchmark")
+            or config.getoption("quarantine") == "only"
+        )
+        # Replayed runs only prove the example works against the recorded traffic.
+        self.cache_key = f"docs-examples/passed-{config.getoption('cassette_mode')}"
+        self.previous: dict[str, str] = (
+            self.cache.get(self.cache_key, {}) if self.cache is not None else {}
+        )
+        self.passed: dict[str, str] = {}
+        self.ran: set[str] = set()
+
+    def digest(self, example: CodeExample) -> str:
+        """Key of a run of the resolved example with this harness."""
+        data = f"{example_digest(example)}\0{harness_digest()}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def is_cached(self, example: CodeExample) -> bool:
+        """Whether the resolved example passed before and will be skipped."""
+        return self.enabled and self.digest(example) in self.previous
+
+    def check(self, item: pytest.Item, example: CodeExample) -> None:
+        """Record the digest of the resolved example and skip it if it passed before."""
+        item.user_properties.append((DIGEST_PROPERTY, self.digest(example)))
+        if self.is_cached(example):
+            pytest.skip(
+                "passed on an earlier run with the same source, tags, harness "
+                "and SDK rev"
+            )
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        digest = dict(report.user_properties).get(DIGEST_PROPERTY)
+        if digest is None or report.when != "call":
+            return
+        # Labels, unlike node ids, don't change with the xdist_group of the example.
+        label = get_label(report)
+        self.ran.add(label)
+        if report.passed or (report.skipped and digest in self.previous):
+            self.passed[digest] = label
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        # Workers report to the controller, which writes the cache once.
+        if hasattr(self.config, "workerinput") or self.cache is None:
+            return
+        # Keep earlier passes of examples that were not run this time (e.g. -k), but
+        # forget the old digests of the ones that were.
+        kept = {
+            digest: label
+            for digest, label in self.previous.items()
+            if label not in self.ran
+        }
+        self.cache.set(self.cache_key, kept | self.passed)
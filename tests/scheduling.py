@@ -0,0 +1,154 @@
+"""Cost-aware ordering of the examples across xdist workers.
+
+Durations of earlier runs are kept in the pytest cache. When running under xdist,
+workers order the examples longest-first so the default `--dist load` scheduler hands
+out the slow plans before the quick imports (longest processing time first). With
+`--dist loadgroup` the examples are instead packed into one `xdist_group` per worker
+with the same greedy algorithm. The predicted and actual makespan are printed at the
+end of the run.
+"""
+
+import heapq
+import statistics
+import time
+
+import pytest
+
+from example_index import get_example_index
+
+DURATIONS_CACHE_KEY = "docs-examples/durations"
+LABEL_PROPERTY = "example_label"
+# Weight of the latest run in the moving average of an example's duration.
+SMOOTHING = 0.5
+
+
+def lpt_schedule(costs: dict[str, float], workers: int) -> list[list[str]]:
+    """Greedily assign the costliest remaining job to the least loaded worker."""
+    bins: list[list[str]] = [[] for _ in range(workers)]
+    loads = [(0.0, i) for i in range(workers)]
+    for name in sorted(costs, key=lambda name: (-costs[name], name)):
+        load, i = heapq.heappop(loads)
+        bins[i].append(name)
+        heapq.heappush(loads, (load + costs[name], i))
+    return bins
+
+
+def makespan(costs: dict[str, float], bins: list[list[str]]) -> float:
+    return max((sum(costs[name] for name in b) for b in bins), default=0.0)
+
+
+def uses_loadgroup(config: pytest.Config) -> bool:
+    """Whether the run uses `--dist loadgroup`.
+
+    xdist resets `dist` to "no" on the workers and sets `loadgroup` instead.
+    """
+    return config.getoption("dist", "no") == "loadgroup" or bool(
+        getattr(config.option, "loadgroup", False)
+    )
+
+
+def get_label(item: pytest.Item) -> str | None:
+    return dict(item.user_properties).get(LABEL_PROPERTY)
+
+
+class DurationScheduler:
+    """Pytest plugin predicting example durations and recording the actual ones."""
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        # Every example is new without the pytest cache (`-p no:cacheprovider`).
+        self.cache = getattr(config, "cache", None)
+        self.history: dict[str, float] = (
+            self.cache.get(DURATIONS_CACHE_KEY, {}) if self.cache is not None else {}
+        )
+        self.durations: dict[str, float] = {}
+        # Skipped runs (e.g. cached passes) say nothing about an example's cost.
+        self.skipped: set[str] = set()
+        self.worker_durations: dict[str, float] = {}
+        self.start = time.perf_counter()
+
+    def predict(self, labels: list[str]) -> dict[str, float]:
+        """Predicted duration of each example, using the median for new ones."""
+        default = statistics.median(self.history.values()) if self.history else 1.0
+        return {label: self.history.get(label, default) for label in labels}
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        index = get_example_index(config)
+        for item in items:
+            if hasattr(item, "callspec") and "example" in item.callspec.params:
+                item.user_properties.append(
+                    (LABEL_PROPERTY, index.label(item.callspec.params["example"]))
+                )
+
+        # Order only matters when the examples are spread across workers.
+        workerinput = getattr(config, "workerinput", None)
+        if workerinput is None:
+            return
+        costs = self.predict([get_label(item) for item in items if get_label(item)])
+        if uses_loadgroup(config):
+            bins = lpt_schedule(costs, workerinput["workercount"])
+            group = {label: i for i, b in enumerate(bins) for label in b}
+            for item in items:
+                # Leave items that already belong to a group (e.g. async examples).
+                if item.get_closest_marker("xdist_group") is not None:
+                    continue
+                if get_label(item) in group:
+                    name = f"lpt-{group[get_label(item)]}"
+                    item.add_marker(pytest.mark.xdist_group(name=name))
+        else:
+            items.sort(key=lambda item: -costs.get(get_label(item), 0.0))
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        label = dict(report.user_properties).get(LABEL_PROPERTY)
+        if label is None:
+            return
+        if report.skipped:
+            self.skipped.add(label)
+        self.durations[label] = self.durations.get(label, 0.0) + report.duration
+        node = getattr(report, "node", None)
+        worker = node.gateway.id if node is not None else "main"
+        self.worker_durations[worker] = (
+            self.worker_durations.get(worker, 0.0) + report.duration
+        )
+
+    def measured(self) -> dict[str, float]:
+        return {
+            label: duration
+            for label, duration in self.durations.items()
+            if label not in self.skipped
+        }
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if not self.durations or hasattr(self.config, "workerinput"):
+            return
+        workers = max(len(self.worker_durations), 1)
+        terminalreporter.section("docs example scheduling")
+        if self.history:
+            costs = self.predict(list(self.measured()))
+            predicted = f"{makespan(costs, lpt_schedule(costs, workers)):.1f}s"
+        else:
+            predicted = "unknown (no duration history yet)"
+        terminalreporter.line(
+            f"{len(self.measured())} examples on {workers} worker(s): "
+            f"predicted makespan {predicted}, "
+            f"actual {max(self.worker_durations.values()):.1f}s "
+            f"(wall clock {time.perf_counter() - self.start:.1f}s)"
+        )
+        for worker, busy in sorted(self.worker_durations.items()):
+            terminalreporter.line(f"  {worker}: {busy:.1f}s busy")
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if (
+            hasattr(self.config, "workerinput")
+            or self.cache is None
+            or not self.measured()
+        ):
+            return
+        history = dict(self.history)
+        for label, duration in self.measured().items():
+            previous = history.get(label, duration)
+            history[label] = SMOOTHING * duration + (1 - SMOOTHING) * previous
+        self.cache.set(DURATIONS_CACHE_KEY, history)
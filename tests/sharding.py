@@ -0,0 +1,169 @@
+"""Split the examples across machines with `--shard i/N`.
+
+Examples linked by `depends_on` form the connected components of a dependency graph,
+and whole components are assigned to shards so no chain is split between machines.
+Components are packed with the same longest-processing-time-first algorithm the
+scheduler uses across workers, so every shard gets a similar amount of work.
+
+Every shard has to arrive at the same partition, so it can't depend on the durations
+in each machine's own pytest cache. Durations come from an example report of an
+earlier run passed with `--shard-durations` (e.g. the merged report of the last
+sharded run), and without one every example counts the same.
+
+Each shard records the shard it ran and a fingerprint of the whole partition as JUnit
+properties and in the `--example-report`. `.github/scripts/merge_shard_results.py`
+uses them to check that the shards agreed on the partition and each reported all of
+its examples before merging.
+"""
+
+import hashlib
+import json
+import re
+import statistics
+from pathlib import Path
+
+import pytest
+from _pytest.junitxml import xml_key
+
+from example_index import ExampleIndex, get_example_index
+from scheduling import lpt_schedule, makespan
+
+_SHARD_PATTERN = re.compile(r"^(\d+)/(\d+)$")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse `i/N` into (i, N), with shards numbered from 1."""
+    match = _SHARD_PATTERN.match(value)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"expected i/N with 1 <= i <= N, got {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def load_durations(path: Path | None) -> dict[str, float]:
+    """Wall time of each example in an `--example-report`, or {} without one."""
+    if path is None:
+        return {}
+    report = json.loads(path.read_text())
+    return {label: m["wall_time"] for label, m in report["examples"].items()}
+
+
+def dependency_components(index: ExampleIndex) -> list[list[str]]:
+    """Labels of the examples grouped into the connected components of the
+    `depends_on` graph, each sorted, in order of their first label."""
+    parent = {index.label(example): index.label(example) for example in index.examples}
+
+    def find(label: str) -> str:
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    for example in index.examples:
+        for dependency in index.dependencies(example):
+            a, b = find(index.label(example)), find(index.label(dependency))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    components: dict[str, list[str]] = {}
+    for label in parent:
+        components.setdefault(find(label), []).append(label)
+    return sorted(sorted(component) for component in components.values())
+
+
+class ShardSelector:
+    """Pytest plugin deselecting the examples that belong to other shards."""
+
+    def __init__(
+        self,
+        config: pytest.Config,
+        shard: int,
+        shard_count: int,
+        durations: dict[str, float],
+    ):
+        self.config = config
+        self.shard = shard
+        self.shard_count = shard_count
+        self.durations = durations
+        self._partition: list[list[str]] | None = None
+        self._predicted: dict[str, float] = {}
+
+    @property
+    def partition(self) -> list[list[str]]:
+        """Labels of the examples in each shard, computed once per process."""
+        if self._partition is None:
+            components = dependency_components(get_example_index(self.config))
+            # New examples are assumed to take the median time.
+            default = (
+                statistics.median(self.durations.values()) if self.durations else 1.0
+            )
+            self._predicted = {
+                label: self.durations.get(label, default)
+                for component in components
+                for label in component
+            }
+            # Components are named after their first label, which is unique.
+            costs = {
+                component[0]: sum(self._predicted[label] for label in component)
+                for component in components
+            }
+            members = {component[0]: component for component in components}
+            bins = lpt_schedule(costs, self.shard_count)
+            self._partition = [
+                sorted(label for name in b for label in members[name]) for b in bins
+            ]
+        return self._partition
+
+    def fingerprint(self) -> str:
+        """Digest of the whole partition; identical on every shard of a run."""
+        data = "\n".join(",".join(labels) for labels in self.partition)
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+    def manifest(self) -> dict:
+        return {
+            "shard": f"{self.shard}/{self.shard_count}",
+            "fingerprint": self.fingerprint(),
+            "examples": len(self.partition[self.shard - 1]),
+            "total_examples": sum(len(labels) for labels in self.partition),
+        }
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        index = get_example_index(config)
+        selected = set(self.partition[self.shard - 1])
+        kept, deselected = [], []
+        for item in items:
+            example = getattr(item, "callspec", None) and item.callspec.params.get(
+                "example"
+            )
+            if example is None or index.label(example) in selected:
+                kept.append(item)
+            else:
+                deselected.append(item)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = kept
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        # The JUnit report is written by the controller, not the xdist workers.
+        xml = self.config.stash.get(xml_key, None)
+        if xml is not None and not hasattr(self.config, "workerinput"):
+            for name, value in self.manifest().items():
+                xml.add_global_property(f"docs_{name}", str(value))
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        if hasattr(self.config, "workerinput"):
+            return
+        manifest = self.manifest()
+        terminalreporter.section("docs example sharding")
+        terminalreporter.line(
+            f"shard {manifest['shard']}: {manifest['examples']} of "
+            f"{manifest['total_examples']} examples "
+            f"(partition {manifest['fingerprint']})"
+        )
+        for i, labels in enumerate(self.partition, start=1):
+            load = makespan(self._predicted, [labels])
+            terminalreporter.line(
+                f"  shard {i}: {len(labels)} examples, predicted {load:.1f}s"
+            )
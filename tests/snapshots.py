@@ -0,0 +1,79 @@
+"""Run shared dependency chains once per worker and start dependents from a snapshot.
+
+Normally an example with `depends_on=` runs the source of its whole dependency chain
+followed by its own. With `--snapshot-dependencies` the chain is executed one example
+at a time, the module namespace after each step is kept, and later examples that
+depend on the same chain (with the same patches) start from a copy of that namespace
+instead of re-running it. Values are deep-copied where possible so one dependent can't
+see another's changes; values that can't be copied (modules, clients holding locks or
+sockets, ...) are shared as a whole, along with everything they reference.
+"""
+
+import copy
+from collections import ChainMap
+from typing import Any
+
+from pytest_examples import CodeExample, EvalExample
+
+
+def _copy_namespace(namespace: dict[str, Any]) -> dict[str, Any]:
+    # One memo for the whole namespace keeps aliasing between names intact. Each
+    # value is copied against a scratch layer over it, merged only once the copy
+    # succeeds, so the half-copied parts of a value that fails aren't reused.
+    memo: dict[int, Any] = {}
+    copied = {}
+    for name, value in namespace.items():
+        scratch = ChainMap({}, memo)
+        try:
+            copied[name] = copy.deepcopy(value, scratch)
+        except Exception:
+            copied[name] = value
+        else:
+            memo.update(scratch.maps[0])
+    return copied
+
+
+def _user_globals(module_dict: dict[str, Any]) -> dict[str, Any]:
+    # Leave __name__, __file__, __builtins__ etc. to the module that runs next.
+    return {
+        name: value
+        for name, value in module_dict.items()
+        if not (name.startswith("__") and name.endswith("__"))
+    }
+
+
+class DependencySnapshots:
+    """Namespaces left behind by dependency chains, keyed by chain and patches."""
+
+    def __init__(self) -> None:
+        self._namespaces: dict[tuple, dict[str, Any]] = {}
+
+    def run(
+        self,
+        eval_example: EvalExample,
+        dependencies: list[CodeExample],
+        example: CodeExample,
+        patch_names: list[str],
+    ) -> None:
+        """Run `example` on top of the namespace its dependencies leave behind."""
+        namespace = self._namespace_after(
+            eval_example, dependencies, tuple(patch_names)
+        )
+        eval_example.run(example, module_globals=_copy_namespace(namespace))
+
+    def _namespace_after(
+        self,
+        eval_example: EvalExample,
+        chain: list[CodeExample],
+        patch_names: tuple[str, ...],
+    ) -> dict[str, Any]:
+        if not chain:
+            return {}
+        key = (patch_names, tuple(str(example) for example in chain))
+        if key not in self._namespaces:
+            namespace = self._namespace_after(eval_example, chain[:-1], patch_names)
+            module_dict = eval_example.run(
+                chain[-1], module_globals=_copy_namespace(namespace)
+            )
+            self._namespaces[key] = _user_globals(module_dict)
+        return self._namespaces[key]
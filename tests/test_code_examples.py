@@ -1,169 +1,125 @@
+import functools
 from contextlib import ExitStack
-from typing import Any, Callable
+from typing import Any, Iterator
 from unittest.mock import MagicMock, patch
 
 import pytest
-from dotenv import load_dotenv
-from portia import Config, FileReaderTool, FileWriterTool, InMemoryToolRegistry
-from pytest_examples import CodeExample, EvalExample, find_examples
-
-load_dotenv(override=True)
-
-# Create a mock module with custom_tool_registry defined
-mock_registry_module = MagicMock()
-mock_registry_module.custom_tool_registry = InMemoryToolRegistry.from_local_tools(
-    [FileReaderTool(), FileWriterTool()]
+from pytest_examples import EvalExample
+
+from async_runner import AsyncExampleRunner
+from cassettes import CassetteLibrary
+from example_index import (
+    ExampleIndex,
+    ExampleRecord,
+    get_example_index,
+    get_patch_names,
+    is_skip_tagged,
 )
-
-IMPORTS_TO_MOCK = {
-    "my_custom_tools.file_writer_tool": MagicMock(),
-    "my_custom_tools.file_reader_tool": MagicMock(),
-    "my_custom_tools.registry": mock_registry_module,
-}
-
-
-def get_optional_patch(patch_name: str):
-    """Create fresh patch objects for each test to avoid parallel execution issues."""
-    # Create fresh patches for each invocation to avoid parallel test conflicts
-
-    get_plan_mock = MagicMock()
-    get_plan_mock.pretty_print.return_value = ""
-    get_plan_run_mock = MagicMock()
-    get_plan_run_mock.pretty_print.return_value = ""
-    get_storage_mock = MagicMock()
-    get_storage_mock.get_plan_run.return_value = get_plan_run_mock
-    get_storage_mock.get_plan.return_value = get_plan_mock
-    patch_map = {
-        "st_process_stream": lambda: patch(
-            "steelthread.steelthread.SteelThread.process_stream"
-        ),
-        "st_run_evals": lambda: patch("steelthread.steelthread.SteelThread.run_evals"),
-        "mcp_registry_load_tools": lambda: patch("portia.McpToolRegistry._load_tools"),
-        "portia_run_plan": lambda: patch("portia.Portia.run_plan"),
-        "portia_arun_plan": lambda: patch("portia.Portia.arun_plan"),
-        "portia_cloud_storage": lambda: patch(
-            "portia.storage.PortiaCloudStorage",
-            return_value=get_storage_mock,
-        ),
-        "portia_config": lambda: patch(
-            "portia.Config.from_default", return_value=Config.from_default()
-        ),
+from local_cloud import REPLACED_PATCHES, LocalCloud
+from mock_modules import MockModuleFinder
+from patches import get_optional_patch
+from result_cache import ResultCache
+from snapshots import DependencySnapshots
+
+IMPORTS_TO_MOCK = [
+    "my_custom_tools.file_writer_tool",
+    "my_custom_tools.file_reader_tool",
+    "my_custom_tools.registry",
+]
+
+
+@functools.cache
+def get_imports_to_mock() -> dict[str, Any]:
+    """Stand-ins for the imports we use in docs that don't actually exist, built once
+    per worker when the docs first import one of them."""
+    # Imported here so that collecting the tests, which every xdist worker does,
+    # doesn't pay for importing portia.
+    from portia import FileReaderTool, FileWriterTool, InMemoryToolRegistry
+
+    # Create a mock module with custom_tool_registry defined
+    mock_registry_module = MagicMock()
+    mock_registry_module.custom_tool_registry = (
+        InMemoryToolRegistry.from_local_tools([FileReaderTool(), FileWriterTool()])
+    )
+    return {
+        "my_custom_tools.file_writer_tool": MagicMock(),
+        "my_custom_tools.file_reader_tool": MagicMock(),
+        "my_custom_tools.registry": mock_registry_module,
     }
 
-    if patch_name in patch_map:
-        return patch_map[patch_name]()
-    else:
-        raise ValueError(f"Unknown patch name: {patch_name}")
 
-
-@pytest.mark.parametrize("example", find_examples("docs/product/"), ids=str)
-def test_docstrings(example: CodeExample, eval_example: EvalExample):
+@pytest.fixture(scope="session", autouse=True)
+def mock_modules() -> Iterator[None]:
+    """Serve IMPORTS_TO_MOCK from a meta path finder for the whole session."""
+    finder = MockModuleFinder(IMPORTS_TO_MOCK, get_imports_to_mock)
+    finder.install()
+    yield
+    finder.uninstall()
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "example" in metafunc.fixturenames:
+        index = get_example_index(metafunc.config)
+        metafunc.parametrize("example", index.examples, ids=str)
+
+
+def test_docstrings(
+    example: ExampleRecord,
+    eval_example: EvalExample,
+    example_index: ExampleIndex,
+    cassettes: CassetteLibrary,
+    result_cache: ResultCache,
+    snapshots: DependencySnapshots | None,
+    async_runner: AsyncExampleRunner | None,
+    local_cloud: LocalCloud | None,
+    request: pytest.FixtureRequest,
+):
     # If the example has depends_on=example1, then we'll look for an example with id=example1
     # and load that code in before the current example.
-    dependent_examples = _get_all_dependencies(example)
-    example.source = "\n".join(
-        [dependent_example.source for dependent_example in dependent_examples]
-        + [example.source]
-    )
+    resolved_example = example_index.resolve(example)
 
     # Skip any tests that have skip=true as a tag
-    if "skip=true" in example.prefix_tags():
+    if is_skip_tagged(example):
         assert any(tag.startswith("skip_reason=") for tag in example.prefix_tags()), (
             "skip=true must be accompanied by a skip_reason="
         )
         return
 
-    # We mock out some imports that we use in docs that don't actually exist
-    original_import = __import__
+    result_cache.check(request.node, resolved_example)
 
     # Create all the context managers we need
     contexts = [
-        patch(
-            "builtins.__import__",
-            side_effect=lambda name, *args, **kwargs: mock_import(
-                name, original_import, args, kwargs
-            ),
-        ),
         patch("builtins.input", side_effect=mock_input),
+        cassettes.use(resolved_example),
     ]
     # Apply any optional patches specified in test tags
-    patch_tags = [
-        tag.split("patch=")[1] for tag in example.prefix_tags() if "patch=" in tag
-    ]
+    patch_tags = get_patch_names(example)
     for patch_name in patch_tags:
+        if local_cloud is not None and patch_name in REPLACED_PATCHES:
+            continue
         contexts.append(get_optional_patch(patch_name))
 
+    def execute(example: ExampleRecord, eval_example: EvalExample) -> None:
+        if snapshots is not None:
+            dependencies = [
+                example_index.load(dependency)
+                for dependency in example_index.dependencies(example)
+            ]
+            snapshots.run(
+                eval_example, dependencies, example_index.load(example), patch_tags
+            )
+        else:
+            eval_example.run(example_index.resolve(example))
+
+    if async_runner is not None and async_runner.handles(request.node):
+        async_runner.run(request, eval_example, execute, contexts, result_cache)
+        return
+
     # Use ExitStack to handle all context managers
     with ExitStack() as stack:
         for context in contexts:
             stack.enter_context(context)
-        eval_example.run(example)
-
-
-def _get_all_dependencies(
-    example: CodeExample, visited: set[str] = None
-) -> list[CodeExample]:
-    """Recursively get all dependencies for an example."""
-    if visited is None:
-        visited = set()
-
-    # Get the example ID if it exists
-    example_id = None
-    for tag in example.prefix_tags():
-        if tag.startswith("id="):
-            example_id = tag.split("id=")[1]
-            break
-
-    # Prevent infinite loops
-    if example_id and example_id in visited:
-        return []
-
-    if example_id:
-        visited.add(example_id)
-
-    # Find the depends_on tag
-    depends_on_tag = None
-    for tag in example.prefix_tags():
-        if tag.startswith("depends_on="):
-            depends_on_tag = tag
-            break
-
-    if not depends_on_tag:
-        return []
-
-    # Extract dependency IDs (comma-separated)
-    dependency_ids = depends_on_tag.split("depends_on=")[1].split(",")
-    dependency_ids = [dep_id.strip() for dep_id in dependency_ids]  # Remove whitespace
-
-    # Recursively retrieve dependencies
-    all_dependencies = []
-    for dep_id in dependency_ids:
-        try:
-            dep_example = _get_example_by_id(dep_id)
-            nested_dependencies = _get_all_dependencies(dep_example, visited.copy())
-            all_dependencies.extend(nested_dependencies)
-            if dep_example not in all_dependencies:
-                all_dependencies.append(dep_example)
-        except ValueError:
-            # Skip if dependency not found
-            continue
-
-    return all_dependencies
-
-
-def _get_example_by_id(id: str) -> CodeExample:
-    for example in find_examples("docs/product/"):
-        if f"id={id}" in example.prefix_tags():
-            return example
-    raise ValueError(f"Example with id {id} not found")
-
-
-def mock_import(
-    name: str, original_import: Callable[[str, Any, Any], Any], args: Any, kwargs: Any
-) -> Any:
-    if name in IMPORTS_TO_MOCK:
-        return IMPORTS_TO_MOCK[name]
-    return original_import(name, *args, **kwargs)
+        execute(example, eval_example)
 
 
 def mock_input(prompt: str) -> str:
@@ -0,0 +1,95 @@
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+TESTS_PATH = Path(__file__).parent.parent
+
+PAGE = """\
+```python id=broken
+import asyncio
+
+async def main():
+    await asyncio.sleep(0.2)
+    raise ValueError("async failure")
+
+asyncio.run(main())
+```
+
+```python
+print("sync examples run outside the batch")
+```
+
+```python depends_on=broken
+asyncio.run(main())
+```
+
+```python id=setup
+import asyncio
+
+async def main():
+    await asyncio.sleep(0.2)
+    return 5
+
+value = asyncio.run(main())
+```
+
+```python depends_on=setup
+assert asyncio.run(main()) == value
+```
+"""
+
+
+def run_examples(tmp_path: Path, *args: str) -> dict[int, tuple[str, str]]:
+    """Run the harness on PAGE, returning the outcome and message of each example
+    by its first line."""
+    shutil.copytree(
+        TESTS_PATH,
+        tmp_path / "tests",
+        ignore=shutil.ignore_patterns("unit", "cassettes", "__pycache__"),
+    )
+    shutil.copy(TESTS_PATH.parent / "pyproject.toml", tmp_path)
+    (tmp_path / "docs" / "product").mkdir(parents=True)
+    (tmp_path / "docs" / "product" / "Async.md").write_text(PAGE)
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pytest",
+            "-p",
+            "no:cacheprovider",
+            "--junitxml=junit.xml",
+            *args,
+        ],
+        cwd=tmp_path,
+        capture_output=True,
+        # A batch waiting for an example that never runs hangs the run.
+        timeout=120,
+    )
+    outcomes = {}
+    for testcase in ET.parse(tmp_path / "junit.xml").iter("testcase"):
+        line = int(testcase.get("name").split(":")[-1].split("-")[0])
+        results = [r for r in testcase if r.tag in ("failure", "error", "skipped")]
+        if not results:
+            outcomes[line] = ("passed", "")
+        else:
+            outcomes[line] = (results[0].tag, results[0].get("message", ""))
+    return outcomes
+
+
+@pytest.mark.parametrize(
+    "args", [[], ["-n", "2", "--dist", "loadgroup"]], ids=["no-xdist", "xdist"]
+)
+def test_batch_with_a_failing_member_and_dependencies(tmp_path, args):
+    outcomes = run_examples(tmp_path, "--async-concurrency=4", *args)
+    assert outcomes[1][0] == "failure"
+    assert outcomes[11] == ("passed", "")
+    # Submitted with the batch, but waits for the failure and is skipped.
+    assert outcomes[15][0] == "skipped"
+    assert "blocked by id=broken" in outcomes[15][1]
+    # The rest of the batch is unaffected, and sees the state its dependency left.
+    assert outcomes[19] == ("passed", "")
+    assert outcomes[29] == ("passed", "")
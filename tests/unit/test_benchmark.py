@@ -0,0 +1,48 @@
+from benchmark import compare, percentile, previous_run
+
+
+def run(sdk_rev: str, **examples: tuple[float, int]) -> dict:
+    return {
+        "sdk_rev": sdk_rev,
+        "iterations": 5,
+        "examples": {
+            label: {"p50": p50, "p90": p50, "max": p50, "peak_memory": memory}
+            for label, (p50, memory) in examples.items()
+        },
+    }
+
+
+def test_compare_flags_regressions_first():
+    before = run("old", fast=(1.0, 2**20), slower=(1.0, 2**20), bigger=(1.0, 2**20))
+    after = run(
+        "new",
+        fast=(0.5, 2**20),
+        slower=(1.5, 2**20),
+        bigger=(1.0, 10 * 2**20),
+        added=(1.0, 2**20),
+    )
+    rows = compare(before, after)
+    assert [(row["example"], row["regressed"]) for row in rows] == [
+        ("slower", ["p50"]),
+        ("bigger", ["peak_memory"]),
+        ("fast", []),
+    ]
+
+
+def test_compare_ignores_changes_below_the_noise_floor():
+    before = run("old", tiny=(0.001, 1000))
+    after = run("new", tiny=(0.005, 5000))
+    assert compare(before, after)[0]["regressed"] == []
+
+
+def test_previous_run_skips_the_same_rev():
+    runs = [run("a"), run("b"), run("c")]
+    assert previous_run(runs, "c")["sdk_rev"] == "b"
+    assert previous_run(runs, "b")["sdk_rev"] == "c"
+    assert previous_run([run("a")], "a") is None
+
+
+def test_percentile():
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 90) == 4.0
+    assert percentile([7.0], 90) == 7.0
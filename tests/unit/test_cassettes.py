@@ -0,0 +1,82 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+from pytest_examples import CodeExample
+
+from cassettes import CassetteLibrary
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"answer": 42}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Set-Cookie", "session=secret")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_example(source="print('hi')\n"):
+    path = Path("docs/product/Guide/page.md")
+    return CodeExample(source, path, 1, 3, 0, len(source), "py", 0)
+
+
+def test_record_then_replay(tmp_path, server):
+    example = make_example()
+    url = f"http://127.0.0.1:{server.server_port}/answer"
+    with CassetteLibrary("record", tmp_path).use(example):
+        response = requests.get(url, headers={"Authorization": "key"})
+    assert response.json() == {"answer": 42}
+
+    path = CassetteLibrary("record", tmp_path).path_for(example)
+    assert path.parent == tmp_path / "Guide" / "page"
+    interaction = json.loads(gzip.decompress(path.read_bytes()))["interactions"][0]
+    assert "Authorization" not in interaction["request"]["headers"]
+    assert set(interaction["response"]["headers"]) == {"Content-Type"}
+
+    # The cassette answers instead of the server.
+    server.shutdown()
+    with CassetteLibrary("replay", tmp_path).use(example):
+        response = requests.get(url)
+    assert response.json() == {"answer": 42}
+
+
+def test_examples_without_traffic_are_recorded_too(tmp_path):
+    example = make_example()
+    with CassetteLibrary("record", tmp_path).use(example):
+        pass
+    with CassetteLibrary("replay", tmp_path).use(example):
+        pass
+
+
+def test_replay_skips_examples_without_a_cassette(tmp_path):
+    with pytest.raises(pytest.skip.Exception, match="re-record"):
+        CassetteLibrary("replay", tmp_path).use(make_example())
+
+
+def test_prune_removes_cassettes_of_edited_examples(tmp_path):
+    library = CassetteLibrary("record", tmp_path)
+    old, new = make_example(), make_example("print('edited')\n")
+    for example in [old, new]:
+        with library.use(example):
+            pass
+    assert library.prune([new]) == [library.path_for(old)]
+    assert library.path_for(new).exists()
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+from compile_cache import CompileCache
+
+
+@pytest.fixture
+def compile_cache(tmp_path):
+    basetemp = tmp_path / "basetemp"
+    basetemp.mkdir()
+    config = SimpleNamespace(
+        cache=SimpleNamespace(mkdir=lambda name: tmp_path / "cache"),
+        getini=lambda name: False,
+        _tmp_path_factory=SimpleNamespace(getbasetemp=lambda: basetemp),
+    )
+    return CompileCache(config)
+
+
+def write_example(directory, source="assert 1 + 1 == 3\n"):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "page_1_3.py"
+    path.write_text(source)
+    return path
+
+
+def test_examples_are_compiled_once(compile_cache, pytestconfig):
+    basetemp = compile_cache.config._tmp_path_factory.getbasetemp()
+    first = write_example(basetemp / "test_a0")
+    second = write_example(basetemp / "test_b0")
+    compile_cache.rewrite_test(first, pytestconfig)
+    _, code = compile_cache.rewrite_test(second, pytestconfig)
+    assert (compile_cache.hits, compile_cache.misses) == (1, 1)
+    # The cached code names this run's file, and its assertions are rewritten.
+    assert code.co_filename == str(second)
+    with pytest.raises(AssertionError, match=r"assert \(1 \+ 1\) == 3"):
+        exec(code, {})
+
+
+def test_other_modules_bypass_the_cache(compile_cache, pytestconfig, tmp_path):
+    path = write_example(tmp_path / "tests" / "unit")
+    compile_cache.rewrite_test(path, pytestconfig)
+    compile_cache.rewrite_test(path, pytestconfig)
+    assert (compile_cache.hits, compile_cache.misses) == (0, 0)
+    assert not (tmp_path / "cache").exists()
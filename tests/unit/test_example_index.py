@@ -0,0 +1,99 @@
+import pickle
+
+import pytest
+
+from example_index import ExampleIndex, ExampleRecord, build_index
+
+PAGE = """\
+# Setup
+
+```python id=setup
+x = 1
+```
+
+Prose.
+
+```python depends_on=setup id=double
+y = x * 2
+```
+
+```python depends_on=double
+assert y == 2
+```
+"""
+
+OTHER_PAGE = """\
+```python
+print("other")
+```
+"""
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "page.md").write_text(PAGE)
+    (docs / "other.md").write_text(OTHER_PAGE)
+    return docs
+
+
+def test_labels_use_ids_or_positions(docs):
+    index = build_index(docs)
+    assert [index.label(example) for example in index.examples] == [
+        f"{docs / 'other.md'}#1",
+        f"{docs / 'page.md'}#setup",
+        f"{docs / 'page.md'}#double",
+        f"{docs / 'page.md'}#3",
+    ]
+
+
+def test_resolve_prepends_dependencies(docs):
+    index = build_index(docs)
+    last = index.examples[-1]
+    assert index.dependencies(last) == [index.get("setup"), index.get("double")]
+    assert index.resolve(last).source == "x = 1\n\ny = x * 2\n\nassert y == 2\n"
+    assert index.resolve(last).start_line == last.start_line
+
+
+def test_get_unknown_id():
+    with pytest.raises(ValueError, match="missing not found"):
+        ExampleIndex([]).get("missing")
+
+
+def test_cache_reparses_only_changed_pages(docs, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    build_index(docs, cache_dir)
+    parsed = []
+    original = ExampleRecord.from_code_example
+    monkeypatch.setattr(
+        ExampleRecord,
+        "from_code_example",
+        lambda example: parsed.append(example.path.name) or original(example),
+    )
+    assert len(build_index(docs, cache_dir).examples) == 4
+    assert parsed == []
+
+    (docs / "other.md").write_text(OTHER_PAGE + OTHER_PAGE)
+    assert len(build_index(docs, cache_dir).examples) == 5
+    assert parsed == ["other.md", "other.md"]
+
+
+def test_records_read_their_source_lazily(docs):
+    example = build_index(docs).examples[1]
+    assert example._source is None
+    assert example.source == "x = 1\n"
+    assert "id=setup" in example.prefix_tags()
+
+
+def test_pickled_records_leave_out_the_source(docs):
+    example = build_index(docs).examples[1]
+    assert example.source
+    copy = pickle.loads(pickle.dumps(example))
+    assert copy._source is None
+    assert (copy.path, copy.start_line, copy.tags) == (
+        example.path,
+        example.start_line,
+        example.tags,
+    )
+    assert copy.source == example.source
@@ -0,0 +1,50 @@
+import pytest
+
+from example_index import build_index
+from fail_fast import find_broken
+
+PAGE = """\
+```python id=setup
+x = 1
+y = 2
+```
+
+```python id=middle depends_on=setup
+z = y / {divisor}
+```
+
+```python depends_on=middle
+z += x
+{last_line}
+```
+"""
+
+
+def run_resolved(tmp_path, divisor, last_line):
+    """Run the last example of the page with its dependencies prepended, as the
+    harness does, and return the index, the example and the traceback it raised."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "page.md").write_text(PAGE.format(divisor=divisor, last_line=last_line))
+    index = build_index(docs)
+    example = index.examples[-1]
+    module_file = tmp_path / f"page_{example.start_line}_{example.end_line}.py"
+    code = compile(index.resolve(example).source, str(module_file), "exec")
+    with pytest.raises(Exception) as excinfo:
+        exec(code, {})
+    return index, example, excinfo.tb
+
+
+def test_blames_the_dependency_that_raised(tmp_path):
+    index, example, tb = run_resolved(tmp_path, "0", "pass")
+    assert find_broken(index, example, tb) is index.get("middle")
+
+
+def test_blames_the_example_itself(tmp_path):
+    index, example, tb = run_resolved(tmp_path, "1", "raise RuntimeError")
+    assert find_broken(index, example, tb) is example
+
+
+def test_blames_the_example_without_a_frame_in_it(tmp_path):
+    index, example, _ = run_resolved(tmp_path, "0", "pass")
+    assert find_broken(index, example, None) is example
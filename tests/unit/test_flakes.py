@@ -0,0 +1,25 @@
+import pytest
+
+from flakes import FAILED, FLAKY, PASSED, flake_rate, is_quarantined
+
+
+@pytest.mark.parametrize(
+    ("outcomes", "quarantined"),
+    [
+        ("", False),
+        # Too few runs to judge, however flaky.
+        (FLAKY * 4, False),
+        (PASSED * 4 + FLAKY, True),
+        (PASSED * 9 + FLAKY, False),
+        (PASSED * 8 + FLAKY * 2, True),
+        # Outright failures aren't flakes.
+        (FAILED * 10, False),
+    ],
+)
+def test_is_quarantined(outcomes, quarantined):
+    assert is_quarantined(outcomes) is quarantined
+
+
+def test_flake_rate():
+    assert flake_rate("") == 0.0
+    assert flake_rate(PASSED + FLAKY + FAILED + FLAKY) == 0.5
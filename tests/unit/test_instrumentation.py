@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from instrumentation import ExampleMetrics, _is_llm_host
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        # OpenAI
+        {"usage": {"prompt_tokens": 3, "completion_tokens": 5}},
+        # Anthropic
+        {"usage": {"input_tokens": 3, "output_tokens": 5}},
+        # Gemini
+        {"usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 5}},
+    ],
+)
+def test_llm_responses_add_up_their_usage(body):
+    metrics = ExampleMetrics()
+    metrics.record_llm_response(FakeResponse(body))
+    metrics.record_llm_response(FakeResponse(body))
+    assert (metrics.llm_calls, metrics.tokens_in, metrics.tokens_out) == (2, 6, 10)
+
+
+def test_unreadable_responses_are_still_counted():
+    metrics = ExampleMetrics()
+    metrics.record_llm_response(FakeResponse(ValueError("streamed")))
+    metrics.record_llm_response(FakeResponse(["not", "a", "dict"]))
+    assert (metrics.llm_calls, metrics.tokens_in, metrics.tokens_out) == (2, 0, 0)
+
+
+def test_bedrock_responses_add_up_their_usage():
+    metrics = ExampleMetrics()
+    metrics.record_bedrock_response({"usage": {"inputTokens": 3, "outputTokens": 5}})
+    # InvokeModel's usage is in the unread body.
+    metrics.record_bedrock_response({"body": SimpleNamespace()})
+    assert (metrics.llm_calls, metrics.tokens_in, metrics.tokens_out) == (2, 3, 5)
+
+
+def test_llm_hosts():
+    assert _is_llm_host("api.openai.com")
+    assert _is_llm_host("my-resource.openai.azure.com")
+    assert not _is_llm_host("api.portialabs.ai")
@@ -0,0 +1,39 @@
+from pathlib import PurePosixPath
+
+import pytest
+
+from link_check import page_route, slugify
+
+
+@pytest.mark.parametrize(
+    ("heading", "slug"),
+    [
+        ("Getting started", "getting-started"),
+        ("Run `Portia.run()` with tools!", "run-portiarun-with-tools"),
+        ("Plans & plan runs", "plans--plan-runs"),
+        ("snake_case and kebab-case", "snake_case-and-kebab-case"),
+        ("Ünïcode héading", "ünïcode-héading"),
+    ],
+)
+def test_slugify(heading, slug):
+    assert slugify(heading) == slug
+
+
+@pytest.mark.parametrize(
+    ("path", "front_matter", "route"),
+    [
+        ("product/Get started/install.md", {}, "/product/Get started/install"),
+        ("product/01-Guide/02-Basics.md", {}, "/product/Guide/Basics"),
+        ("product/Guide/index.md", {}, "/product/Guide/"),
+        ("product/Guide/README.mdx", {}, "/product/Guide/"),
+        ("product/Guide/Guide.md", {}, "/product/Guide/"),
+        ("product/Guide/page.md", {"id": "custom"}, "/product/Guide/custom"),
+        ("product/Guide/page.md", {"slug": "relative"}, "/product/Guide/relative"),
+        ("product/Guide/page.md", {"slug": "/absolute"}, "/absolute"),
+        ("product/Guide/index.md", {"slug": "named"}, "/product/Guide/named"),
+        ("product/_partials/snippet.md", {}, None),
+    ],
+)
+def test_page_route(path, front_matter, route):
+    relative = PurePosixPath(path).with_suffix("")
+    assert page_route(relative, front_matter) == route
@@ -0,0 +1,95 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import local_cloud
+from example_index import ExampleIndex, ExampleRecord
+from local_cloud import LocalCloud, LocalPortiaCloud
+
+HEADERS = {"Authorization": "Api-Key local-cloud"}
+
+
+@pytest.fixture
+def cloud():
+    with LocalPortiaCloud() as cloud:
+        yield cloud
+
+
+def test_plans_and_plan_runs(cloud):
+    plan_id = str(uuid.uuid4())
+    plan = {"id": f"plan-{plan_id}", "query": "find the weather"}
+    response = requests.post(f"{cloud.url}/api/v0/plans/", json=plan, headers=HEADERS)
+    assert response.status_code == 201
+    # The SDK sends ids both with and without their prefix.
+    response = requests.get(f"{cloud.url}/api/v0/plans/{plan_id}/", headers=HEADERS)
+    assert response.json() == plan
+
+    run_id = str(uuid.uuid4())
+    for state in ["IN_PROGRESS", "COMPLETE"]:
+        requests.put(
+            f"{cloud.url}/api/v0/plan-runs/prun-{run_id}/",
+            json={"state": state, "plan_id": plan["id"]},
+            headers=HEADERS,
+        )
+    runs = requests.get(
+        f"{cloud.url}/api/v0/plan-runs/",
+        params={"run_state": "IN_PROGRESS"},
+        headers=HEADERS,
+    ).json()
+    assert runs["count"] == 0
+    run = requests.get(f"{cloud.url}/api/v0/plan-runs/{run_id}/", headers=HEADERS)
+    assert run.json()["state"] == "COMPLETE"
+    assert run.json()["plan"] == {"id": plan["id"]}
+
+
+def test_requests_need_an_api_key(cloud):
+    response = requests.get(f"{cloud.url}/api/v0/plans/", timeout=5)
+    assert response.status_code == 401
+    assert cloud.stats[("GET", "unauthorized")][0] == 1
+
+
+def test_tools(cloud):
+    cloud.add_tool("portia:tavily::search", output="sunny")
+    tools = requests.get(f"{cloud.url}/api/v0/tools/descriptions/", headers=HEADERS)
+    assert [tool["tool_id"] for tool in tools.json()] == ["portia:tavily::search"]
+    result = requests.post(
+        f"{cloud.url}/api/v0/tools/portia:tavily::search/run/", json={}, headers=HEADERS
+    )
+    assert result.json() == {"output": {"value": "sunny"}}
+    missing = requests.post(
+        f"{cloud.url}/api/v0/tools/portia:nope/run/", json={}, headers=HEADERS
+    )
+    assert missing.status_code == 404
+
+
+def test_serves_the_tools_of_the_selected_examples(tmp_path, monkeypatch):
+    page = tmp_path / "page.md"
+    sources = [
+        'tools = ["portia:google:gmail:send_email"]\n',
+        'tool = "portia:tavily::search"\n',
+        'other = "portia:microsoft:outlook:draft_email"\n',
+    ]
+    page.write_text("".join(sources))
+    records, start = [], 0
+    for line, source in enumerate(sources, start=1):
+        prefix = "py id=setup" if line == 1 else "py depends_on=setup"
+        end = start + len(source)
+        records.append(ExampleRecord(page, line, line, start, end, prefix, 0))
+        start = end
+    index = ExampleIndex(records)
+    monkeypatch.setattr(local_cloud, "get_example_index", lambda config: index)
+
+    plugin = LocalCloud(config=None, latency=0.0)
+    with LocalPortiaCloud() as plugin.cloud:
+        # The third example was deselected.
+        items = [
+            SimpleNamespace(callspec=SimpleNamespace(params={"example": example}))
+            for example in records[1:2]
+        ]
+        plugin.pytest_collection_modifyitems(None, items)
+        assert sorted(plugin.cloud.tools) == [
+            "portia:google:gmail:send_email",
+            "portia:tavily::search",
+        ]
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from memory_tracking import MEMORY_PROPERTY, MemoryTracker, current_rss, open_files
+from scheduling import LABEL_PROPERTY
+
+
+@pytest.fixture
+def tracker():
+    config = SimpleNamespace(getoption=lambda name, default=None: default)
+    tracker = MemoryTracker(config)
+    tracker.pytest_sessionstart(None)
+    yield tracker
+    tracker.pytest_sessionfinish(None)
+
+
+def run_example(tracker, example):
+    """Run `example` as the call phase of a test and return what it left behind."""
+    item = SimpleNamespace(user_properties=[(LABEL_PROPERTY, "docs/page.md#1")])
+    hook = tracker.pytest_runtest_call(item)
+    next(hook)
+    example()
+    with pytest.raises(StopIteration):
+        next(hook)
+    return dict(item.user_properties)[MEMORY_PROPERTY]
+
+
+def test_clean_examples_leave_nothing_open(tracker):
+    def example():
+        asyncio.run(asyncio.sleep(0))
+        threading.Thread(target=lambda: None).start()
+
+    memory = run_example(tracker, example)
+    assert (memory["threads"], memory["event_loops"], memory["files"]) == ([], 0, [])
+
+
+def test_leaks_are_reported(tracker, tmp_path):
+    stop = threading.Event()
+    leaked = []
+
+    def example():
+        threading.Thread(target=stop.wait, name="leaked-thread").start()
+        leaked.append(asyncio.new_event_loop())
+        leaked.append(open(tmp_path / "leaked.txt", "w"))
+
+    try:
+        memory = run_example(tracker, example)
+    finally:
+        stop.set()
+        for resource in leaked:
+            resource.close()
+    assert memory["threads"] == ["leaked-thread"]
+    assert memory["event_loops"] == 1
+    assert str(tmp_path / "leaked.txt") in memory["files"]
+
+
+def test_process_probes():
+    assert current_rss() > 0
+    with open(__file__) as f:
+        assert os.path.samefile(open_files()[f.fileno()], __file__)
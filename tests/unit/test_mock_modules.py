@@ -0,0 +1,55 @@
+import importlib
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from mock_modules import MockModuleFinder
+
+
+@pytest.fixture
+def finder():
+    calls = []
+
+    def get_stand_ins():
+        calls.append(1)
+        return {"fake_pkg.tools.registry": SimpleNamespace(registry="the registry")}
+
+    finder = MockModuleFinder(["fake_pkg.tools.registry"], get_stand_ins)
+    finder.calls = calls
+    finder.install()
+    yield finder
+    finder.uninstall()
+
+
+def test_serves_stand_in_attributes(finder):
+    from fake_pkg.tools.registry import registry
+
+    assert registry == "the registry"
+    module = sys.modules["fake_pkg.tools.registry"]
+    # Looked up once, then a plain module attribute.
+    assert module.__dict__["registry"] == "the registry"
+    with pytest.raises(ImportError):
+        from fake_pkg.tools.registry import missing  # noqa: F401
+
+
+def test_parent_packages_are_importable(finder):
+    package = importlib.import_module("fake_pkg.tools")
+    assert package.__path__ == []
+    assert finder.calls == []
+
+
+def test_uninstall_forgets_the_modules(finder):
+    importlib.import_module("fake_pkg.tools.registry")
+    finder.uninstall()
+    try:
+        assert "fake_pkg" not in sys.modules
+        with pytest.raises(ModuleNotFoundError):
+            importlib.import_module("fake_pkg")
+    finally:
+        finder.install()
+
+
+def test_other_imports_are_left_alone(finder):
+    assert finder.find_spec("json", None) is None
+    assert finder.find_spec("fake_pkg.other", None) is None
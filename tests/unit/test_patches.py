@@ -0,0 +1,21 @@
+import pytest
+
+from patches import get_default_config, get_optional_patch
+
+
+def test_config_patch_hands_out_copies():
+    configs = []
+    for _ in range(2):
+        with get_optional_patch("portia_config"):
+            from portia import Config
+
+            configs.append(Config.from_default())
+    configs[0].changed_by_an_example = True
+    assert configs[0] is not configs[1]
+    assert not hasattr(configs[1], "changed_by_an_example")
+    assert not hasattr(get_default_config(), "changed_by_an_example")
+
+
+def test_unknown_patch():
+    with pytest.raises(ValueError, match="Unknown patch name: nope"):
+        get_optional_patch("nope")
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from example_index import build_index
+from preflight import _check_cycles, check_examples
+
+
+def index_of(tmp_path: Path, page: str):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "page.md").write_text(page)
+    return build_index(docs)
+
+
+def fence(tags: str, source: str = "pass") -> str:
+    return f"```python {tags}\n{source}\n```\n\n"
+
+
+def test_no_cycles_in_a_chain(tmp_path):
+    index = index_of(
+        tmp_path, fence("id=a") + fence("id=b depends_on=a") + fence("depends_on=b")
+    )
+    assert _check_cycles(index) == []
+
+
+def test_reports_each_cycle_once(tmp_path):
+    index = index_of(
+        tmp_path,
+        fence("id=a depends_on=c")
+        + fence("id=b depends_on=a")
+        + fence("id=c depends_on=b")
+        + fence("id=d depends_on=a"),
+    )
+    problems = _check_cycles(index)
+    assert len(problems) == 1
+    assert problems[0].endswith("depends_on cycle a -> c -> b -> a")
+
+
+def test_reports_self_dependencies(tmp_path):
+    index = index_of(tmp_path, fence("id=a depends_on=a"))
+    assert [problem.split(": ", 1)[1] for problem in _check_cycles(index)] == [
+        "depends_on cycle a -> a"
+    ]
+
+
+def test_check_examples_reports_tag_mistakes(tmp_path):
+    index = index_of(
+        tmp_path,
+        fence("skip=true")
+        + fence("patch=unknown")
+        + fence("depends_on=missing")
+        + fence("id=twice")
+        + fence("id=twice")
+        + fence("depends_on=twice"),
+    )
+    messages = [problem.split(": ", 1)[1] for problem in check_examples(index, [])]
+    assert messages == [
+        "skip=true must be accompanied by a skip_reason=",
+        "unknown patch=unknown",
+        "depends_on=missing matches no id=",
+        f"id=twice is already used at {tmp_path / 'docs' / 'page.md'}:13, so "
+        "depends_on=twice is ambiguous",
+    ]
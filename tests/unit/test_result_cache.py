@@ -0,0 +1,120 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from pytest_examples import CodeExample
+
+import harness
+from result_cache import DIGEST_PROPERTY, ResultCache
+from scheduling import LABEL_PROPERTY
+
+OPTIONS = {
+    "all_examples": False,
+    "benchmark": False,
+    "quarantine": "exclude",
+    "cassette_mode": "off",
+}
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key, default):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+class FakeConfig:
+    def __init__(self, cache=None, **options):
+        self.cache = FakeCache() if cache is None else cache
+        self.options = OPTIONS | options
+
+    def getoption(self, name):
+        return self.options[name]
+
+
+def make_example(source="print('hi')\n", prefix="py"):
+    return CodeExample(source, Path("docs/page.md"), 1, 3, 0, len(source), prefix, 0)
+
+
+def passed_before(cache, example, **options):
+    """Record `example` as passed on an earlier run with the same options."""
+    result_cache = ResultCache(FakeConfig(cache, **options))
+    cache.set(
+        result_cache.cache_key,
+        {result_cache.digest(example): "docs/page.md#1"},
+    )
+
+
+def test_key_covers_source_and_tags():
+    cache = FakeCache()
+    passed_before(cache, make_example())
+    result_cache = ResultCache(FakeConfig(cache))
+    assert result_cache.is_cached(make_example())
+    assert not result_cache.is_cached(make_example(source="print('bye')\n"))
+    assert not result_cache.is_cached(make_example(prefix="py skip=true"))
+
+
+def test_key_covers_cassette_mode():
+    cache, example = FakeCache(), make_example()
+    passed_before(cache, example, cassette_mode="replay")
+    assert not ResultCache(FakeConfig(cache)).is_cached(example)
+    assert ResultCache(FakeConfig(cache, cassette_mode="replay")).is_cached(example)
+
+
+def test_key_covers_harness(monkeypatch, tmp_path):
+    cache, example = FakeCache(), make_example()
+    passed_before(cache, example)
+    (tmp_path / "patches.py").write_text("PATCHES = {}\n")
+    monkeypatch.setattr(harness, "HARNESS_DIR", tmp_path)
+    harness.harness_digest.cache_clear()
+    try:
+        assert not ResultCache(FakeConfig(cache)).is_cached(example)
+        passed_before(cache, example)
+        (tmp_path / "patches.py").write_text("PATCHES = {'new': None}\n")
+        harness.harness_digest.cache_clear()
+        assert not ResultCache(FakeConfig(cache)).is_cached(example)
+    finally:
+        harness.harness_digest.cache_clear()
+
+
+def test_sessionfinish_replaces_passes_of_examples_that_ran():
+    cache = FakeCache()
+    old, other = make_example(), make_example(source="print('other')\n")
+    result_cache = ResultCache(FakeConfig(cache))
+    cache.set(
+        result_cache.cache_key,
+        {
+            result_cache.digest(old): "docs/page.md#a",
+            result_cache.digest(other): "docs/page.md#b",
+        },
+    )
+    result_cache = ResultCache(FakeConfig(cache))
+    new = make_example(source="print('new')\n")
+    result_cache.pytest_runtest_logreport(
+        SimpleNamespace(
+            nodeid="test[docs/page.md:1-3]@lpt-0",
+            when="call",
+            passed=True,
+            skipped=False,
+            user_properties=[
+                (LABEL_PROPERTY, "docs/page.md#a"),
+                (DIGEST_PROPERTY, result_cache.digest(new)),
+            ],
+        )
+    )
+    result_cache.pytest_sessionfinish(None)
+    assert cache.get(result_cache.cache_key, {}) == {
+        result_cache.digest(other): "docs/page.md#b",
+        result_cache.digest(new): "docs/page.md#a",
+    }
+
+
+def test_quarantine_only_runs_cached_examples():
+    cache, example = FakeCache(), make_example()
+    passed_before(cache, example)
+    assert ResultCache(FakeConfig(cache)).is_cached(example)
+    # A quarantined example has to run again to leave quarantine.
+    assert not ResultCache(FakeConfig(cache, quarantine="only")).is_cached(example)
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from scheduling import (
+    DURATIONS_CACHE_KEY,
+    LABEL_PROPERTY,
+    DurationScheduler,
+    lpt_schedule,
+    makespan,
+    uses_loadgroup,
+)
+
+
+class FakeCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+def test_lpt_schedule():
+    costs = {"a": 7.0, "b": 5.0, "c": 4.0, "d": 3.0, "e": 2.0, "f": 2.0}
+    bins = lpt_schedule(costs, 2)
+    assert bins == [["a", "d", "f"], ["b", "c", "e"]]
+    assert makespan(costs, bins) == 12.0
+
+
+def test_lpt_schedule_more_workers_than_examples():
+    costs = {"a": 1.0, "b": 1.0}
+    assert lpt_schedule(costs, 3) == [["a"], ["b"], []]
+    assert makespan(costs, lpt_schedule(costs, 3)) == 1.0
+    assert makespan({}, lpt_schedule({}, 2)) == 0.0
+
+
+def test_new_examples_are_predicted_at_the_median():
+    cache = FakeCache({DURATIONS_CACHE_KEY: {"a": 1.0, "b": 2.0, "c": 10.0}})
+    scheduler = DurationScheduler(SimpleNamespace(cache=cache))
+    assert scheduler.predict(["a", "new"]) == {"a": 1.0, "new": 2.0}
+
+
+def test_history_is_a_moving_average_of_measured_runs():
+    cache = FakeCache({DURATIONS_CACHE_KEY: {"a": 4.0, "b": 1.0}})
+    config = SimpleNamespace(cache=cache)
+    scheduler = DurationScheduler(config)
+    for label, duration, skipped in [
+        ("a", 2.0, False),
+        ("b", 0.0, True),
+        ("c", 3.0, False),
+    ]:
+        scheduler.pytest_runtest_logreport(
+            SimpleNamespace(
+                user_properties=[(LABEL_PROPERTY, label)],
+                skipped=skipped,
+                duration=duration,
+            )
+        )
+    scheduler.pytest_sessionfinish(None)
+    # Skipped runs (e.g. cached passes) leave the history alone.
+    assert cache[DURATIONS_CACHE_KEY] == {"a": 3.0, "b": 1.0, "c": 3.0}
+
+
+def test_uses_loadgroup():
+    def config(dist, **option):
+        return SimpleNamespace(
+            getoption=lambda name, default=None: dist,
+            option=SimpleNamespace(**option),
+        )
+
+    assert uses_loadgroup(config("loadgroup"))
+    # What xdist leaves the workers with.
+    assert uses_loadgroup(config("no", loadgroup=True))
+    assert not uses_loadgroup(config("no", loadgroup=False))
+    assert not uses_loadgroup(config("load"))
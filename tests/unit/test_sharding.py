@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+import sharding
+from example_index import ExampleIndex, ExampleRecord
+from sharding import ShardSelector, dependency_components, parse_shard
+
+PAGE = Path("docs/page.md")
+
+
+def record(line, prefix="py"):
+    return ExampleRecord(PAGE, line, line + 2, 0, 0, prefix, 0)
+
+
+@pytest.fixture
+def index():
+    return ExampleIndex(
+        [
+            record(1, "py id=setup"),
+            record(5, "py depends_on=setup"),
+            record(9, "py id=other"),
+            record(13, "py depends_on=other"),
+            record(17),
+            record(21),
+        ]
+    )
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == (2, 3)
+    for value in ["0/3", "4/3", "1", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_dependency_components(index):
+    assert dependency_components(index) == [
+        ["docs/page.md#2", "docs/page.md#setup"],
+        ["docs/page.md#4", "docs/page.md#other"],
+        ["docs/page.md#5"],
+        ["docs/page.md#6"],
+    ]
+
+
+def test_partition_keeps_chains_together(monkeypatch, index):
+    monkeypatch.setattr(sharding, "get_example_index", lambda config: index)
+    durations = {"docs/page.md#setup": 5.0, "docs/page.md#2": 1.0}
+    shards = [ShardSelector(None, i, 2, durations) for i in (1, 2)]
+    partition = shards[0].partition
+    # Unknown examples take the median duration (3s): both chains take 6s and the
+    # two examples on their own 3s each, so each shard gets 9s.
+    assert partition == [
+        ["docs/page.md#2", "docs/page.md#5", "docs/page.md#setup"],
+        ["docs/page.md#4", "docs/page.md#6", "docs/page.md#other"],
+    ]
+    assert shards[1].partition == partition
+    assert shards[0].fingerprint() == shards[1].fingerprint()
+    assert shards[1].manifest() == {
+        "shard": "2/2",
+        "fingerprint": shards[0].fingerprint(),
+        "examples": 3,
+        "total_examples": 6,
+    }
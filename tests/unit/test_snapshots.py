@@ -0,0 +1,67 @@
+import threading
+from pathlib import Path
+
+from pytest_examples import CodeExample
+
+from snapshots import DependencySnapshots, _copy_namespace
+
+
+class FakeEvalExample:
+    """Runs examples the way `EvalExample.run` does, remembering what ran."""
+
+    def __init__(self):
+        self.ran = []
+        self.namespaces = []
+
+    def run(self, example, module_globals=None):
+        self.ran.append(example.source)
+        module_dict = {"__name__": "__main__", **(module_globals or {})}
+        exec(example.source, module_dict)
+        self.namespaces.append(module_dict)
+        return module_dict
+
+
+def make_example(source, line):
+    path = Path("docs/page.md")
+    return CodeExample(source, path, line, line + 2, 0, len(source), "py", 0)
+
+
+def test_copy_keeps_aliases_and_shares_what_cant_be_copied():
+    items = [1, 2]
+    lock = threading.Lock()
+    copied = _copy_namespace({"a": items, "b": items, "lock": lock})
+    assert copied["a"] == items and copied["a"] is not items
+    assert copied["a"] is copied["b"]
+    assert copied["lock"] is lock
+
+
+def test_failed_copies_leave_no_half_copied_parts_behind():
+    inner = {"a": 1, "lock": threading.Lock()}
+    copied = _copy_namespace({"holder": {"inner": inner}, "inner": inner})
+    # Copying `holder` got as far as an `inner` without its lock before failing.
+    assert copied["inner"] is inner
+
+
+def test_chains_run_once_and_dependents_start_from_a_copy():
+    eval_example = FakeEvalExample()
+    snapshots = DependencySnapshots()
+    setup = make_example("items = []\n", 1)
+    step = make_example("items.append('step')\n", 5)
+    for line in (9, 13):
+        dependent = make_example("items.append('dependent')\nresult = items\n", line)
+        snapshots.run(eval_example, [setup, step], dependent, [])
+    assert eval_example.ran.count(setup.source) == 1
+    assert eval_example.ran.count(step.source) == 1
+    # Neither dependent sees the other's additions.
+    results = [namespace["result"] for namespace in eval_example.namespaces[2:]]
+    assert results == [["step", "dependent"], ["step", "dependent"]]
+
+
+def test_patches_get_their_own_snapshot():
+    eval_example = FakeEvalExample()
+    snapshots = DependencySnapshots()
+    setup = make_example("x = 1\n", 1)
+    dependent = make_example("y = x\n", 5)
+    snapshots.run(eval_example, [setup], dependent, [])
+    snapshots.run(eval_example, [setup], dependent, ["patched"])
+    assert eval_example.ran.count(setup.source) == 2
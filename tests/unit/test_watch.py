@@ -0,0 +1,63 @@
+import pytest
+
+from example_index import build_index
+from watch import affected_examples, page_keys
+
+PAGE = """\
+```python id=setup
+x = 1
+```
+
+```python depends_on=setup
+print(x)
+```
+
+```python
+print("alone")
+```
+"""
+
+OTHER_PAGE = """\
+```python depends_on=setup
+print(x + 1)
+```
+"""
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "page.md").write_text(PAGE)
+    (docs / "other.md").write_text(OTHER_PAGE)
+    return docs
+
+
+def edit(docs, text):
+    """Rewrite page.md and return the examples affected by the change."""
+    page = docs / "page.md"
+    before = page_keys(build_index(docs), {page})
+    page.write_text(text)
+    index = build_index(docs)
+    return [str(example) for example in affected_examples(index, before, {page})]
+
+
+def test_moving_examples_affects_nothing(docs):
+    assert edit(docs, "# New heading\n\nProse.\n\n" + PAGE) == []
+
+
+def test_editing_an_example_affects_its_dependents(docs):
+    affected = edit(docs, PAGE.replace("x = 1", "x = 2"))
+    index = build_index(docs)
+    other, setup, dependent, _ = index.examples
+    assert affected == [str(other), str(setup), str(dependent)]
+
+
+def test_new_and_retagged_examples_are_affected(docs):
+    text = PAGE.replace(
+        '```python\nprint("alone")', '```python test="skip"\nprint("alone")'
+    )
+    text += '\n```python\nprint("new")\n```\n'
+    affected = edit(docs, text)
+    index = build_index(docs)
+    assert affected == [str(example) for example in index.examples[-2:]]
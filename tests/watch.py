@@ -0,0 +1,268 @@
+"""Re-run the docs examples you edit as soon as you save them.
+
+A plain `pytest tests/test_code_examples.py` starts a new interpreter, imports portia
+and the harness and collects every example on each run. The watcher pays for that
+once: it imports pytest, the harness, portia and the `IMPORTS_TO_MOCK` stand-ins up
+front, then polls docs/product for changes. When pages change, it works out which
+examples were edited (by their source and tags, so moving an example around the page
+doesn't count) and which examples `depends_on` them, and forks a copy of itself to
+run just those with pytest. Every run starts from the same warm, clean state, since
+the forked worker exits afterwards and takes whatever the examples left behind with
+it. With `--jobs N` the examples are shared out between N forked workers running at
+once, whose output is printed when they finish.
+
+Edits to the harness itself (tests/*.py) restart the watcher so the warm copy is
+never stale. Forking needs Linux or macOS.
+
+Run it with `python tests/watch.py`; arguments after `--` go to pytest, e.g.
+`python tests/watch.py -- -s --cassette-mode=replay`.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from async_runner import get_example
+from example_index import DOCS_PATH, ExampleIndex, ExampleRecord, build_index
+from harness import get_cache_dir
+from import_profile import HEAVY_MODULES, time_imports
+
+TESTS_PATH = Path(__file__).parent
+TEST_FILE = TESTS_PATH / "test_code_examples.py"
+POLL_SECONDS = 0.2
+# Editors often save in several writes; wait for the files to settle.
+SETTLE_SECONDS = 0.1
+
+Snapshot = dict[Path, tuple[int, int]]
+
+
+def snapshot(*patterns: tuple[Path, str]) -> Snapshot:
+    """mtime and size of every file matching the (directory, glob) patterns."""
+    files = {}
+    for directory, pattern in patterns:
+        for path in directory.glob(pattern):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.is_file():
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def page_keys(index: ExampleIndex, pages: set[Path]) -> dict[Path, Counter]:
+    """What the examples on each of `pages` run, regardless of where they sit."""
+    keys: dict[Path, Counter] = {page: Counter() for page in pages}
+    texts: dict[Path, str] = {}
+    for example in index.examples:
+        if example.path not in keys:
+            continue
+        # Not ExampleRecord.source: its page cache would be inherited, stale, by the
+        # forked workers.
+        if example.path not in texts:
+            texts[example.path] = example.path.read_text("utf-8")
+        text = texts[example.path][example.start_index : example.end_index]
+        keys[example.path][text, example.tags] += 1
+    return keys
+
+
+def affected_examples(
+    index: ExampleIndex, before: dict[Path, Counter], changed: set[Path]
+) -> list[ExampleRecord]:
+    """Examples on the changed pages that are new or edited since `before`, and the
+    examples depending on any of them, in index order."""
+    edited = set()
+    for page in changed:
+        remaining = Counter(before.get(page, {}))
+        text = page.read_text("utf-8") if page.exists() else ""
+        for example in index.examples:
+            if example.path != page:
+                continue
+            key = text[example.start_index : example.end_index], example.tags
+            if remaining[key]:
+                remaining[key] -= 1
+            else:
+                edited.add(str(example))
+    return [
+        example
+        for example in index.examples
+        if str(example) in edited
+        or any(str(dependency) in edited for dependency in index.dependencies(example))
+    ]
+
+
+class ExampleSelector:
+    """Pytest plugin deselecting every example but the given ones."""
+
+    def __init__(self, examples: list[ExampleRecord]):
+        self.names = {str(example) for example in examples}
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        kept, deselected = [], []
+        for item in items:
+            example = get_example(item)
+            selected = example is not None and str(example) in self.names
+            (kept if selected else deselected).append(item)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = kept
+
+
+def warm_up() -> dict[str, float]:
+    """Import everything an example run needs, returning the heavy import times."""
+    # Imported as pytest imports them, so the runs find them in sys.modules.
+    sys.path.insert(0, str(TESTS_PATH))
+    import conftest  # noqa: F401
+    import test_code_examples
+
+    timings = time_imports(HEAVY_MODULES)
+    test_code_examples.get_imports_to_mock()
+    return timings
+
+
+def fork_run(
+    examples: list[ExampleRecord], pytest_args: list[str], output: Path | None
+) -> int:
+    """Run `examples` with pytest in a forked copy of this process, returning its pid.
+
+    With `output`, the worker's stdout and stderr go to that file.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 1
+    try:
+        if output is not None:
+            fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            os.close(fd)
+        # The warm modules were imported before pytest could rewrite their asserts.
+        warnings = ["-W", "ignore::pytest.PytestAssertRewriteWarning"]
+        args = [str(TEST_FILE), "--all-examples", *warnings, *pytest_args]
+        code = pytest.main(args, plugins=[ExampleSelector(examples)])
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Skip the parent's atexit handlers and buffers.
+        os._exit(int(code))
+
+
+def run_examples(
+    examples: list[ExampleRecord], pytest_args: list[str], jobs: int
+) -> bool:
+    """Run `examples` in up to `jobs` forked workers; True if they all passed."""
+    shares = [examples[i::jobs] for i in range(min(jobs, len(examples)))]
+    if len(shares) == 1:
+        _, status = os.waitpid(fork_run(shares[0], pytest_args, None), 0)
+        return os.waitstatus_to_exitcode(status) == 0
+    with tempfile.TemporaryDirectory() as directory:
+        outputs = [Path(directory, f"worker-{i}.log") for i in range(len(shares))]
+        pids = [
+            fork_run(share, pytest_args, output)
+            for share, output in zip(shares, outputs)
+        ]
+        passed = True
+        for i, (pid, output) in enumerate(zip(pids, outputs)):
+            _, status = os.waitpid(pid, 0)
+            passed &= os.waitstatus_to_exitcode(status) == 0
+            print(f"----- worker {i + 1} of {len(shares)} -----")
+            print(output.read_text(), end="")
+    return passed
+
+
+def watch(docs_path: Path, pytest_args: list[str], jobs: int) -> None:
+    start = time.perf_counter()
+    timings = warm_up()
+    cache_dir = get_cache_dir()
+    index = build_index(docs_path, cache_dir)
+    pages = snapshot((docs_path, "**/*"))
+    keys = page_keys(index, set(pages))
+    harness = snapshot((TESTS_PATH, "*.py"))
+    imports = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+    print(
+        f"Warmed up in {time.perf_counter() - start:.1f}s ({imports}). Watching "
+        f"{len(index.examples)} examples in {docs_path}, Ctrl+C to stop."
+    )
+    while True:
+        time.sleep(POLL_SECONDS)
+        if snapshot((TESTS_PATH, "*.py")) != harness:
+            print("The harness changed, restarting the watcher")
+            os.execv(sys.executable, [sys.executable, *sys.argv])
+        current = snapshot((docs_path, "**/*"))
+        if current == pages:
+            continue
+        while True:
+            time.sleep(SETTLE_SECONDS)
+            settled = snapshot((docs_path, "**/*"))
+            if settled == current:
+                break
+            current = settled
+        changed = {
+            path
+            for path in set(pages) | set(current)
+            if pages.get(path) != current.get(path)
+        }
+        pages = current
+        detected = time.perf_counter()
+        index = build_index(docs_path, cache_dir)
+        examples = affected_examples(index, keys, changed)
+        keys.update(page_keys(index, changed))
+        names = ", ".join(sorted(str(path.relative_to(docs_path)) for path in changed))
+        if not examples:
+            print(f"\n{names} changed, no examples edited")
+            continue
+        print(f"\n{names} changed, running {len(examples)} example(s)")
+        passed = run_examples(examples, pytest_args, jobs)
+        print(
+            f"{'Passed' if passed else 'FAILED'} in "
+            f"{time.perf_counter() - detected:.1f}s, watching for changes"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="Arguments after -- are passed on to pytest.",
+    )
+    parser.add_argument(
+        "docs_path",
+        nargs="?",
+        type=Path,
+        default=DOCS_PATH,
+        help=f"Directory of docs pages to watch (default: {DOCS_PATH})",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Forked workers to share the examples of a change between (default: 1)",
+    )
+    argv = sys.argv[1:]
+    split = argv.index("--") if "--" in argv else len(argv)
+    args = parser.parse_args(argv[:split])
+    pytest_args = argv[split + 1 :]
+    if not hasattr(os, "fork"):
+        parser.error("watch mode forks its workers, which needs Linux or macOS")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    try:
+        watch(args.docs_path, pytest_args, args.jobs)
+    except KeyboardInterrupt:
+        print()
+
+
+if __name__ == "__main__":
+    main()